@@ -0,0 +1,148 @@
+"""Benchmarks the control loop of `Simulation.run` against a scripted TraCI stand-in, without SUMO.
+
+Usage, from the repository root:
+
+    python -m benchmarks.control_loop --fleets 200,1000,5000,20000 --steps 300 [--halting]
+"""
+import contextlib
+import io
+import optparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+import traci as traciModule
+from termcolor import colored
+from src.models.ProximityEngine import ProximityEngine
+from src.models.Simulation import Simulation
+from src.models.TerminationPolicy import TerminationPolicy
+from src.models.TraciProxy import traci, LOCAL_METHODS
+from src.runner.run_simulation import realWorld
+from .scripted_traci import Fleet, ScriptedTraci
+
+# Steps left out of the statistics, while the initial fleet departs.
+WARMUP_STEPS = 10
+
+
+def getEvEdges() -> list[str]:
+    """Returns the edges of the EV route, as inserted by `Simulation.insertEv`."""
+    fleet = Fleet(0)
+    traci.use(ScriptedTraci(fleet))
+    Simulation(realWorld["evTrip"]).insertEv(
+        realWorld["evTrip"]["origin"], realWorld["evTrip"]["dest"])
+    return list(fleet.routes["evRoute"])
+
+
+def runLoop(fleetSize: int, steps: int, seed: int, evEdges: list[str], halting: bool = False) -> ScriptedTraci:
+    """Runs `Simulation.run` for a number of steps against a scripted fleet.
+
+    Args:
+        fleetSize (int): The number of vehicles on the network.
+        steps (int): The number of steps.
+        seed (int): The seed of the fleet.
+        evEdges (list[str]): The edges of the EV route.
+        halting (bool, optional): Whether to halt the vehicles around the EV.
+
+    Returns:
+        ScriptedTraci: The stand-in, with the time the loop spent on every step.
+    """
+    standIn = ScriptedTraci(Fleet(fleetSize, seed, evEdges))
+    traci.use(standIn)
+    # The scripted lanes rarely match the EV's. Halt vehicles on any lane, so that halts are issued.
+    proximity = ProximityEngine(lanes="any") if halting else None
+    sim = Simulation(realWorld["evTrip"], termination=TerminationPolicy(
+        afterEv=None, stepBudget=steps), proximity=proximity)
+    with tempfile.TemporaryDirectory() as outputDir, contextlib.redirect_stdout(io.StringIO()):
+        sim.run("sumo", "network", "vTypes", "trips", outputDir, 0, "benchmark",
+                evInsertionTime=WARMUP_STEPS)
+    return standIn
+
+
+def benchmark(fleetSize: int, steps: int, seed: int, evEdges: list[str], halting: bool = False) -> dict:
+    """Measures the step throughput, TraCI calls, and allocations of the control loop for a fleet size.
+
+    Each is measured in a separate pass, so that counting and tracing don't skew the timings.
+
+    Args:
+        fleetSize (int): The number of vehicles on the network.
+        steps (int): The number of steps.
+        seed (int): The seed of the fleet.
+        evEdges (list[str]): The edges of the EV route.
+        halting (bool, optional): Whether to halt the vehicles around the EV.
+
+    Returns:
+        dict: The results.
+    """
+    # Timings.
+    standIn = runLoop(fleetSize, steps, seed, evEdges, halting)
+    durations = np.array(standIn.loopTimes[WARMUP_STEPS:]) * 1000
+
+    # TraCI calls, incl. those answered locally.
+    traci.reset()
+    traci.enable()
+    try:
+        runLoop(fleetSize, steps, seed, evEdges, halting)
+    finally:
+        traci.disable()
+    stats = traci.getStats()
+    commands = stats.loc[~stats["method"].isin(LOCAL_METHODS), "calls"].sum()
+
+    # Allocations.
+    tracemalloc.start()
+    try:
+        runLoop(fleetSize, steps, seed, evEdges, halting)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "fleet": fleetSize,
+        "steps/s": 1000 / durations.mean(),
+        "p50 (ms)": np.percentile(durations, 50),
+        "p95 (ms)": np.percentile(durations, 95),
+        "max (ms)": durations.max(),
+        "calls/step": stats["calls"].sum() / steps,
+        "commands/step": commands / steps,
+        "peak (MiB)": peak / 2**20,
+    }
+
+
+def get_options(args=None):
+    optParser = optparse.OptionParser()
+    optParser.add_option("--fleets", default="200,1000,5000,20000",
+                         help="comma-separated fleet sizes, i.e. the number of vehicles on the network.")
+    optParser.add_option("--steps", type="int", default=300,
+                         help="number of simulation steps per run.")
+    optParser.add_option("--seed", type="int", default=0,
+                         help="seed of the scripted fleets.")
+    optParser.add_option("--halting", action="store_true", default=False,
+                         help="halt the vehicles around the EV.")
+    optParser.add_option("--output", default=None,
+                         help="CSV file to write the results to.")
+    options, _ = optParser.parse_args(args=args)
+    options.fleets = [int(size) for size in options.fleets.split(',')]
+    return options
+
+
+def main(options):
+    print(f"\n> Benchmarking the control loop...")
+    evEdges = getEvEdges()
+    rows = []
+    try:
+        for fleetSize in options.fleets:
+            rows.append(benchmark(fleetSize, options.steps,
+                        options.seed, evEdges, options.halting))
+            print(
+                f"""\t{colored('[✓]', 'green')} Fleet of ({colored(fleetSize, 'yellow')}): ({colored(f"{rows[-1]['steps/s']:0.1f}", 'red')}) steps/s.""")
+    finally:
+        traci.use(traciModule)
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False, float_format=lambda value: f"{value:0.3f}"))
+    if options.output:
+        results.to_csv(options.output, index=False, float_format="%.4f")
+        print(f"""{colored('[✓]', 'green')} Results written to {options.output}.""")
+
+
+if __name__ == "__main__":
+    main(get_options())
@@ -0,0 +1,225 @@
+"""A scripted stand-in for the `traci` module, for benchmarking the control loop without SUMO.
+
+The stand-in replays a synthetic fleet: vehicles depart along random routes,
+move along them edge by edge, and arrive at their end, while the fleet stays at
+a fixed size. Vehicles are scattered over a square area, at a fixed density, and
+jump to a nearby position when they move on to their next edge. The EV drives
+the real case study's EV route. Rerouting replaces
+the rest of a vehicle's route with edges it doesn't avoid. Everything is drawn
+from a seeded RNG, so identical inputs replay identical responses.
+
+Responses are kept up to date in place, so that the stand-in's own cost per
+step stays small next to the control loop's.
+"""
+import math
+import random
+import time
+import numpy as np
+import traci.constants as tc
+
+# Share of vehicles that move on to the next edge of their route, per step.
+ADVANCE_PROBABILITY = 0.1
+
+# The number of edges of a route.
+ROUTE_LENGTH = (8, 30)
+
+# The area per vehicle, in square meters.
+AREA_PER_VEHICLE = 1600
+
+# The distance a vehicle jumps when it moves on to its next edge, in meters.
+JUMP_DISTANCE = 50
+
+
+class Fleet:
+    """The synthetic state of the network: the vehicles, their routes, and their positions."""
+
+    def __init__(self, fleetSize: int, seed: int = 0, evEdges: list[str] = None, cvShare: float = 0.5) -> None:
+        self.fleetSize = fleetSize
+        self.rng = random.Random(seed)
+        self.npRng = np.random.default_rng(seed)
+        self.cvShare = cvShare
+        # The side of the square area the vehicles are scattered over, in meters.
+        self.side = math.sqrt(max(fleetSize, 1) * AREA_PER_VEHICLE)
+        # The synthetic edges, incl. those of the EV route, so that CV routes can share them.
+        self.edges = list(evEdges or []) + \
+            [f"e{i}" for i in range(max(200, fleetSize // 5))]
+        # The subscribed values of every vehicle, by ID. Updated in place.
+        self.results: dict[str, dict] = {}
+        # The edges each vehicle avoids, by ID.
+        self.avoided: dict[str, set[str]] = {}
+        # The IDs of the vehicles that departed, and arrived, during the last step.
+        self.departed: list[str] = []
+        self.arrived: list[str] = []
+        # Routes added with `route.add`, by ID.
+        self.routes: dict[str, tuple[str]] = {}
+        # Vehicles added with `vehicle.add`, departing with the next step.
+        self.pending: list[tuple[str, str, str]] = []
+        self.nextId = 0
+        self.time = 0.0
+
+    def createRoute(self, length: int, avoid: set[str] = ()) -> tuple[str]:
+        edges = self.rng.sample(self.edges, length + len(avoid))
+        return tuple(edge for edge in edges if edge not in avoid)[:length]
+
+    def depart(self, vehId: str, typeId: str, route: tuple[str]) -> None:
+        self.results[vehId] = {tc.VAR_TYPE: typeId, tc.VAR_EDGES: route, tc.VAR_ROUTE_INDEX: 0,
+                               tc.VAR_POSITION: (self.rng.uniform(0, self.side), self.rng.uniform(0, self.side)),
+                               tc.VAR_LANE_ID: f"{route[0]}_0", tc.VAR_ANGLE: self.rng.uniform(0, 360),
+                               tc.VAR_SPEED: 13.89}
+        self.departed.append(vehId)
+
+    def step(self) -> None:
+        """Moves the fleet by one step."""
+        self.time += 1
+        self.departed = []
+        self.arrived = []
+
+        # Move a random share of the vehicles to their next edge. Arrive at the end of the route.
+        vehIds = list(self.results)
+        moving = np.flatnonzero(self.npRng.random(
+            len(vehIds)) < ADVANCE_PROBABILITY)
+        for index in moving:
+            vehId = vehIds[index]
+            values = self.results[vehId]
+            values[tc.VAR_ROUTE_INDEX] += 1
+            if values[tc.VAR_ROUTE_INDEX] >= len(values[tc.VAR_EDGES]):
+                del self.results[vehId]
+                self.avoided.pop(vehId, None)
+                self.arrived.append(vehId)
+                continue
+            x, y = values[tc.VAR_POSITION]
+            values[tc.VAR_POSITION] = (x + self.rng.uniform(-JUMP_DISTANCE, JUMP_DISTANCE),
+                                       y + self.rng.uniform(-JUMP_DISTANCE, JUMP_DISTANCE))
+            values[tc.VAR_LANE_ID] = f"{values[tc.VAR_EDGES][values[tc.VAR_ROUTE_INDEX]]}_0"
+
+        for vehId, routeId, typeId in self.pending:
+            self.depart(vehId, typeId, self.routes[routeId])
+        self.pending = []
+
+        # Keep the fleet at its size.
+        while len(self.results) < self.fleetSize:
+            vehId = f"veh{self.nextId}"
+            self.nextId += 1
+            typeId = "Connected" if self.rng.random() < self.cvShare else "Civilian"
+            self.depart(vehId, typeId, self.createRoute(
+                self.rng.randint(*ROUTE_LENGTH)))
+
+    def reroute(self, vehId: str) -> None:
+        """Replaces the rest of a vehicle's route with edges it doesn't avoid."""
+        values = self.results[vehId]
+        route = values[tc.VAR_EDGES]
+        index = values[tc.VAR_ROUTE_INDEX]
+        remaining = len(route) - index - 1
+        values[tc.VAR_EDGES] = route[:index + 1] + \
+            self.createRoute(remaining, self.avoided.get(vehId, set()))
+
+
+class SimulationDomain:
+    def __init__(self, fleet: Fleet) -> None:
+        self.fleet = fleet
+        self.subscription = {}
+
+    def subscribe(self, variables: list[int]) -> None:
+        self.subscription = dict.fromkeys(variables)
+
+    def getSubscriptionResults(self) -> dict:
+        results = {}
+        if tc.VAR_TIME in self.subscription:
+            results[tc.VAR_TIME] = self.fleet.time
+        if tc.VAR_MIN_EXPECTED_VEHICLES in self.subscription:
+            results[tc.VAR_MIN_EXPECTED_VEHICLES] = len(self.fleet.results)
+        return results
+
+    def getTime(self) -> float:
+        return self.fleet.time
+
+    def getDepartedIDList(self) -> tuple[str]:
+        return tuple(self.fleet.departed)
+
+    def getArrivedIDList(self) -> tuple[str]:
+        return tuple(self.fleet.arrived)
+
+
+class VehicleDomain:
+    def __init__(self, fleet: Fleet) -> None:
+        self.fleet = fleet
+
+    def subscribe(self, vehId: str, variables: list[int]) -> None:
+        pass
+
+    def getAllSubscriptionResults(self) -> dict[str, dict]:
+        return self.fleet.results
+
+    def getIDList(self) -> tuple[str]:
+        return tuple(self.fleet.results)
+
+    def getTypeID(self, vehId: str) -> str:
+        return self.fleet.results[vehId][tc.VAR_TYPE]
+
+    def getRoute(self, vehId: str) -> tuple[str]:
+        return self.fleet.results[vehId][tc.VAR_EDGES]
+
+    def getRouteIndex(self, vehId: str) -> int:
+        return self.fleet.results[vehId][tc.VAR_ROUTE_INDEX]
+
+    def getSpeed(self, vehId: str) -> float:
+        return self.fleet.results[vehId][tc.VAR_SPEED]
+
+    def slowDown(self, vehId: str, speed: float, duration: float) -> None:
+        pass
+
+    def setAdaptedTraveltime(self, vehId: str, edgeId: str, time: float = None) -> None:
+        avoided = self.fleet.avoided.setdefault(vehId, set())
+        if time is None:
+            avoided.discard(edgeId)
+        else:
+            avoided.add(edgeId)
+
+    def rerouteTraveltime(self, vehId: str) -> None:
+        self.fleet.reroute(vehId)
+
+    def add(self, vehID: str, routeID: str, typeID: str = "DEFAULT_VEHTYPE") -> None:
+        self.fleet.pending.append((vehID, routeID, typeID))
+
+
+class RouteDomain:
+    def __init__(self, fleet: Fleet) -> None:
+        self.fleet = fleet
+
+    def add(self, routeId: str, edges: list[str]) -> None:
+        self.fleet.routes[routeId] = tuple(edges)
+
+
+class ScriptedTraci:
+    """Stands in for the `traci` module, backed by a synthetic `Fleet`.
+
+    Also records the wall-clock time the control loop spent between steps,
+    i.e. without the stand-in's own `simulationStep`, so that the duration of
+    each step of the loop can be derived without instrumenting it.
+    """
+
+    def __init__(self, fleet: Fleet) -> None:
+        self.fleet = fleet
+        self.simulation = SimulationDomain(fleet)
+        self.vehicle = VehicleDomain(fleet)
+        self.route = RouteDomain(fleet)
+        # The time the control loop spent on every step, in seconds.
+        self.loopTimes: list[float] = []
+        # The end of the last step.
+        self.stepEnd: float = None
+
+    def start(self, command: list[str], label: str = "default") -> None:
+        self.loopTimes = []
+        self.fleet.step()
+        self.stepEnd = time.perf_counter()
+
+    def simulationStep(self, step: float = 0.) -> None:
+        self.loopTimes.append(time.perf_counter() - self.stepEnd)
+        self.fleet.step()
+        self.stepEnd = time.perf_counter()
+
+    def close(self) -> None:
+        pass
+
+    def getConnection(self, label: str = "default"):
+        return None
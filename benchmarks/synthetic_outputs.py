@@ -0,0 +1,120 @@
+"""Generators of synthetic SUMO output files, shaped like those of the case studies, at a given size.
+
+- FCD: `<timestep>` elements, each with `vehiclesPerStep` `<vehicle>` elements (only the EV, in the case studies).
+- SSM: `<conflict>` elements, each with a `<minTTC>` element that carries the encounter type.
+- Tripinfo: `<tripinfo>` elements, each with a `<bluelight/>` element.
+
+Files are written in blocks, and generated from a seeded RNG, so identical
+inputs yield identical files.
+"""
+import os
+import random
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n\n<!-- generated by benchmarks/synthetic_outputs.py -->\n\n'
+
+# The number of elements written at a time.
+BLOCK_SIZE = 1000
+
+# The folder of each kind of output, within an output directory, as written by `Simulation`.
+FOLDERS = {"fcd": "fcd", "ssm": "ssm", "tripinfo": "dump"}
+
+# The SSM encounter types, weighted roughly as in the case studies.
+ENCOUNTER_TYPES = ["2", "2", "2", "111", "111", "7", "10", "0"]
+
+
+def fcdElements(rng: random.Random, vehiclesPerStep: int = 1):
+    time = 0
+    while True:
+        vehicles = "".join(
+            f'        <vehicle id="{"EV" if index == 0 else f"veh{rng.randrange(100000)}"}" x="{rng.uniform(0, 5000):.2f}" y="{rng.uniform(0, 5000):.2f}" '
+            f'angle="{rng.uniform(0, 360):.2f}" type="{"EV" if index == 0 else "Connected"}" speed="{rng.uniform(0, 20):.2f}" pos="{rng.uniform(0, 200):.2f}" '
+            f'lane="-{rng.randrange(10**8)}#{rng.randrange(4)}_0" slope="0.00"/>\n'
+            for index in range(vehiclesPerStep))
+        yield f'    <timestep time="{time:.2f}">\n{vehicles}    </timestep>\n'
+        time += 1
+
+
+def ssmElements(rng: random.Random):
+    while True:
+        begin = rng.uniform(600, 1200)
+        yield (f'    <conflict begin="{begin:.2f}" end="{begin + rng.uniform(1, 30):.2f}" ego="EV" foe="{rng.randrange(10000)}">\n'
+               f'        <minTTC time="{begin + 1:.2f}" position="{rng.uniform(0, 5000):.2f},{rng.uniform(0, 5000):.2f}" '
+               f'type="{rng.choice(ENCOUNTER_TYPES)}" value="{rng.uniform(0, 1.5):.2f}" speed="{rng.uniform(0, 20):.2f}"/>\n'
+               f'    </conflict>\n')
+
+
+def tripinfoElements(rng: random.Random):
+    index = 0
+    while True:
+        depart = rng.uniform(0, 3600)
+        duration = rng.uniform(60, 600)
+        vehId = "EV" if index == 0 else f"veh{index}"
+        yield (f'    <tripinfo id="{vehId}" depart="{depart:.2f}" departLane="-256520229#0_0" departPos="10.10" departPosLat="0.00" '
+               f'departSpeed="0.00" departDelay="0.00" arrival="{depart + duration:.2f}" arrivalLane="-215120969_1" arrivalPos="9.88" '
+               f'arrivalPosLat="0.00" arrivalSpeed="{rng.uniform(0, 20):.2f}" duration="{duration:.2f}" routeLength="{rng.uniform(500, 5000):.2f}" '
+               f'waitingTime="{rng.uniform(0, 60):.2f}" waitingCount="{rng.randrange(5)}" stopTime="0.00" timeLoss="{rng.uniform(0, 120):.2f}" '
+               f'rerouteNo="0" devices="tripinfo_{vehId}" vType="EV" speedFactor="1.50" vaporized="">\n'
+               f'        <bluelight/>\n'
+               f'    </tripinfo>\n')
+        index += 1
+
+
+# The root element and element generator of each kind of output.
+KINDS = {
+    "fcd": ("fcd-export", fcdElements),
+    "ssm": ("SSMLog", ssmElements),
+    "tripinfo": ("tripinfos", tripinfoElements),
+}
+
+
+def write(filePath: str, kind: str, targetBytes: int, seed: int = 0, **kwargs) -> None:
+    """Writes a synthetic output file of (at least) the given size.
+
+    Args:
+        filePath (str): The output file.
+        kind (str): One of `fcd`, `ssm`, or `tripinfo`.
+        targetBytes (int): The size of the file, in bytes.
+        seed (int, optional): The seed of the values. Defaults to 0.
+        **kwargs: Passed on to the element generator, e.g. `vehiclesPerStep` for FCD.
+    """
+    root, elements = KINDS[kind]
+    rng = random.Random(seed)
+    generator = elements(rng, **kwargs)
+    tmpFilePath = f"{filePath}.{os.getpid()}.tmp"
+    with open(tmpFilePath, "w") as f:
+        written = f.write(HEADER + f"<{root}>\n")
+        while written < targetBytes:
+            written += f.write("".join(next(generator)
+                               for _ in range(BLOCK_SIZE)))
+        f.write(f"</{root}>\n")
+    os.replace(tmpFilePath, filePath)
+
+
+def getFile(dataDir: str, kind: str, sizeLabel: str, seed: int = 0, **kwargs) -> str:
+    """Returns the path of a synthetic output file, laid out like the output directory of a case study.
+
+    Args:
+        dataDir (str): The directory of the synthetic files.
+        kind (str): One of `fcd`, `ssm`, or `tripinfo`.
+        sizeLabel (str): The size, e.g. "64MB".
+        seed (int, optional): The seed of the values. Defaults to 0.
+        **kwargs: The arguments of the element generator, e.g. `vehiclesPerStep` for FCD. Files generated with other arguments are kept apart.
+
+    Returns:
+        str: The file.
+    """
+    arguments = "".join(f"_{name}{value}" for name, value in sorted(kwargs.items()))
+    return f"{dataDir}/{FOLDERS[kind]}/{kind}_synthetic_{sizeLabel}_s{seed}{arguments}.xml"
+
+
+def ensureFile(dataDir: str, kind: str, sizeLabel: str, targetBytes: int, seed: int = 0, **kwargs) -> str:
+    """Returns a synthetic output file, generating it only if it doesn't exist yet. See `write`.
+
+    Returns:
+        str: The file.
+    """
+    filePath = getFile(dataDir, kind, sizeLabel, seed, **kwargs)
+    if not os.path.isfile(filePath):
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        write(filePath, kind, targetBytes, seed, **kwargs)
+    return filePath
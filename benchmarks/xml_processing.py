@@ -0,0 +1,255 @@
+"""Benchmarks the post-processing of SUMO output files, on synthetic FCD, SSM, and tripinfo files of growing size.
+
+Every kind of output goes through the stages of the pipeline, each measured in a fresh process:
+
+- stream: `xml_to_csv.iterparse_XML`, chunk by chunk.
+- parse: `xml_to_csv.parse_XML`, into a DataFrame.
+- store: `run_store.convert`, i.e. parsing and writing the columnar file.
+- reduce: `run_store.read`, and the processor's `averageRun` and `aggregateRun`.
+
+For each, the throughput, the time to the first row, and the growth of the
+peak RSS over the process' baseline are recorded. Results are appended to a
+JSON Lines file, tagged with the commit, and compared to those of the last
+other commit benchmarked.
+
+Usage, from the repository root:
+
+    python -m benchmarks.xml_processing --sizes 1MB,64MB,1GB --kinds fcd,ssm,tripinfo
+"""
+import json
+import multiprocessing
+import optparse
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import pandas as pd
+from termcolor import colored
+from src.runner import run_store
+from src.runner.pipeline import PROCESSORS
+from src.utilities import xml_to_csv
+from . import synthetic_outputs
+
+# The stages of the pipeline, in the order they run. Later stages read what earlier ones wrote.
+STAGES = ["stream", "parse", "store", "reduce"]
+
+# Size units, in bytes.
+UNITS = {"GB": 2**30, "MB": 2**20, "KB": 2**10, "B": 1}
+
+# A stage whose peak RSS grew by more than this factor since the last commit is flagged.
+RSS_REGRESSION = 1.5
+
+RESULTS_FILE = "benchmarks/results/xml_processing.jsonl"
+
+
+def parseSize(size: str) -> int:
+    """Returns the number of bytes of a size, e.g. "64MB".
+
+    Args:
+        size (str): The size, in GB, MB, KB, or B.
+
+    Returns:
+        int: The number of bytes.
+    """
+    for unit, factor in UNITS.items():
+        if size.upper().endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def getMaxRss() -> float:
+    """Returns the peak RSS of the current process, in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def measure(stage: str, kind: str, xmlFile: str) -> dict:
+    """Runs a stage of the pipeline on a file. Meant to run in a fresh process, so that its peak RSS is the stage's own.
+
+    Args:
+        stage (str): The stage, in `STAGES`.
+        kind (str): The kind of output.
+        xmlFile (str): The SUMO output file.
+
+    Returns:
+        dict: The duration and time to the first row (in seconds), the number of rows, and the baseline and peak RSS (in MiB).
+    """
+    cols, dtypes = run_store.STORE_COLUMNS[kind]
+    baselineRss = getMaxRss()
+    firstRow = None
+    rows = 0
+
+    tic = time.perf_counter()
+    if stage == "stream":
+        for chunk in xml_to_csv.iterparse_XML(xmlFile, cols, dtypes):
+            if firstRow is None:
+                firstRow = time.perf_counter() - tic
+            rows += len(chunk[cols[0]])
+    elif stage == "parse":
+        rows = len(xml_to_csv.parse_XML(xmlFile, cols, dtypes))
+    elif stage == "store":
+        rows = run_store.convert(xmlFile)
+    elif stage == "reduce":
+        processor = PROCESSORS[kind]
+        data = run_store.read(xmlFile, processor.COLUMNS)
+        processor.averageRun(data)
+        processor.aggregateRun(data, "0", "0", "0")
+        rows = len(data)
+    else:
+        raise ValueError(f"Unknown stage: {stage}.")
+    duration = time.perf_counter() - tic
+
+    return {"seconds": duration, "firstRow": duration if firstRow is None else firstRow,
+            "rows": rows, "baselineRss": baselineRss, "peakRss": getMaxRss()}
+
+
+def getCommit() -> tuple[str, bool]:
+    """Returns the current commit, and whether tracked files were changed since."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+
+def benchmark(kind: str, sizeLabel: str, options) -> list[dict]:
+    """Measures every stage of the pipeline on a synthetic file of a size.
+
+    Args:
+        kind (str): The kind of output.
+        sizeLabel (str): The size of the file, e.g. "64MB".
+        options (optparse.Values): The options. See `get_options`.
+
+    Returns:
+        list[dict]: The results, one per stage.
+    """
+    kwargs = {"vehiclesPerStep": options.fcd_vehicles} if kind == "fcd" else {}
+    xmlFile = synthetic_outputs.ensureFile(options.data_dir, kind, sizeLabel,
+                                           parseSize(sizeLabel), options.seed, **kwargs)
+    sizeMb = os.path.getsize(xmlFile) / 2**20
+
+    rows = []
+    for stage in STAGES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(measure, stage, kind, xmlFile).result()
+        rows.append({
+            "kind": kind,
+            "size": sizeLabel,
+            "stage": stage,
+            "MB": sizeMb,
+            "seconds": result["seconds"],
+            "MB/s": sizeMb / result["seconds"],
+            "rows": result["rows"],
+            "rows/s": result["rows"] / result["seconds"],
+            "first row (s)": result["firstRow"],
+            "peak RSS (MiB)": result["peakRss"] - result["baselineRss"],
+        })
+    return rows
+
+
+def readResults(resultsFile: str) -> pd.DataFrame:
+    """Reads the results of earlier benchmarks.
+
+    Args:
+        resultsFile (str): The JSON Lines file.
+
+    Returns:
+        pd.DataFrame: The results. Empty if there are none.
+    """
+    if not os.path.isfile(resultsFile):
+        return pd.DataFrame()
+    with open(resultsFile) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def writeResults(results: pd.DataFrame, resultsFile: str) -> None:
+    os.makedirs(os.path.dirname(resultsFile) or ".", exist_ok=True)
+    with open(resultsFile, "a") as f:
+        for row in results.to_dict(orient="records"):
+            f.write(json.dumps(row) + "\n")
+
+
+def compare(results: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """Compares results to those of the last other commit benchmarked, by kind, size, and stage.
+
+    Args:
+        results (pd.DataFrame): The current results.
+        previous (pd.DataFrame): The results of earlier benchmarks.
+
+    Returns:
+        pd.DataFrame: The throughput and peak RSS of both, and their ratios. Empty if no other commit was benchmarked.
+    """
+    commit = results["commit"].iloc[0]
+    if previous.empty or not (previous["commit"] != commit).any():
+        return pd.DataFrame()
+    other = previous[previous["commit"] != commit]
+    other = other[other["timestamp"] == other["timestamp"].max()]
+    keys = ["kind", "size", "stage"]
+    merged = results.merge(other, on=keys, suffixes=("", " before"))
+    merged["speedup"] = merged["MB/s"] / merged["MB/s before"]
+    merged["RSS ratio"] = merged["peak RSS (MiB)"] / \
+        merged["peak RSS (MiB) before"].clip(lower=1)
+    return merged[keys + ["commit before", "MB/s before", "MB/s", "speedup",
+                          "peak RSS (MiB) before", "peak RSS (MiB)", "RSS ratio"]]
+
+
+def get_options(args=None):
+    optParser = optparse.OptionParser()
+    optParser.add_option("--sizes", default="1MB,32MB",
+                         help="comma-separated sizes of the synthetic files, e.g. 1MB,512MB,4GB.")
+    optParser.add_option("--kinds", default="fcd,ssm,tripinfo",
+                         help="comma-separated kinds of output to benchmark.")
+    optParser.add_option("--fcd-vehicles", type="int", default=1,
+                         help="number of vehicles per FCD timestep. The case studies record the EV only.")
+    optParser.add_option("--seed", type="int", default=0,
+                         help="seed of the synthetic files.")
+    optParser.add_option("--data-dir", default=f"{tempfile.gettempdir()}/thesis_sumo_benchmarks",
+                         help="directory of the synthetic files, which are reused across benchmarks.")
+    optParser.add_option("--results", default=RESULTS_FILE,
+                         help="JSON Lines file the results are appended to, and compared against.")
+    options, _ = optParser.parse_args(args=args)
+    options.sizes = options.sizes.split(',')
+    options.kinds = options.kinds.split(',')
+    return options
+
+
+def main(options):
+    print(f"\n> Benchmarking the XML post-processing...")
+    commit, dirty = getCommit()
+    timestamp = datetime.now().isoformat(timespec="seconds")
+
+    rows = []
+    for kind in options.kinds:
+        for sizeLabel in options.sizes:
+            rows.extend(benchmark(kind, sizeLabel, options))
+            stream = rows[-len(STAGES)]
+            print(
+                f"""\t{colored('[✓]', 'green')} {kind} ({colored(sizeLabel, 'yellow')}): streamed at ({colored(f"{stream['MB/s']:0.1f}", 'red')}) MB/s.""")
+
+    results = pd.DataFrame(rows)
+    results.insert(0, "commit", commit)
+    results.insert(1, "dirty", dirty)
+    results.insert(2, "timestamp", timestamp)
+    print(results.drop(columns=["commit", "dirty", "timestamp"]).to_string(
+        index=False, float_format=lambda value: f"{value:0.3f}"))
+
+    comparison = compare(results, readResults(options.results))
+    if not comparison.empty:
+        print(f"\n> Compared to commit {comparison['commit before'].iloc[0]}:")
+        print(comparison.drop(columns=["commit before"]).to_string(
+            index=False, float_format=lambda value: f"{value:0.3f}"))
+        for row in comparison[comparison["RSS ratio"] > RSS_REGRESSION].to_dict(orient="records"):
+            print(
+                f"""{colored('[✗]', 'red')} Peak RSS of {row['kind']} ({row['size']}) {row['stage']} grew ({colored(f"{row['RSS ratio']:0.1f}x", 'red')}).""")
+
+    writeResults(results, options.results)
+    print(f"""{colored('[✓]', 'green')} Results appended to {options.results}.""")
+
+
+if __name__ == "__main__":
+    main(get_options())
@@ -12,8 +12,11 @@ from src.utilities import generate_graph_bar, generate_graph_conflict_heatmap as
 from src.utilities import generate_graph_scatter as scatterGraph
 from src.utilities import generate_graph_bar as barGraph
 from sumolib import checkBinary  # noqa
-from src.runner import generate_graphs, process_FCDs, process_tripinfo, run_simulation, process_conflicts
-from pathlib import Path
+from src.models.TerminationPolicy import TerminationPolicy
+from src.models.ProximityEngine import ProximityEngine, LANE_RELATIONS
+from src.models.Simulation import FCD_FORMATS
+from src.runner import generate_graphs, run_simulation, manifest, completion, pipeline, catalog, adaptive, run_store
+import random
 import time
 import pandas as pd
 from typing import Callable
@@ -37,45 +40,15 @@ reruns = 30  # The number of times to rerun the same simulation
 caseStudyDir = "src/case_study_real_world"
 
 
-def filter(string, substr):
-    return [str for str in string if any(sub in str for sub in substr)]
-
-
-def aggregateData(dataDirName: str, title: str, aggregator: Callable):
-    dataDir = f"{caseStudyDir}/output/{dataDirName}"
-    fileNames = os.listdir(dataDir)
-    files = [
-        f"{dataDir}/{fileName}" for fileName in fileNames]
-    aggregator(
-        files, f"{caseStudyDir}/output/agg/{title.lower()}.csv")
-    print(
-        f"\t{colored('[✓]', 'green')} {title.upper()} aggregation complete.")
-
-
-def averageData(demand: int, penetrationRatio: str, dirName: str, title: str, averager: Callable):
-    # FIXME - make modular. Inject averageResults function.
-    dataDir = f"{caseStudyDir}/output/{dirName}"
-    fileNames = filter(os.listdir(dataDir), [
-        f"{title.lower()}_d{demand}_p{penetrationRatio}"])
-    files = [
-        f"{dataDir}/{fileName}" for fileName in fileNames]
-
-    outputFile = f"{caseStudyDir}/output/stats/{title.lower()}_d{demand}_p{penetrationRatio}.csv"
-    averager(
-        files, outputFile)
-    print(
-        f"\t{colored('[✓]', 'green')} {title.upper()} ({colored(f'd{demand}','magenta')}_{colored(f'p{penetrationRatio}', 'cyan')}) processing complete.")
-
-
 def generateReport(inputDirName: str, title: str, reporter: Callable):
+    # The stat file of every (demand, penetration) cell with completed runs.
     dir = f"{caseStudyDir}/output/{inputDirName}"
-    fileNames = filter(os.listdir(dir), [
-        f"{title.lower()}"])
-    files = [
-        f"{dir}/{fileName}" for fileName in fileNames]
-    print(f"file count: {len(files)}")
+    runs = catalog.queryRuns(catalog.readCatalog(f"{caseStudyDir}/output"))
+    cellFiles = {(demand, penetrationRatio): f"{dir}/{title.lower()}_d{demand}_p{penetrationRatio}.csv"
+                 for demand, penetrationRatio in catalog.getCells(runs)}
+    print(f"file count: {len(cellFiles)}")
     outputFileName = f"{caseStudyDir}/output/{title.lower()}_report.csv"
-    reporter(files, outputFileName)
+    reporter(cellFiles, outputFileName)
     print(
         f"""\t{colored('[✓]', 'green')} {title.upper()} report generation complete.""")
 
@@ -101,8 +74,8 @@ def mergeAllData():
 def main(sumoBinary, options):
     """Generates all prerequisite files to run the simulation, export data, and process the data."""
 
-    # Delete all the previous output data.
-    if options.nosim == False:
+    # Delete all the previous output data, unless (re)running part of an existing sweep.
+    if options.nosim == False and not options.manifest and not options.runs and not options.resume:
         clearOutputDirectory()
 
     totalTic = time.perf_counter()
@@ -111,58 +84,81 @@ def main(sumoBinary, options):
 
     # Get all penetration vType distribution files.
     path = "src/config/vTypes"
-    fileNames = os.listdir(path)
+    fileNames = sorted(os.listdir(path))
     vTypeFiles = [f'{path}/{name}' for name in fileNames]
     # vTypeFiles = ["src/config/vTypes/100_0.add.xml"]
 
-    # Run grid network x100 at 1000 veh/hr and 0% CVs, average the outputs, aggregrate the SSM data. Repeat for 25%, 50%, 75%, and 100% CVs. Repeat for 1500 veh/hr and 2000 veh/hr.
-    for dIndex, demand in enumerate(demands):
+    # Describe every run, and all of its random inputs, up front.
+    manifestFile = f"{caseStudyDir}/output/manifest.jsonl"
+    if options.manifest:
+        jobs = manifest.readManifest(options.manifest)
+    elif (options.nosim or options.resume) and os.path.isfile(manifestFile):
+        jobs = manifest.readManifest(manifestFile)
+    else:
+        seed = options.seed if options.seed is not None else random.randrange(2**31)
+        familySize = options.familySize if options.warmStart else None
+        jobs = manifest.createManifest(
+            demands, vTypeFiles, reruns, seed, familySize)
+        manifest.writeManifest(jobs, manifestFile)
+        print(
+            f"""\t> Wrote manifest of ({colored(len(jobs), 'yellow')}) runs with seed ({colored(seed, 'yellow')}) to {manifestFile}.""")
+
+    # Decide when each simulation stops.
+    termination = TerminationPolicy(
+        None if options.stopAfterEv < 0 else options.stopAfterEv, options.stepBudget, options.stopWithoutSsm)
+    # Decide which vehicles halt around the EV, if any.
+    proximity = ProximityEngine(options.haltDownstream, options.haltUpstream,
+                                options.haltLanes) if options.halting else None
+    # Runs completed with other settings aren't complete for these.
+    settings = run_simulation.getRunSettings(termination, proximity)
+    jobs = [{**job, "settings": settings} for job in jobs]
+    scheduledJobs = manifest.filterJobs(jobs, options.runs)
+
+    # Skip runs that already completed, with intact outputs.
+    completedJobs = []
+    if options.resume and options.nosim == False:
+        pendingJobs = completion.getPendingJobs(
+            scheduledJobs, f"{caseStudyDir}/output")
         print(
-            f"""\t> Applying traffic demand ({colored(f'{dIndex+1}', 'magenta')} / {colored(f'{len(demands)}', 'magenta')})...""")
+            f"""\t> Resuming: ({colored(len(scheduledJobs) - len(pendingJobs), 'green')}) runs complete, ({colored(len(pendingJobs), 'yellow')}) to run.""")
+        completedJobs = [job for job in scheduledJobs if job not in pendingJobs]
+        scheduledJobs = pendingJobs
 
-        for vIndex, vTypeFile in enumerate(vTypeFiles):
-            print(
-                f"""\t\t> Applying CV penetration rate ({colored(f'{vIndex+1}', 'cyan')} / {colored(f'{len(vTypeFiles)}', 'cyan')})...""")
-
-            temp = Path(vTypeFile)
-            penetrationRatio = temp.stem.replace('.add', '')
-
-            for runNum in list(range(reruns)):
-                print(
-                    f"""\t\t\t> Starting run ({colored(f'{runNum+1}', 'yellow')} / {colored(f'{reruns}', 'yellow')})...""")
-
-                prefix = f"d{demand}_p{penetrationRatio}_r{runNum}"
-                runStats = {"current": runNum, "total": reruns}
-                if options.nosim == False:
-                    tic = time.perf_counter()
-                    # run_simulation.runGrid(
-                    #     sumoBinary, vTypeFile, demand, prefix, runNum, runStats)
-                    run_simulation.runRealWorld(
-                        sumoBinary, vTypeFile, demand, prefix, runNum, runStats)
-                    toc = time.perf_counter()
-                    print(
-                        f"""SUMO took ({colored(f"{toc-tic:0.4f}", "red")}) seconds.""")
-
-            # Average the results for each rerun.
+    def runBatch(batch: list[dict]) -> None:
+        if options.jobs > 1:
+            # Dispatch all independent runs to a pool of worker processes.
             print(
-                f"\t\t> Averaging ({colored(f'd{demand}','magenta')}_{colored(f'p{penetrationRatio}', 'cyan')}) files...")
-            averageData(demand, penetrationRatio, "ssm", "ssm",
-                        process_conflicts.averageResults)
-            averageData(demand, penetrationRatio, "dump", "tripinfo",
-                        process_tripinfo.averageResults)
-            averageData(demand, penetrationRatio, "fcd", "fcd",
-                        process_FCDs.averageResults)
+                f"""\t> Running ({colored(len(batch), 'yellow')}) simulations across ({colored(options.jobs, 'yellow')}) workers...""")
+            run_simulation.runSweep(
+                sumoBinary, batch, options.jobs, options.fcdFormat, termination, options.reuseSumo, options.profile, proximity)
+        else:
+            run_simulation.runSequential(
+                sumoBinary, batch, options.fcdFormat, termination, options.reuseSumo, options.profile, proximity)
+
+    if options.nosim == False:
+        if options.adaptive:
+            # Only rerun each cell until its results converge.
+            adaptive.runAdaptive(runBatch, manifest.filterJobs(jobs, options.runs), f"{caseStudyDir}/output",
+                                 options.ciWidth, options.minRuns, options.maxRuns or reruns,
+                                 metrics=options.ciMetrics, completedJobs=completedJobs)
+        else:
+            runBatch(scheduledJobs)
 
     totalToc = time.perf_counter()
     print(
         f"""\n{colored('[✓]', 'green')} All experiments completed in ({colored(f"{totalToc-totalTic:0.4f}", "red")}) seconds.""")
 
-    # Aggregate all data into a single CSV file.
+    # Average the results of all reruns, for each (demand, penetration) cell, and
+    # aggregate all data into a single CSV file per kind, in a single pass over the runs.
     print(
-        f"\n> Aggregating dump files...")
-    aggregateData("dump", "tripinfo", process_tripinfo.aggregate)
-    aggregateData("ssm", "ssm", process_conflicts.aggregate)
-    aggregateData("fcd", "fcd", process_FCDs.aggregate)
+        f"\n> Processing output files...")
+    # Runs from before the run catalog existed are added to it first.
+    added = catalog.update(jobs, f"{caseStudyDir}/output")
+    if added:
+        print(
+            f"""\t> Cataloged ({colored(added, 'yellow')}) earlier runs.""")
+    pipeline.run(jobs, f"{caseStudyDir}/output",
+                 options.resume, options.processJobs)
     mergeAllData()
 
     # Aggregate statistics into single report.
@@ -179,11 +175,16 @@ def clearOutputDirectory():
                f"{caseStudyDir}/output/dump",
                f"{caseStudyDir}/output/fcd",
                f"{caseStudyDir}/output/graphs",
-               f"{caseStudyDir}/output/agg"]
+               f"{caseStudyDir}/output/agg",
+               f"{caseStudyDir}/output/logs",
+               f"{caseStudyDir}/output/done",
+               f"{caseStudyDir}/output/store",
+               f"{caseStudyDir}/output/profile"]
 
     print(f"""> Deleting old data...""")
 
     for folder in folders:
+        os.makedirs(folder, exist_ok=True)
         for fileName in os.listdir(folder):
             filePath = os.path.join(folder, fileName)
             try:
@@ -203,7 +204,64 @@ def get_options():
                          default=False, help="run the commandline version of SUMO.")
     optParser.add_option("--nosim", action="store_true",
                          default=False, help="only reprocess old data.")
+    optParser.add_option("--jobs", type="int", default=1,
+                         help="number of simulations to run in parallel, each in its own worker process.")
+    optParser.add_option("--process-jobs", dest="processJobs", type="int", default=1,
+                         help="number of worker processes reading output files in parallel, when processing the results (also with --nosim).")
+    optParser.add_option("--seed", type="int", default=None,
+                         help="master seed of a new job manifest. Random by default.")
+    optParser.add_option("--manifest", default=None,
+                         help="run the jobs of an existing manifest file, instead of creating a new one.")
+    optParser.add_option("--resume", action="store_true", default=False,
+                         help="only run jobs without intact outputs, and only reprocess changed outputs.")
+    optParser.add_option("--runs", default=None,
+                         help="comma-separated run prefixes (e.g. d1500_p25_75_r3) to run. Defaults to all runs of the manifest.")
+    optParser.add_option("--adaptive", action="store_true", default=False,
+                         help="rerun each (demand, penetration) cell only until the confidence intervals of its EV travel time, time loss, and conflict counts are narrow enough.")
+    optParser.add_option("--ci-width", dest="ciWidth", type="float", default=0.05,
+                         help="target half-width of the 95% confidence intervals in adaptive mode, relative to the mean. Defaults to 0.05 (±5%).")
+    optParser.add_option("--min-runs", dest="minRuns", type="int", default=5,
+                         help="minimum number of reruns per cell in adaptive mode.")
+    optParser.add_option("--max-runs", dest="maxRuns", type="int", default=None,
+                         help="maximum number of reruns per cell in adaptive mode. Defaults to all reruns of the manifest.")
+    optParser.add_option("--ci-metrics", dest="ciMetrics", default=",".join(adaptive.METRICS),
+                         help="comma-separated metrics that have to converge in adaptive mode. Defaults to all of: " + ", ".join(adaptive.METRICS) + ".")
+    optParser.add_option("--stop-after-ev", dest="stopAfterEv", type="float", default=0,
+                         help="seconds each simulation continues after the EV left the network. Negative to continue until the network is empty.")
+    optParser.add_option("--stop-without-ssm", dest="stopWithoutSsm", action="store_true", default=False,
+                         help="stop each simulation once no vehicle with an SSM device (has.ssm.device) is left on the network, after the SSM extratime. Only the EV vType carries one; combine with --stop-after-ev -1 to stop on this alone.")
+    optParser.add_option("--step-budget", dest="stepBudget", type="int", default=None,
+                         help="maximum number of steps of each simulation.")
+    optParser.add_option("--fcd-format", dest="fcdFormat", type="choice", choices=list(FCD_FORMATS), default="xml",
+                         help="format of the EV's FCD: SUMO's xml or parquet output, or traci to capture it through TraCI into a compact .npz file, for SUMO builds without Parquet output. Defaults to xml.")
+    optParser.add_option("--warm-start", dest="warmStart", action="store_true", default=False,
+                         help="start the runs of a new manifest from a saved state of the network at the start of the EV insertion window, simulated once per seed family.")
+    optParser.add_option("--family-size", dest="familySize", type="int", default=manifest.FAMILY_SIZE,
+                         help=f"number of reruns per seed family with --warm-start. The runs of a family share their traffic, so a cell has as many independent samples as families. Defaults to {manifest.FAMILY_SIZE}.")
+    optParser.add_option("--reuse-sumo", dest="reuseSumo", action="store_true", default=False,
+                         help="keep one SUMO process alive per worker, and load each run into it, instead of starting SUMO for every run.")
+    optParser.add_option("--profile", action="store_true", default=False,
+                         help="record the time spent in each phase of every simulation step, and the TraCI commands issued, under output/profile.")
+    optParser.add_option("--halting", action="store_true", default=False,
+                         help="halt the vehicles around the EV while it drives.")
+    optParser.add_option("--halt-downstream", dest="haltDownstream", type="float", default=25,
+                         help="meters ahead of the EV within which vehicles halt, with --halting.")
+    optParser.add_option("--halt-upstream", dest="haltUpstream", type="float", default=50,
+                         help="meters behind the EV within which vehicles halt, with --halting.")
+    optParser.add_option("--halt-lanes", dest="haltLanes", type="choice", choices=LANE_RELATIONS, default="edge",
+                         help="lanes on which vehicles halt, with --halting: the EV's lane, any lane of its edge, or any lane. One of: " + ", ".join(LANE_RELATIONS) + ".")
     options, _ = optParser.parse_args()
+
+    if options.runs:
+        options.runs = options.runs.split(',')
+
+    options.ciMetrics = options.ciMetrics.split(',')
+    unknownMetrics = set(options.ciMetrics) - set(adaptive.METRICS)
+    if unknownMetrics:
+        optParser.error(f"unknown --ci-metrics: {', '.join(sorted(unknownMetrics))}")
+    if options.fcdFormat == "parquet" and run_store.pa is None:
+        optParser.error("--fcd-format parquet needs pyarrow")
+
     return options
 
 
@@ -1,30 +1,163 @@
 from .Vehicle import Vehicle
 
-# List of currently halted vehicles.
-haltedVehicles: set[Vehicle] = set()
-
 
 class Detour:
-    # TODO: track modified routes, and allow reverting.
-    def detourVehicles(vehicles: set[Vehicle], evRoute: set[str]):
+    """Detours CVs away from the future route of the EV.
+
+    Keeps an inverted index of edge -> CVs whose route uses the edge, and
+    remembers which edges each CV already avoids. Work is only done for CVs
+    whose route changed, or that use an edge newly added to the EV route,
+    and each such CV is rerouted at most once per change.
+
+    Every avoided edge is recorded in a ledger, so that it can be restored once
+    the EV has passed the edge or left the network.
+    """
+
+    def __init__(self) -> None:
+        # The edges of the EV's future route, as of the last update.
+        self.evRoute: set[str] = set()
+        # The last seen route of each CV, keyed by vehicle ID.
+        self.routes: dict[str, tuple[str]] = {}
+        # Inverted index of edge ID -> IDs of the CVs whose route uses it.
+        self.edgeIndex: dict[str, set[str]] = {}
+        # The edges each CV has already been told to avoid, keyed by vehicle ID.
+        self.avoidedEdges: dict[str, set[str]] = {}
+        # Reverse ledger of edge ID -> IDs of the CVs avoiding it.
+        self.avoidedBy: dict[str, set[str]] = {}
+
+    def detourVehicles(self, vehicles: dict[str, Vehicle], evRoute: set[str]) -> None:
         """Reroutes all vehicles whose route shares edges with the EV route.
 
         Args:
-            vehicles (set[Vehicle]): The vehicles to reroute.
+            vehicles (dict[str, Vehicle]): The vehicles to reroute, keyed by ID.
             evRoute (set[str]): The route of the EV.
         """
         # FIXME: Roads of opposite directions are considered different edges, and thus can't simply be compared for incoming traffic. If I want to reserve the entire road, I'll need an alternative approach.
 
-        # Go through routes of each CV. Compare against EV.
-        for veh in vehicles:
-            futureRoute = veh.getFutureRoute()
+        evEdges = set(evRoute)
+        newEvEdges = evEdges - self.evRoute
+        passedEdges = self.evRoute - evEdges
+        self.evRoute = evEdges
+
+        # The EV no longer needs the edges it passed.
+        if passedEdges:
+            self.revertEdges(vehicles, passedEdges)
+
+        # CVs whose route changed since the last update need a fresh look.
+        candidates: dict[str, Vehicle] = {}
+        for vehId, veh in vehicles.items():
+            route = veh.getRoute()
+            if route != self.routes.get(vehId):
+                self.indexRoute(vehId, route)
+                candidates[vehId] = veh
+
+        # Other CVs only need a look if they use an edge the EV route gained.
+        # A shrinking EV route can't create new shared edges.
+        for edgeId in newEvEdges:
+            for vehId in self.edgeIndex.get(edgeId, ()):
+                if vehId not in candidates and vehId in vehicles:
+                    candidates[vehId] = vehicles[vehId]
+
+        # Go through routes of each candidate CV. Compare against EV.
+        for vehId, veh in candidates.items():
+            avoidedEdges = self.avoidedEdges.get(vehId, ())
             sharedEdges = [
-                cvEdge for cvEdge in futureRoute if cvEdge in evRoute]
+                cvEdge for cvEdge in veh.getFutureRoute() if cvEdge in evEdges and cvEdge not in avoidedEdges]
+            if not sharedEdges:
+                continue
 
-            # Increase travel time for all shared roads.
+            # Increase travel time for all newly shared roads.
             for edgeId in sharedEdges:
                 veh.setAvoidEdge(edgeId)
+                self.avoidedBy.setdefault(edgeId, set()).add(vehId)
+            self.avoidedEdges.setdefault(vehId, set()).update(sharedEdges)
+
+            # Recalculate route, once.
+            veh.recalculateRoute()
+
+    def indexRoute(self, vehId: str, route: tuple[str]) -> None:
+        """Replaces the indexed route of a CV.
+
+        Args:
+            vehId (str): ID of the vehicle.
+            route (tuple[str]): The vehicle's new route.
+        """
+        self.unindexRoute(vehId)
+        self.routes[vehId] = route
+        for edgeId in route:
+            self.edgeIndex.setdefault(edgeId, set()).add(vehId)
+
+    def unindexRoute(self, vehId: str) -> None:
+        """Removes the indexed route of a CV, if any.
+
+        Args:
+            vehId (str): ID of the vehicle.
+        """
+        for edgeId in self.routes.pop(vehId, ()):
+            vehIds = self.edgeIndex.get(edgeId)
+            if vehIds is None:
+                continue
+            vehIds.discard(vehId)
+            if not vehIds:
+                del self.edgeIndex[edgeId]
 
-            # Recalculate route, if necessary.
-            if sharedEdges:
-                veh.recalculateRoute()
+    def removeVehicles(self, vehIds: list[str]) -> None:
+        """Forgets all state kept for vehicles that left the network.
+
+        Args:
+            vehIds (list[str]): IDs of the vehicles.
+        """
+        for vehId in vehIds:
+            self.unindexRoute(vehId)
+            for edgeId in self.avoidedEdges.pop(vehId, ()):
+                self.forgetAvoidance(vehId, edgeId)
+
+    def revertEdges(self, vehicles: dict[str, Vehicle], edgeIds: set[str]) -> None:
+        """Restores the original travel time of the given edges, for every CV avoiding them.
+        Each affected CV is rerouted once, after all of its edges are restored.
+
+        Args:
+            vehicles (dict[str, Vehicle]): The vehicles currently on the network, keyed by ID.
+            edgeIds (set[str]): The edges to restore.
+        """
+        # Group the edges to restore by vehicle.
+        reverts: dict[str, list[str]] = {}
+        for edgeId in edgeIds:
+            for vehId in self.avoidedBy.pop(edgeId, ()):
+                reverts.setdefault(vehId, []).append(edgeId)
+
+        for vehId, revertedEdges in reverts.items():
+            avoidedEdges = self.avoidedEdges[vehId]
+            avoidedEdges.difference_update(revertedEdges)
+            if not avoidedEdges:
+                del self.avoidedEdges[vehId]
+
+            veh = vehicles.get(vehId)
+            if veh is None:
+                continue
+            for edgeId in revertedEdges:
+                veh.clearAvoidEdge(edgeId)
+            veh.recalculateRoute()
+
+    def revertAll(self, vehicles: dict[str, Vehicle]) -> None:
+        """Restores the original travel times of all avoided edges, and forgets the EV route.
+
+        Args:
+            vehicles (dict[str, Vehicle]): The vehicles currently on the network, keyed by ID.
+        """
+        self.revertEdges(vehicles, set(self.avoidedBy))
+        self.evRoute = set()
+
+    def forgetAvoidance(self, vehId: str, edgeId: str) -> None:
+        """Removes a single entry from the reverse ledger.
+
+        Args:
+            vehId (str): ID of the vehicle.
+            edgeId (str): ID of the avoided edge.
+        """
+        vehIds = self.avoidedBy.get(edgeId)
+        if vehIds is None:
+            return
+        vehIds.discard(vehId)
+        if not vehIds:
+            del self.avoidedBy[edgeId]
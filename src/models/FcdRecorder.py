@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pandas as pd
+import traci.constants as tc
+
+# Variables subscribed to for each recorded vehicle, on top of its usual subscription.
+RECORDED_VARIABLES = [tc.VAR_SPEED, tc.VAR_POSITION]
+
+# The recorded columns, and their types.
+COLUMNS = {"time": np.float64, "id": np.str_,
+           "speed": np.float64, "x": np.float64, "y": np.float64}
+
+
+class FcdRecorder:
+    """Records floating car data (FCD) from TraCI subscriptions, in place of SUMO's `--fcd-output`.
+
+    Only the values needed downstream are kept, and written once as a compressed
+    NumPy archive with one array per column, rather than streamed out as XML.
+    """
+
+    def __init__(self) -> None:
+        self.rows: list[tuple] = []
+
+    def record(self, time: float, vehId: str, values: dict) -> None:
+        """Records the state of a vehicle at the current step.
+
+        Args:
+            time (float): The current simulation time, in seconds.
+            vehId (str): ID of the vehicle.
+            values (dict): The vehicle's subscribed values. Must include `RECORDED_VARIABLES`.
+        """
+        x, y = values[tc.VAR_POSITION]
+        self.rows.append((time, vehId, values[tc.VAR_SPEED], x, y))
+
+    def write(self, filePath: str) -> None:
+        """Writes all recorded rows to a `.npz` file.
+
+        Args:
+            filePath (str): The output file.
+        """
+        columns = list(zip(*self.rows)) or [[]] * len(COLUMNS)
+        arrays = {name: np.array(values, dtype=dtype)
+                  for (name, dtype), values in zip(COLUMNS.items(), columns)}
+
+        tmpFilePath = f"{filePath}.{os.getpid()}.tmp"
+        with open(tmpFilePath, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmpFilePath, filePath)
+
+
+def read(filePath: str, cols: list[str]) -> pd.DataFrame:
+    """Reads the columns of a file written by `FcdRecorder.write`.
+
+    Args:
+        filePath (str): The `.npz` file.
+        cols (list[str]): The columns to read.
+
+    Returns:
+        pd.DataFrame: The columns.
+    """
+    with np.load(filePath) as arrays:
+        return pd.DataFrame({col: arrays[col].astype(object) if col == "id" else arrays[col] for col in cols})
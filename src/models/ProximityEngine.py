@@ -0,0 +1,98 @@
+import itertools
+import math
+import numpy as np
+import traci.constants as tc
+
+# Variables subscribed to for every vehicle, on top of its usual subscription, to locate it.
+PROXIMITY_VARIABLES = [tc.VAR_POSITION, tc.VAR_LANE_ID]
+
+# Variables subscribed to for the EV, on top of `PROXIMITY_VARIABLES`, to tell its heading and whether it moves.
+EV_PROXIMITY_VARIABLES = [tc.VAR_ANGLE, tc.VAR_SPEED]
+
+# How a vehicle's lane has to relate to the EV's lane to count as nearby:
+# its very lane, any lane of its edge, or any lane at all (e.g. of the opposite direction, or a crossing).
+LANE_RELATIONS = ["lane", "edge", "any"]
+
+
+def findWithinRadius(positions: np.ndarray, x: float, y: float, radius: float) -> np.ndarray:
+    """Returns the vehicles within a radius of a point.
+
+    Args:
+        positions (np.ndarray): The (x, y) positions of the vehicles, in meters. Shape (n, 2).
+        x (float): The x coordinate of the point.
+        y (float): The y coordinate of the point.
+        radius (float): The radius, in meters.
+
+    Returns:
+        np.ndarray: The indices of the vehicles, into `positions`.
+    """
+    offsets = positions - (x, y)
+    return np.flatnonzero(np.einsum("ij,ij->i", offsets, offsets) <= radius**2)
+
+
+class ProximityEngine:
+    """Finds the vehicles around the EV, from the positions and lanes subscribed to for every vehicle.
+
+    Vehicles count as nearby if they are at most `downstreamDist` meters ahead
+    of the EV, or `upstreamDist` meters behind it, along its heading, and
+    their lane relates to the EV's lane as given by `lanes` (see
+    `LANE_RELATIONS`). The positions of all vehicles are gathered into one
+    array per step, and filtered with array operations, rather than compared
+    vehicle by vehicle.
+    """
+
+    def __init__(self, downstreamDist: float = 25, upstreamDist: float = 50, lanes: str = "edge") -> None:
+        if lanes not in LANE_RELATIONS:
+            raise ValueError(
+                f"Unknown lane relation: {lanes}. Expected one of: {', '.join(LANE_RELATIONS)}.")
+        # The distance ahead of the EV, in meters.
+        self.downstreamDist = downstreamDist
+        # The distance behind the EV, in meters.
+        self.upstreamDist = upstreamDist
+        # How a vehicle's lane has to relate to the EV's lane.
+        self.lanes = lanes
+
+    @property
+    def radius(self) -> float:
+        """The distance beyond which no vehicle is nearby, in meters."""
+        return max(self.downstreamDist, self.upstreamDist)
+
+    def findNearby(self, results: dict[str, dict], evId: str) -> set[str]:
+        """Returns the vehicles around the EV.
+
+        Args:
+            results (dict[str, dict]): The subscribed values of every vehicle on the network, keyed by ID, incl. `PROXIMITY_VARIABLES`. See `VehicleRegistry.results`.
+            evId (str): ID of the EV. Its values must include `EV_PROXIMITY_VARIABLES`.
+
+        Returns:
+            set[str]: The IDs of the nearby vehicles, without the EV.
+        """
+        ids = list(results)
+        values = list(results.values())
+        positions = np.fromiter(itertools.chain.from_iterable(value[tc.VAR_POSITION] for value in values),
+                                dtype=np.float64, count=2 * len(values)).reshape(-1, 2)
+        evValues = results[evId]
+        evX, evY = evValues[tc.VAR_POSITION]
+
+        candidates = findWithinRadius(positions, evX, evY, self.radius)
+
+        # Project onto the EV's heading. SUMO's angles are in degrees, clockwise from north.
+        heading = math.radians(evValues[tc.VAR_ANGLE])
+        offsets = positions[candidates] - (evX, evY)
+        ahead = offsets @ np.array([math.sin(heading), math.cos(heading)])
+        mask = (ahead <= self.downstreamDist) & (ahead >= -self.upstreamDist)
+
+        if self.lanes != "any":
+            lanes = np.array([values[i][tc.VAR_LANE_ID]
+                             for i in candidates], dtype=object)
+            evLane = evValues[tc.VAR_LANE_ID]
+            if self.lanes == "lane":
+                mask &= lanes == evLane
+            else:
+                edges = np.array([lane.rpartition("_")[0]
+                                 for lane in lanes], dtype=object)
+                mask &= edges == evLane.rpartition("_")[0]
+
+        nearbyIds = {ids[i] for i in candidates[mask]}
+        nearbyIds.discard(evId)
+        return nearbyIds
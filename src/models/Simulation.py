@@ -1,10 +1,17 @@
+import contextlib
 from enum import Enum
-import subprocess
+import os
 import random
-import traci
-import randomTrips
-from .Vehicle import Vehicle, EmergencyVehicle
+from .TraciProxy import traci
+import traci.constants as tc
+from .Vehicle import Vehicle, EmergencyVehicle, SLOW_DOWN_DURATION
+from .VehicleRegistry import VehicleRegistry
 from .Detour import Detour
+from .ProximityEngine import ProximityEngine, PROXIMITY_VARIABLES, EV_PROXIMITY_VARIABLES
+from .FcdRecorder import FcdRecorder, RECORDED_VARIABLES
+from .TerminationPolicy import TerminationPolicy, readSsmTypes
+from .SumoSession import SumoSession
+from .StepProfiler import StepProfiler
 from termcolor import colored
 
 
@@ -14,127 +21,343 @@ class EV_State(Enum):
     COMPLETE = 2
 
 
+# The formats of the FCD, and the extensions of their files. SUMO outputs `xml` and `parquet` itself.
+# `traci` is captured through TraCI instead (see `FcdRecorder`), for SUMO builds without Parquet output.
+FCD_FORMATS = {"xml": "xml", "parquet": "parquet", "traci": "npz"}
+
+
+def getOutputFiles(outputDir: str, prefix: str, fcdFormat: str = "xml") -> dict[str, str]:
+    """Returns the output files SUMO writes for a run, by kind.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+        prefix (str): The run prefix.
+        fcdFormat (str, optional): The format of the FCD. One of `FCD_FORMATS`. Defaults to `xml`.
+
+    Returns:
+        dict[str, str]: The `tripinfo`, `ssm`, and `fcd` output files.
+    """
+    return {
+        "tripinfo": f"{outputDir}/dump/tripinfo_{prefix}.xml",
+        "ssm": f"{outputDir}/ssm/ssm_{prefix}.xml",
+        "fcd": f"{outputDir}/fcd/fcd_{prefix}.{FCD_FORMATS[fcdFormat]}",
+    }
+
+
+def findOutputFiles(outputDir: str, prefix: str) -> dict[str, str]:
+    """Returns the output files of a completed run, with the FCD file in whichever format was written.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+        prefix (str): The run prefix.
+
+    Returns:
+        dict[str, str]: The `tripinfo`, `ssm`, and `fcd` output files.
+    """
+    for fcdFormat in FCD_FORMATS:
+        files = getOutputFiles(outputDir, prefix, fcdFormat)
+        if os.path.isfile(files["fcd"]):
+            return files
+    return getOutputFiles(outputDir, prefix)
+
+
+def getSumoCommand(sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, outputFiles: dict[str, str], logFilePath: str, sumoSeed: int = None) -> list[str]:
+    """Returns the command line of a SUMO run.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        networkFilePath (str): The network file.
+        vTypeFilePath (str): The vType distribution file.
+        tripFilePath (str): The trip file.
+        outputFiles (dict[str, str]): The `tripinfo` and `ssm` output files, and the `fcd` output file, if SUMO outputs the FCD. Its extension sets its format.
+        logFilePath (str): The log file.
+        sumoSeed (int, optional): The seed of SUMO's random number generators. Defaults to SUMO's fixed default seed.
+
+    Returns:
+        list[str]: The command.
+    """
+    # Without a seed, SUMO uses its fixed default seed.
+    seedOptions = [] if sumoSeed is None else ['--seed', str(sumoSeed)]
+    fcdOptions = [] if "fcd" not in outputFiles else [
+        '--device.fcd.probability', '0',
+        '--fcd-output', outputFiles["fcd"]]
+    # Parquet columns are named after the attributes alone (e.g. `speed`, rather than `vehicle_speed`), as in the XML.
+    if outputFiles.get("fcd", "").endswith(".parquet"):
+        fcdOptions += ['--output.column-header', 'plain']
+    return [
+        sumoBinary,
+        '--net-file', networkFilePath,
+        '--route-files', tripFilePath,
+        '--additional-files', vTypeFilePath,
+        '--gui-settings-file', 'src/config/viewSettings.xml',
+        '--device.ssm.file', outputFiles["ssm"],
+        '--device.ssm.thresholds', '1.5',
+        # '--statistic-output', f'{outputDir}/dump/stats_{prefix}.xml',
+        # '--netstate-dump', f'{outputDir}/dump/netstate_{prefix}.xml',
+        '--device.tripinfo.probability', '0',
+        '--tripinfo-output', outputFiles["tripinfo"],
+        '--start',
+        '--end', '3600',
+        '--quit-on-end',
+        # '--verbose',
+        '--lateral-resolution', '0.01',
+        *fcdOptions,
+        # '--delay', '100',
+        '--device.rerouting.threads', '8',
+        '--time-to-impatience', '10',
+        # '--random',
+        '--no-warnings', 'true',
+        '--duration-log.disable', 'true',
+        '--no-step-log', 'true',
+        '--log', logFilePath,
+        *seedOptions
+    ]
+
+
 class Simulation:
 
-    def __init__(self, evTrip) -> None:
+    def __init__(self, evTrip, fcdFormat: str = "xml", termination: TerminationPolicy = None, session: SumoSession = None, profile: bool = False, proximity: ProximityEngine = None) -> None:
         # The origin and dest edges for the EV.
         self.evTrip = evTrip
         # The vehicle type ID for CVs.
         self.cvId = "Connected"
-        # List of vehicles currently on the network.
-        self.allVehicles: set[Vehicle] = set()
-        # List of CVs.
-        self.connectedVehicles: set[Vehicle] = set()
+        # The format of the FCD. See `FCD_FORMATS`.
+        self.fcdFormat = fcdFormat
+        # Records the FCD of the EV through TraCI, instead of SUMO's output.
+        self.fcdRecorder = FcdRecorder() if fcdFormat == "traci" else None
+        # Finds the vehicles around the EV, to halt them. Vehicles aren't halted without it.
+        self.proximity = proximity
+        # Registry of vehicles currently on the network, incl. CVs and the EV.
+        # Halting needs the positions of every vehicle, delivered in the same batch as their other values.
+        self.vehicles = VehicleRegistry(
+            self.cvId,
+            evVariables=(RECORDED_VARIABLES if self.fcdRecorder is not None else []) +
+            (EV_PROXIMITY_VARIABLES if proximity is not None else []),
+            variables=PROXIMITY_VARIABLES if proximity is not None else [])
         # A marker that tracks if the EV has completed its trip.
         self.evState: EV_State = EV_State.PENDING
-        # Reference to the EV.
-        self.emergencyVehicle: EmergencyVehicle = None
-        # List of halting vehicles.
-        self.haltingVehicles: set[Vehicle] = set()
-
-    def start(self, sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, outputDir: str, runNum: int, prefix: str) -> None:
-        """Starts the simulation."""
-        traci.start(
-            [
-                sumoBinary,
-                '--net-file', networkFilePath,
-                '--route-files', tripFilePath,
-                '--additional-files', vTypeFilePath,
-                '--gui-settings-file', 'src/config/viewSettings.xml',
-                '--device.ssm.file', f'{outputDir}/ssm/ssm_{prefix}.xml',
-                '--device.ssm.thresholds', '1.5',
-                # '--statistic-output', f'{outputDir}/dump/stats_{prefix}.xml',
-                # '--netstate-dump', f'{outputDir}/dump/netstate_{prefix}.xml',
-                '--device.tripinfo.probability', '0',
-                '--tripinfo-output', f'{outputDir}/dump/tripinfo_{prefix}.xml',
-                '--start',
-                '--end', '3600',
-                '--quit-on-end',
-                # '--verbose',
-                '--lateral-resolution', '0.01',
-                '--device.fcd.probability', '0',
-                '--fcd-output', f'{outputDir}/fcd/fcd_{prefix}.xml',
-                # '--delay', '100',
-                '--device.rerouting.threads', '8',
-                '--time-to-impatience', '10',
-                # '--random',
-                '--no-warnings', 'true',
-                '--duration-log.disable', 'true',
-                '--no-step-log', 'true',
-                '--log', 'log.txt'
-            ])
-
-    def run(self, sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath, outputDir: str, demand: float, runNum: int, prefix: str) -> None:
+        # IDs of the halting vehicles, with the time they were last slowed down.
+        self.haltingVehicles: dict[str, float] = {}
+        # Detours CVs away from the EV route.
+        self.detour = Detour()
+        # Decides when the simulation stops.
+        self.termination = termination or TerminationPolicy()
+        # The number of steps simulated so far.
+        self.steps = 0
+        # The time the EV left the network.
+        self.evArrivalTime: float = None
+        # The vehicle types with an SSM device, and their extratime. Only read if the termination policy needs them.
+        self.ssmTypes: dict[str, float] = {}
+        # IDs of the vehicles with an SSM device on the network.
+        self.ssmVehicles: set[str] = set()
+        # The time the last SSM device stopped tracking encounters. `None` while one is on the network, or none was yet.
+        self.ssmEndTime: float = None
+        # The SUMO process to run in, if it is reused across runs. Otherwise, every run starts its own.
+        self.session = session
+        # Whether SUMO runs the simulation, i.e. it was started and not yet stopped.
+        self.isRunning = False
+        # Times the phases of every step, if profiling.
+        self.profiler = StepProfiler() if profile else None
+
+    @property
+    def allVehicles(self) -> set[Vehicle]:
+        """List of vehicles currently on the network."""
+        return self.vehicles.vehicles.values()
+
+    @property
+    def connectedVehicles(self) -> set[Vehicle]:
+        """List of CVs."""
+        return self.vehicles.connectedVehicles.values()
+
+    @property
+    def emergencyVehicle(self) -> EmergencyVehicle:
+        """Reference to the EV."""
+        return self.vehicles.emergencyVehicle
+
+    def start(self, sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, outputDir: str, runNum: int, prefix: str, sumoSeed: int = None, stateFilePath: str = None) -> None:
+        """Starts the simulation.
+
+        The TraCI connection is labelled with the run prefix, so that several
+        simulations can run side by side (e.g. one per worker process).
+        In a session, the run is loaded into the session's SUMO process instead.
+        With a `stateFilePath`, the simulation starts from a saved state of the
+        network, instead of an empty network.
+        """
+        fcdCapture = self.fcdRecorder is not None
+        self.outputFiles = getOutputFiles(outputDir, prefix, self.fcdFormat)
+
+        # Remove the FCD files of other formats, left by earlier runs, so that only one is processed.
+        for fcdFormat in FCD_FORMATS:
+            staleFcdFile = getOutputFiles(outputDir, prefix, fcdFormat)["fcd"]
+            if fcdFormat != self.fcdFormat and os.path.isfile(staleFcdFile):
+                os.remove(staleFcdFile)
+        # SUMO only outputs the FCD if it isn't captured through TraCI.
+        outputFiles = {kind: file for kind, file in self.outputFiles.items()
+                       if not (fcdCapture and kind == "fcd")}
+        command = getSumoCommand(sumoBinary, networkFilePath, vTypeFilePath, tripFilePath,
+                                 outputFiles, f'{outputDir}/logs/log_{prefix}.txt', sumoSeed)
+        if stateFilePath is not None:
+            command += ['--load-state', stateFilePath]
+        if self.session is not None:
+            self.session.start(command)
+        else:
+            traci.start(command, label=prefix)
+        self.isRunning = True
+        if self.profiler is not None:
+            self.profiler.attach(traci)
+
+        # The simulation time and vehicle count are delivered with every step.
+        traci.simulation.subscribe(
+            [tc.VAR_TIME, tc.VAR_MIN_EXPECTED_VEHICLES])
+        # Vehicles of a loaded state never depart. Register them with the first update.
+        if stateFilePath is not None:
+            self.vehicles.addRunning()
+        if self.termination.withoutSsm:
+            self.ssmTypes = readSsmTypes(vTypeFilePath)
+
+    def run(self, sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, outputDir: str, runNum: int, prefix: str, evInsertionTime: int = None, sumoSeed: int = None, stateFilePath: str = None) -> None:
         """Manages the starting, running, and stopping of the simulation.
 
+        SUMO is stopped even if the run fails, so that the next run can connect again.
+        A failed run may leave SUMO in any state, so its session isn't reused.
+        The captured FCD and the step profile are only written if the run completed.
+
         Args:
-            sumoBinary (_type_): _description_
-            runs (_type_): _description_
+            sumoBinary (str): The SUMO binary to run.
+            networkFilePath (str): The network file.
+            vTypeFilePath (str): The vehicle type file.
+            tripFilePath (str): The trip file.
+            outputDir (str): The output directory of the case study.
+            runNum (int): The run number.
+            prefix (str): The run prefix, e.g. `d1500_p25_75_r3`. Labels the output files and the TraCI connection.
+            evInsertionTime (int, optional): The time the EV is inserted, in seconds. Defaults to a random time between 10 and 15 minutes.
+            sumoSeed (int, optional): The seed of SUMO. Defaults to SUMO's own.
+            stateFilePath (str, optional): A saved state to start from, instead of an empty network.
         """
 
-        # The insertion time for EV is random.
+        # The insertion time for EV is random, unless given by the job manifest.
         # FIXME: Let the network fill before insertion the EV.
-        evInsertionTime = random.randint(60 * 10, 60 * 15)
+        if evInsertionTime is None:
+            evInsertionTime = random.randint(60 * 10, 60 * 15)
         print(f"""\tEV inserts @ ({colored(evInsertionTime ,"red")})""")
 
-        # Generate random trips. The output file should be placed in the /data folder.
-        subprocess.run(["python", randomTrips.__file__,
-                        "-c", "src/config/trips.cfgtrips.xml",
-                        "--net-file", networkFilePath,
-                        "--insertion-rate", f"{demand}",
-                        '--fringe-junctions',
-                        # '--binomial', f"{int(demand/2)}",
-                        "--validate",
-                        # '--output-trip-file', tripFilePath
-                        '--route-file', tripFilePath
-                        ])
-
-        self.start(sumoBinary, networkFilePath,
-                   vTypeFilePath, tripFilePath, outputDir, runNum, prefix=prefix)
-        while self.shouldContinue():
-            # Refresh the list of vehicles currently on the network.
-            # FIXME: code smell - multiple subscriptions to the EV.
-            self.updateVehicleList()
-
-            # Insert the EV into the network.
-            if self.getTime() == evInsertionTime:
-                self.insertEv(self.evTrip["origin"], self.evTrip["dest"])
-            # Rerouting is only necessary while EVs are actively on the network.
-            if self.emergencyVehicle != None:
-                # We can't control exactly when the EV enters the network.
-                # So now is the first guaranteed moment to change EV state.
-                if self.evState == EV_State.PENDING:
-                    self.evState = EV_State.DISPATCHED
-
-                # Find all vehicles with common edges in their route. Detour them all.
-                evFutureRoute = self.emergencyVehicle.getFutureRoute()
-                Detour.detourVehicles(
-                    self.connectedVehicles, evFutureRoute)
-
-            # TODO: Revert detours once EV leaves network.
-            # self.updateHaltedVehicleList()
-            self.stepForward()
-
-        self.stop()
+        completed = False
+        try:
+            self.start(sumoBinary, networkFilePath,
+                       vTypeFilePath, tripFilePath, outputDir, runNum, prefix=prefix, sumoSeed=sumoSeed, stateFilePath=stateFilePath)
+            while self.shouldContinue():
+                # Refresh the list of vehicles currently on the network.
+                with self.profile("update"):
+                    self.updateVehicleList()
+                    self.detour.removeVehicles(self.vehicles.arrivedIds)
+                    if self.termination.withoutSsm:
+                        self.updateSsmVehicles()
+                self.recordFcd()
+
+                # The EV left the network. Revert all detours.
+                # Under the default termination (`afterEv` of 0), the run stops after the next step, so the
+                # reverted routes only show in the outputs of runs that continue, i.e. with `--stop-after-ev` other than 0.
+                if self.emergencyVehicle == None and self.evState == EV_State.DISPATCHED:
+                    self.evState = EV_State.COMPLETE
+                    self.evArrivalTime = self.getTime()
+                    with self.profile("detour"):
+                        self.detour.revertAll(self.vehicles.connectedVehicles)
+
+                # Insert the EV into the network.
+                if self.getTime() == evInsertionTime:
+                    self.insertEv(self.evTrip["origin"], self.evTrip["dest"])
+                # Rerouting is only necessary while EVs are actively on the network.
+                if self.emergencyVehicle != None:
+                    # We can't control exactly when the EV enters the network.
+                    # So now is the first guaranteed moment to change EV state.
+                    if self.evState == EV_State.PENDING:
+                        self.evState = EV_State.DISPATCHED
+
+                    # Find all vehicles with common edges in their route. Detour them all.
+                    with self.profile("detour"):
+                        evFutureRoute = self.emergencyVehicle.getFutureRoute()
+                        self.detour.detourVehicles(
+                            self.vehicles.connectedVehicles, evFutureRoute)
+
+                if self.proximity is not None:
+                    with self.profile("halt"):
+                        self.updateHaltedVehicleList()
+                with self.profile("step"):
+                    self.stepForward()
+                if self.profiler is not None:
+                    self.profiler.endStep(self.getTime())
+            completed = True
+        finally:
+            # Stop profiling and SUMO even if the run failed, so that the next run starts unprofiled, and can connect.
+            if self.profiler is not None:
+                self.profiler.detach()
+            if self.isRunning:
+                self.stop(reuse=completed)
+        if self.fcdRecorder is not None:
+            self.fcdRecorder.write(self.outputFiles["fcd"])
+        if self.profiler is not None:
+            self.writeProfile(outputDir, prefix)
+
+    def profile(self, phase: str):
+        """Times a phase of the current step, if profiling.
+
+        Args:
+            phase (str): The phase. See `StepProfiler.PHASES`.
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(phase)
+
+    def writeProfile(self, outputDir: str, prefix: str) -> None:
+        """Writes the step timeline, its summary, and the TraCI calls by method to `<outputDir>/profile/`, and prints the summary.
+
+        Args:
+            outputDir (str): The output directory of the case study.
+            prefix (str): The run prefix.
+        """
+        os.makedirs(f"{outputDir}/profile", exist_ok=True)
+        summary = self.profiler.write(f"{outputDir}/profile/timeline_{prefix}.npz",
+                                      f"{outputDir}/profile/summary_{prefix}.csv")
+        traci.getStats().to_csv(
+            f"{outputDir}/profile/traci_{prefix}.csv", index=False, float_format="%.4f")
+        print(f"""	Step profile (ms, commands) over ({colored(len(self.profiler.rows), 'yellow')}) steps:""")
+        print(summary.to_string(float_format=lambda value: f"{value:0.3f}"))
+
+    def recordFcd(self) -> None:
+        """Records the EV's state at the current step, if FCD is captured through TraCI."""
+        if self.fcdRecorder is None or self.emergencyVehicle is None:
+            return
+        ev = self.emergencyVehicle
+        self.fcdRecorder.record(self.getTime(), ev.id, ev.values)
 
     def shouldContinue(self) -> bool:
         """Checks that the simulation should continue running.
 
         Returns:
-            bool: `True` if vehicles exist on network. `False` otherwise.
+            bool: `True` if the termination policy allows another step. `False` otherwise.
         """
-        if self.emergencyVehicle == None and self.evState == EV_State.DISPATCHED:
-            return False
-        numVehicles = traci.simulation.getMinExpectedNumber()
-        return True if numVehicles > 0 else False
+        results = traci.simulation.getSubscriptionResults()
+        return self.termination.shouldContinue(
+            results[tc.VAR_TIME], self.steps, results[tc.VAR_MIN_EXPECTED_VEHICLES], self.evArrivalTime, self.ssmEndTime)
 
     def stepForward(self) -> None:
         """Moves the simulation clock by one second."""
         traci.simulationStep()
+        self.steps += 1
 
-    def stop(self) -> None:
-        """Stops the simulation."""
-        traci.close()
+    def stop(self, reuse: bool = True) -> None:
+        """Stops the simulation. In a session, SUMO is kept alive for the next run.
+
+        Args:
+            reuse (bool, optional): Whether the session's SUMO process may run the next run. Defaults to True.
+        """
+        self.isRunning = False
+        if self.session is not None and reuse:
+            self.session.finish()
+        elif self.session is not None:
+            self.session.close()
+        else:
+            traci.close()
 
     def getTime(self) -> int:
         """Returns the current simulation time, in seconds.
@@ -142,81 +365,67 @@ class Simulation:
         Returns:
             int: Current simulation time.
         """
-        return traci.simulation.getTime()
+        return traci.simulation.getSubscriptionResults()[tc.VAR_TIME]
 
     def updateVehicleList(self) -> None:
-        """Updates the list of vehicles on the network."""
-
-        # Update list of all vehicles.
-        self.allVehicles = self.getActiveVehicles()
-
-        # Filter for only CVs.
-        self.connectedVehicles = [
-            veh for veh in self.allVehicles if veh.type == self.cvId]
-
-        # Filter for the one EV.
-        ev = next(
-            filter(lambda veh: veh.id == 'EV', self.allVehicles), None)
-        self.emergencyVehicle = None if ev is None else EmergencyVehicle(ev.id)
-
-    def getActiveVehicles(self) -> set[Vehicle]:
-        """Returns the list of all active vehicles on the network.
-
-        Returns:
-            set[Vehicle]: List of vehicles.
-        """
-        activeVehsIds = traci.vehicle.getIDList()
-        return [Vehicle(id) for id in activeVehsIds]
+        """Updates the list of vehicles on the network, from the departures and arrivals of the last step."""
+        self.vehicles.update()
+
+    def updateSsmVehicles(self) -> None:
+        """Tracks the vehicles with an SSM device on the network, and when the last one stopped tracking encounters."""
+        for vehId in self.vehicles.departedIds:
+            veh = self.vehicles.vehicles.get(vehId)
+            if veh is not None and veh.type in self.ssmTypes:
+                self.ssmVehicles.add(vehId)
+        left = self.ssmVehicles.intersection(self.vehicles.arrivedIds)
+        if left:
+            self.ssmVehicles -= left
+            if not self.ssmVehicles:
+                self.ssmEndTime = self.getTime() + max(self.ssmTypes.values())
+        if self.ssmVehicles:
+            self.ssmEndTime = None
 
     def updateHaltedVehicleList(self) -> None:
-        """Halts all vehicles surrounding the EV, and resumes speed once out of range."""
-
-        # There is no EV on the network. Resume speeds of all halting vehicles.
-        if self.emergencyVehicle is None:
-            self.resumeVehicles(self.haltingVehicles)
+        """Halts all vehicles surrounding the EV, and resumes speed once out of range.
 
-        # There is an EV on the network. Halt all nearby vehicles.
+        Vehicles that stay in range are slowed down again once their last
+        slow-down ran its course, rather than every step.
+        """
+        # Without a moving EV on the network, no vehicle halts.
+        ev = self.emergencyVehicle
+        if ev is None or ev.getSpeed() == 0:
+            nearbyIds = set()
         else:
-            if self.emergencyVehicle.getSpeed() == 0:
-                self.resumeVehicles(self.haltingVehicles)
-                return
+            nearbyIds = self.proximity.findNearby(self.vehicles.results, ev.id)
 
-            # Halt new nearby vehicles.
-            vehiclesToHalt = self.emergencyVehicle.getVehiclesToHalt(
-                self.haltingVehicles)
-            self.haltVehicles(vehiclesToHalt)
+        # Stop halting far away halted vehicles, and those that left the network.
+        self.resumeVehicles(self.haltingVehicles.keys() - nearbyIds)
 
-            # Stop halting far away halted vehicles.
-            vehiclesToResume = self.emergencyVehicle.getVehiclesToResume(
-                self.haltingVehicles)
-            self.resumeVehicles(vehiclesToResume)
+        # Halt new nearby vehicles.
+        time = self.getTime()
+        self.haltVehicles({vehId for vehId in nearbyIds
+                           if time - self.haltingVehicles.get(vehId, -SLOW_DOWN_DURATION) >= SLOW_DOWN_DURATION})
 
-    def haltVehicles(self, vehicles: set[Vehicle]) -> None:
+    def haltVehicles(self, vehIds: set[str]) -> None:
         """Halts all provided vehicles.
 
         Args:
-            vehicles (set[Vehicle]): The vehicles to halt.
+            vehIds (set[str]): IDs of the vehicles to halt. Must be on the network.
         """
-        vehiclesToHalt = vehicles.copy()
-        newSpeed = 0
-        for veh in vehiclesToHalt:
-            veh.setSpeed(newSpeed)
-            self.haltingVehicles.add(veh)
+        time = self.getTime()
+        for vehId in vehIds:
+            self.vehicles.vehicles[vehId].setSpeed(0)
+            self.haltingVehicles[vehId] = time
 
-    def resumeVehicles(self, vehicles: set[Vehicle]) -> None:
+    def resumeVehicles(self, vehIds: set[str]) -> None:
         """Resumes driving of halted vehicles.
 
         Args:
-            vehicle (set[Vehicle]): List of vehicles to resume driving.
+            vehIds (set[str]): IDs of the vehicles to resume driving.
         """
-        vehiclesToResume = vehicles.copy()
-        for veh in vehiclesToResume:
-            # If vehicle left the network, setSpeed will cause an error.
-            if veh.isActive(self.allVehicles):
-                newSpeed = -1  # Returns speed regulation control to TraCI.
-                # veh.setSpeed(newSpeed)
-                # FIXME: smell - is removing objs from list that easy?
-            self.haltingVehicles.remove(veh)
+        # A slow-down ends on its own, handing speed control back to SUMO. There's nothing to send.
+        for vehId in vehIds:
+            del self.haltingVehicles[vehId]
 
     def insertEv(self, origin: str, dest: str, vehId: str = 'EV', typeId: str = 'EV') -> None:
         """Inserts the EV vehicle into the network with a route between the `origin` and `dest` edges.
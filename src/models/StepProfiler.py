@@ -0,0 +1,147 @@
+import contextlib
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# The timed phases of a simulation step, in the order they run.
+PHASES = ["update", "detour", "halt", "step"]
+
+# The columns of the timeline, and their types. The time is the simulation time at the end of the step. Durations are in seconds.
+COLUMNS = {"time": np.float64, **{phase: np.float32 for phase in PHASES},
+           "total": np.float32, "commands": np.int32}
+
+
+class StepProfiler:
+    """Records where the time of every simulation step goes, and how many TraCI commands it issues.
+
+    Each step is split into the phases of `PHASES`: refreshing the vehicle list,
+    detouring CVs, halting the vehicles around the EV, and advancing SUMO.
+    TraCI commands are counted by the `TraciProxy` the models call through,
+    which also breaks them down by method.
+    """
+
+    def __init__(self) -> None:
+        # The rows of the timeline, one per step.
+        self.rows: list[tuple] = []
+        # The durations of the phases of the current step.
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        # The proxy's command count at the start of the current step.
+        self.stepCommands = 0
+        # The start of the current step.
+        self.stepStart = time.perf_counter()
+        # The profiled proxy. See `attach`.
+        self.proxy = None
+        # Whether the proxy was enabled by `attach`, rather than before.
+        self.enabledProxy = False
+
+    def attach(self, proxy) -> None:
+        """Starts counting the commands sent through a proxy, enabling it if it isn't yet.
+
+        Args:
+            proxy (TraciProxy): The proxy, usually `TraciProxy.traci`.
+        """
+        proxy.reset()
+        self.enabledProxy = not proxy.enabled
+        if self.enabledProxy:
+            proxy.enable()
+        self.proxy = proxy
+        self.stepCommands = 0
+        self.stepStart = time.perf_counter()
+
+    def detach(self) -> None:
+        """Stops counting commands. The proxy's statistics are kept."""
+        if self.proxy is not None:
+            if self.enabledProxy:
+                self.proxy.disable()
+            self.proxy = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Times a phase of the current step.
+
+        Args:
+            name (str): The phase, in `PHASES`.
+        """
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - tic
+
+    def endStep(self, simTime: float) -> None:
+        """Records the current step, and starts the next one.
+
+        Args:
+            simTime (float): The simulation time of the step, in seconds.
+        """
+        now = time.perf_counter()
+        commands = self.proxy.commands if self.proxy is not None else self.stepCommands
+        self.rows.append((simTime, *self.durations.values(),
+                          now - self.stepStart, commands - self.stepCommands))
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.stepCommands = commands
+        self.stepStart = now
+
+    def getTimeline(self) -> pd.DataFrame:
+        """Returns the timeline, with one row per step.
+
+        Returns:
+            pd.DataFrame: The `COLUMNS` of every step.
+        """
+        columns = list(zip(*self.rows)) or [[]] * len(COLUMNS)
+        return pd.DataFrame({name: np.array(values, dtype=dtype)
+                             for (name, dtype), values in zip(COLUMNS.items(), columns)})
+
+    def getSummary(self) -> pd.DataFrame:
+        """Summarizes the timeline.
+
+        Returns:
+            pd.DataFrame: The p50, p95, max, and sum of the duration (in milliseconds) of every phase and whole steps, and of the command count, over all steps.
+        """
+        timeline = self.getTimeline()
+        rows = {}
+        for column in [*PHASES, "total", "commands"]:
+            values = timeline[column].to_numpy(dtype=np.float64)
+            if column != "commands":
+                values = values * 1000
+            rows[column] = [np.percentile(values, 50), np.percentile(values, 95), values.max(), values.sum()] \
+                if len(values) else [np.nan] * 4
+        return pd.DataFrame.from_dict(rows, orient="index", columns=["p50", "p95", "max", "sum"]).rename_axis("phase")
+
+    def write(self, timelineFilePath: str, summaryFilePath: str) -> pd.DataFrame:
+        """Writes the timeline as a compressed `.npz` file, with one array per column, and its summary as a CSV file.
+
+        Args:
+            timelineFilePath (str): The timeline file.
+            summaryFilePath (str): The summary file.
+
+        Returns:
+            pd.DataFrame: The summary. See `getSummary`.
+        """
+        timeline = self.getTimeline()
+        tmpFilePath = f"{timelineFilePath}.{os.getpid()}.tmp"
+        with open(tmpFilePath, "wb") as f:
+            np.savez_compressed(
+                f, **{name: timeline[name].to_numpy() for name in COLUMNS})
+        os.replace(tmpFilePath, timelineFilePath)
+
+        summary = self.getSummary()
+        summary.to_csv(summaryFilePath, float_format="%.4f")
+        return summary
+
+
+def read(filePath: str) -> pd.DataFrame:
+    """Reads a timeline written by `StepProfiler.write`.
+
+    Args:
+        filePath (str): The timeline file.
+
+    Returns:
+        pd.DataFrame: The timeline.
+    """
+    with np.load(filePath) as arrays:
+        # Phases added since the timeline was written are left at zero.
+        length = len(arrays["time"])
+        return pd.DataFrame({name: arrays[name] if name in arrays.files else np.zeros(length, dtype=dtype)
+                             for name, dtype in COLUMNS.items()})
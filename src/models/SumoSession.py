@@ -0,0 +1,71 @@
+import os
+from multiprocessing import util
+import traci
+
+# The network loaded between runs. Loading it closes the outputs of the last run.
+IDLE_NETWORK = "src/config/idle.net.xml"
+
+
+class SumoSession:
+    """A SUMO process that is kept alive across runs, and reconfigured for each run with `traci.load`.
+
+    Process startup and connection setup are paid once per session, e.g. once
+    per worker process, rather than once per run. Between runs, the session
+    idles on an empty network, so that SUMO writes and closes the outputs of
+    the last run right when it ends.
+    """
+
+    def __init__(self, label: str = None) -> None:
+        # The label of the TraCI connection.
+        self.label = label or f"session_{os.getpid()}"
+        # The SUMO binary of the running process. `None` while there is none.
+        self.sumoBinary = None
+        # The number of runs started in the session.
+        self.runs = 0
+        # Close the connection, and let SUMO quit, when the (worker) process exits.
+        util.Finalize(self, SumoSession.close, args=(self,), exitpriority=10)
+
+    def start(self, command: list[str]) -> None:
+        """Starts a run, in the running SUMO process if there is one, or in a new one.
+
+        Args:
+            command (list[str]): The SUMO command line of the run, starting with the SUMO binary.
+        """
+        if self.sumoBinary == command[0]:
+            try:
+                traci.switch(self.label)
+                traci.load(command[1:])
+                self.runs += 1
+                return
+            except traci.exceptions.FatalTraCIError:
+                # The process quit, e.g. after an error in the last run. Start a new one.
+                pass
+        self.close()
+        traci.start(command, label=self.label)
+        self.sumoBinary = command[0]
+        self.runs += 1
+
+    def finish(self) -> None:
+        """Ends the current run, keeping the SUMO process alive for the next one."""
+        try:
+            traci.switch(self.label)
+            traci.load(['--net-file', IDLE_NETWORK,
+                        '--no-step-log', 'true', '--no-warnings', 'true'])
+            # SUMO only completes the load, and closes the outputs, with the next command.
+            traci.simulation.getTime()
+        except Exception:
+            # The process can't be reused. The next run starts a new one.
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Closes the connection, and lets the SUMO process quit."""
+        self.sumoBinary = None
+        if not traci.connection.has(self.label):
+            return
+        traci.switch(self.label)
+        try:
+            traci.close()
+        except traci.exceptions.FatalTraCIError:
+            # The process already quit. The connection is now marked closed, and only needs to be dropped.
+            traci.close()
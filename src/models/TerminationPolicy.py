@@ -0,0 +1,66 @@
+import xml.etree.ElementTree as et
+
+# SUMO's default of `device.ssm.extratime`, in seconds.
+SSM_EXTRATIME = 3.0
+
+
+def readSsmTypes(vTypeFilePath: str) -> dict[str, float]:
+    """Returns the vehicle types that carry an SSM device (`has.ssm.device`), and their `device.ssm.extratime`.
+
+    Args:
+        vTypeFilePath (str): The vType distribution file.
+
+    Returns:
+        dict[str, float]: The extratime of every vehicle type with an SSM device, in seconds, keyed by type ID.
+    """
+    ssmTypes = {}
+    for vType in et.parse(vTypeFilePath).getroot().iter("vType"):
+        params = {param.get("key"): param.get("value")
+                  for param in vType.iter("param")}
+        if params.get("has.ssm.device", "false").lower() == "true":
+            ssmTypes[vType.get("id")] = float(
+                params.get("device.ssm.extratime", SSM_EXTRATIME))
+    return ssmTypes
+
+
+class TerminationPolicy:
+    """Decides when a simulation stops, from values the simulation already has at hand.
+
+    A simulation stops at the first of:
+        - `afterEv` seconds after the EV left the network. Never, if `None`.
+        - With `withoutSsm`, the SSM extratime after the last vehicle with an SSM device left the network.
+          In the case studies, only the EV carries an SSM device.
+        - `stepBudget` simulation steps. Never, if `None`.
+        - No vehicles left on, or expected on, the network.
+    """
+
+    def __init__(self, afterEv: float = 0, stepBudget: int = None, withoutSsm: bool = False) -> None:
+        # Seconds the simulation continues after the EV left the network.
+        self.afterEv = afterEv
+        # The maximum number of simulation steps.
+        self.stepBudget = stepBudget
+        # Whether the simulation stops once no SSM device is active.
+        self.withoutSsm = withoutSsm
+
+    def shouldContinue(self, time: float, steps: int, minExpectedVehicles: int, evArrivalTime: float = None, ssmEndTime: float = None) -> bool:
+        """Checks that the simulation should continue running.
+
+        Args:
+            time (float): The current simulation time, in seconds.
+            steps (int): The number of steps simulated so far.
+            minExpectedVehicles (int): The number of vehicles on, and waiting to enter, the network.
+            evArrivalTime (float, optional): The time the EV left the network. `None` while it hasn't.
+            ssmEndTime (float, optional): The time the last SSM device stopped tracking encounters, i.e. the extratime after the last vehicle with an SSM device left the network. `None` while one is on the network, or none was yet.
+
+        Returns:
+            bool: `True` if the simulation should make another step. `False` otherwise.
+        """
+        if minExpectedVehicles <= 0:
+            return False
+        if self.stepBudget is not None and steps >= self.stepBudget:
+            return False
+        if self.afterEv is not None and evArrivalTime is not None and time > evArrivalTime + self.afterEv:
+            return False
+        if self.withoutSsm and ssmEndTime is not None and time > ssmEndTime:
+            return False
+        return True
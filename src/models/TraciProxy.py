@@ -0,0 +1,210 @@
+from __future__ import annotations
+import contextlib
+import time
+import types
+import pandas as pd
+import traci as traciModule
+
+# Methods answered from the values the client already received, without a round trip to SUMO.
+LOCAL_METHODS = {"getSubscriptionResults", "getAllSubscriptionResults",
+                 "getContextSubscriptionResults", "getAllContextSubscriptionResults",
+                 "getConnection", "switch", "isLoaded"}
+
+
+class BudgetExceeded(Exception):
+    """Raised when a simulation step issues more TraCI commands than its budget allows."""
+
+
+class TraciProxy:
+    """Stands in for the `traci` module, and optionally counts and times the calls made through it.
+
+    Calls are keyed by domain and method, e.g. ("vehicle", "getRoute"). Calls
+    of the `traci` module itself, e.g. `simulationStep`, are in the "traci"
+    domain. While disabled, attributes are handed out unwrapped, so the proxy
+    costs a single attribute lookup per call.
+
+    With a step budget, a `BudgetExceeded` is raised as soon as the commands
+    sent to SUMO since the last `simulationStep` exceed it. Calls answered
+    locally (see `LOCAL_METHODS`) don't count against the budget.
+    """
+
+    def __init__(self, module=traciModule) -> None:
+        # The proxied module.
+        self._module = module
+        # Whether calls are counted and timed.
+        self._enabled = False
+        # The maximum number of commands per step. `None` for no limit.
+        self._stepBudget: int = None
+        # The commands sent since the last step, by (domain, method).
+        self._stepCalls: dict[tuple[str, str], int] = {}
+        # The commands sent since the last reset.
+        self.commands = 0
+        # The number, total duration, and maximum duration (in seconds) of the calls of each (domain, method).
+        self.calls: dict[tuple[str, str], int] = {}
+        self.durations: dict[tuple[str, str], float] = {}
+        self.maxDurations: dict[tuple[str, str], float] = {}
+        # The wrapped domains and functions, by attribute name.
+        self._wrappers: dict[str, object] = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._module, name)
+        if not self._enabled:
+            return attr
+        if name not in self._wrappers:
+            # Submodules (e.g. `traci.exceptions`), classes, and constants are handed out as they are.
+            if isinstance(attr, (types.ModuleType, type)):
+                return attr
+            if callable(attr):
+                self._wrappers[name] = self.wrap("traci", name, attr)
+            elif hasattr(attr, "__dict__"):
+                self._wrappers[name] = DomainProxy(self, name, attr)
+            else:
+                return attr
+        return self._wrappers[name]
+
+    @property
+    def enabled(self) -> bool:
+        """Whether calls are counted and timed."""
+        return self._enabled
+
+    def enable(self, stepBudget: int = None) -> None:
+        """Starts counting and timing calls.
+
+        Args:
+            stepBudget (int, optional): The maximum number of commands per step. Defaults to no limit.
+        """
+        self._enabled = True
+        self._stepBudget = stepBudget
+        self._stepCalls = {}
+
+    def disable(self) -> None:
+        """Stops counting and timing calls. The statistics are kept until `reset`."""
+        self._enabled = False
+        self._stepBudget = None
+
+    def reset(self) -> None:
+        """Clears the statistics."""
+        self._stepCalls = {}
+        self.commands = 0
+        self.calls = {}
+        self.durations = {}
+        self.maxDurations = {}
+
+    def use(self, module) -> None:
+        """Proxies another module, e.g. a stand-in for `traci` that runs without SUMO.
+
+        Args:
+            module (module): The module. Must provide the domains and functions that are called.
+        """
+        self._module = module
+        self._wrappers = {}
+
+    @contextlib.contextmanager
+    def budget(self, stepBudget: int):
+        """Enforces a per-step command budget within a block, e.g. in a test or benchmark.
+
+        Args:
+            stepBudget (int): The maximum number of commands per step.
+
+        Raises:
+            BudgetExceeded: If a step issued more commands.
+        """
+        enabled, previousBudget = self._enabled, self._stepBudget
+        self.enable(stepBudget)
+        try:
+            yield self
+        finally:
+            if enabled:
+                self.enable(previousBudget)
+            else:
+                self.disable()
+
+    def wrap(self, domain: str, method: str, func):
+        """Wraps a function, so that its calls are counted and timed.
+
+        Args:
+            domain (str): The domain of the function.
+            method (str): The name of the function.
+            func (Callable): The function.
+
+        Returns:
+            Callable: The wrapped function.
+        """
+        key = (domain, method)
+        isCommand = method not in LOCAL_METHODS
+        isStep = domain == "traci" and method == "simulationStep"
+
+        def call(*args, **kwargs):
+            if isCommand:
+                self.countCommand(key)
+            tic = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - tic
+                self.calls[key] = self.calls.get(key, 0) + 1
+                self.durations[key] = self.durations.get(key, 0.0) + duration
+                if duration > self.maxDurations.get(key, 0.0):
+                    self.maxDurations[key] = duration
+                if isStep:
+                    self._stepCalls = {}
+
+        return call
+
+    def countCommand(self, key: tuple[str, str]) -> None:
+        """Counts a command against the budget of the current step.
+
+        Args:
+            key (tuple[str, str]): The (domain, method) of the command.
+
+        Raises:
+            BudgetExceeded: If the step issued more commands than its budget allows.
+        """
+        self._stepCalls[key] = self._stepCalls.get(key, 0) + 1
+        self.commands += 1
+        if self._stepBudget is None:
+            return
+        commands = sum(self._stepCalls.values())
+        if commands > self._stepBudget:
+            busiest = sorted(self._stepCalls.items(),
+                             key=lambda item: -item[1])[:5]
+            raise BudgetExceeded(
+                f"{commands} TraCI commands in a step, over the budget of {self._stepBudget}. Most issued: "
+                + ", ".join(f"{domain}.{method} ({count})" for (domain, method), count in busiest))
+
+    def getStats(self) -> pd.DataFrame:
+        """Returns the statistics of every (domain, method), sorted by their total duration.
+
+        Returns:
+            pd.DataFrame: The number of calls, and their total (ms), mean (µs), and maximum (ms) duration.
+        """
+        rows = [(domain, method, calls, self.durations[(domain, method)] * 1e3,
+                 self.durations[(domain, method)] / calls * 1e6, self.maxDurations.get((domain, method), 0.0) * 1e3)
+                for (domain, method), calls in self.calls.items()]
+        stats = pd.DataFrame(
+            rows, columns=["domain", "method", "calls", "total", "mean", "max"])
+        return stats.sort_values("total", ascending=False, ignore_index=True)
+
+
+class DomainProxy:
+    """Stands in for a TraCI domain (e.g. `traci.vehicle`), counting and timing the calls of its methods."""
+
+    def __init__(self, proxy: TraciProxy, name: str, domain) -> None:
+        self._proxy = proxy
+        self._name = name
+        self._domain = domain
+        # The wrapped methods, by name.
+        self._wrappers: dict[str, object] = {}
+
+    def __getattr__(self, method: str):
+        if method not in self._wrappers:
+            attr = getattr(self._domain, method)
+            if not callable(attr):
+                return attr
+            self._wrappers[method] = self._proxy.wrap(
+                self._name, method, attr)
+        return self._wrappers[method]
+
+
+# The `traci` module, as used by the models.
+traci = TraciProxy()
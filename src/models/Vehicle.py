@@ -1,12 +1,36 @@
 from __future__ import annotations
-import traci
+from .TraciProxy import traci
 import traci.constants as tc
 
 
+# Variables subscribed to for every vehicle, once upon departure.
+SUBSCRIBED_VARIABLES = [tc.VAR_TYPE, tc.VAR_EDGES, tc.VAR_ROUTE_INDEX]
+
+# The time a vehicle takes to slow down to a set speed, in seconds. See `Vehicle.setSpeed`.
+SLOW_DOWN_DURATION = 5.0
+
+
 class Vehicle:
-    def __init__(self, id: str):
+    # Vehicles live as long as they're on the network; keep them compact.
+    __slots__ = ("_id", "_vType", "_values")
+
+    def __init__(self, id: str, subscriptionResults: dict = None):
         self._id = id
-        self._vType = traci.vehicle.getTypeID(id)
+        # The latest values of the subscribed variables, refreshed every step.
+        self._values = subscriptionResults
+        self._vType = subscriptionResults[tc.VAR_TYPE] if subscriptionResults else traci.vehicle.getTypeID(
+            id)
+
+    @staticmethod
+    def subscribe(id: str, variables: list[int] = None) -> None:
+        """Subscribes to the vehicle's type, route, and route index.
+        The values are then delivered with every simulation step, without extra round-trips.
+
+        Args:
+            id (str): ID of the vehicle.
+            variables (list[int], optional): The variables to subscribe to. Defaults to `SUBSCRIBED_VARIABLES`.
+        """
+        traci.vehicle.subscribe(id, variables or SUBSCRIBED_VARIABLES)
 
     def __str__(self) -> str:
         return self._id
@@ -21,6 +45,8 @@ class Vehicle:
             Returns:
                 index (int): Index of current position on route.
         '''
+        if self._values is not None:
+            return self._values[tc.VAR_ROUTE_INDEX]
         return traci.vehicle.getRouteIndex(self._id)
 
     def getRoute(self) -> list[str]:
@@ -29,6 +55,8 @@ class Vehicle:
         Returns:
             Route (list[str]): The IDs of the edges the vehicle's is made of. 
         """
+        if self._values is not None:
+            return self._values[tc.VAR_EDGES]
         return traci.vehicle.getRoute(self._id)
 
     def getFutureRoute(self) -> list[str]:
@@ -47,6 +75,8 @@ class Vehicle:
         Returns:
             float: Current speed.
         """
+        if self._values is not None and tc.VAR_SPEED in self._values:
+            return self._values[tc.VAR_SPEED]
         return traci.vehicle.getSpeed(self.id)
 
     def setSpeed(self, speed: float) -> None:
@@ -56,7 +86,7 @@ class Vehicle:
             speed (float): The new speed.
         """
         # traci.vehicle.setSpeed(self.id, speed)
-        traci.vehicle.slowDown(self.id, speed, 5.0)
+        traci.vehicle.slowDown(self.id, speed, SLOW_DOWN_DURATION)
 
     def setAvoidEdge(self, edgeId: str):
         """Sets the travel time for the vehicle to infinity.
@@ -67,20 +97,17 @@ class Vehicle:
         traci.vehicle.setAdaptedTraveltime(
             self.id, edgeId, float('inf'))
 
-    def recalculateRoute(self):
-        """Recalculates the vehicle's route based on edge travel times."""
-        traci.vehicle.rerouteTraveltime(self.id)
-
-    def isActive(self, vehList: set[Vehicle]) -> bool:
-        """Returns True if the vehicle is in the provided list. False otherwise.
+    def clearAvoidEdge(self, edgeId: str):
+        """Restores the original travel time of an edge the vehicle was avoiding.
 
         Args:
-            vehList (set[Vehicle]): List of vehicles to search through.
-
-        Returns:
-            bool: Whether the vehicle is in the list or not.
+            edgeId (str): The edge to stop avoiding.
         """
-        return self.id in (veh.id for veh in vehList)
+        traci.vehicle.setAdaptedTraveltime(self.id, edgeId)
+
+    def recalculateRoute(self):
+        """Recalculates the vehicle's route based on edge travel times."""
+        traci.vehicle.rerouteTraveltime(self.id)
 
     @property
     def id(self) -> str:
@@ -100,77 +127,16 @@ class Vehicle:
         """
         return self._vType
 
-
-class EmergencyVehicle(Vehicle):
-
-    def __init__(self, id: str) -> None:
-        super().__init__(id)
-
-        # Listen for surrounding vehicles.
-        self.subscribeToEV()
-        self.nearbyVehicles: set[Vehicle] = self.findNearbyVehicles()
-
-    def subscribeToEV(self) -> None:
-        """Subscribes to the vehicular context of the Emergency Vehicle."""
-        # Listen for distances of all vehicles near the EV.
-        objectId = self.id
-        contextDomain = tc.CMD_GET_VEHICLE_VARIABLE
-        contextRange = 25
-        variablesToReturn = [tc.VAR_DISTANCE]
-        traci.vehicle.subscribeContext(
-            objectId, contextDomain, contextRange, variablesToReturn)
-
-        # Filter for vehicles on and neighbouring the lane of the EV.
-        traci.vehicle.addSubscriptionFilterLCManeuver(
-            downstreamDist=25, upstreamDist=50, noOpposite=False)
-
-    def findNearbyVehicles(self) -> set[Vehicle]:
-        """Returns a list of vehicles within range of the EV.
-        Due to a bug, the EV will identify itself as a nearby vehicle. 
-        Therefore, extra steps are taken to remove self inclusion in the output.
-
-        Returns:
-            set[Vehicle]: Nearby vehicles.
-        """
-        subResults = traci.vehicle.getContextSubscriptionResults(
-            self.id)
-        ids = set(subResults.keys())
-        ids.discard('EV')
-
-        nearbyVehicles = [Vehicle(id)
-                          for id in list(ids)]
-        return nearbyVehicles
-
-    def getVehiclesToResume(self, haltedVehicles: set[Vehicle]) -> set[Vehicle]:
-        """Retuns a set of vehicles to stop halting.
-
-        Args:
-            nearbyVehicles (set[Vehicle]): Set of nearby vehicles.
-            haltedVehicles (set[Vehicle]): Set of halted vehicles
+    @property
+    def values(self) -> dict:
+        """Returns the latest values of the vehicle's subscribed variables.
 
         Returns:
-            set[Vehicle]: Set of vehicles to stop halting.
+            dict: The values, by TraCI variable constant.
         """
+        return self._values
 
-        vehiclesToResume = set()
-        for haltedVeh in haltedVehicles:
-            if haltedVeh.id not in (nearbyVeh.id for nearbyVeh in self.nearbyVehicles):
-                vehiclesToResume.add(haltedVeh)
-        return vehiclesToResume
-
-    def getVehiclesToHalt(self, haltedVehicles: set[Vehicle]) -> set[Vehicle]:
-        """Returns a list of vehicles to halt.
-
-        Args:
-            nearbyVehicles (set[Vehicle]): List of nearby vehicles.
-            haltingVehicles (set[Vehicle]): List of already halted vehicles.
 
-        Returns:
-            set[Vehicle]: List of vehicles to halt.
-        """
-
-        # vehiclesToHalt = set()
-        # for nearbyVeh in self.nearbyVehicles:
-        #     if nearbyVeh.id not in (haltedVeh.id for haltedVeh in haltedVehicles):
-        #         vehiclesToHalt.add(nearbyVeh)
-        return self.nearbyVehicles
+class EmergencyVehicle(Vehicle):
+    """The EV. Vehicles around it are found by the `ProximityEngine`, from the positions subscribed to for every vehicle."""
+    __slots__ = ()
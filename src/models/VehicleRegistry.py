@@ -0,0 +1,91 @@
+from .TraciProxy import traci
+from .Vehicle import SUBSCRIBED_VARIABLES, Vehicle, EmergencyVehicle
+
+
+class VehicleRegistry:
+    """Long-lived registry of the vehicles on the network, keyed by vehicle ID.
+
+    The registry is updated incrementally from the vehicles that departed and
+    arrived during the last step, so vehicle objects live as long as their
+    vehicle does, and the EV is subscribed to exactly once.
+    """
+
+    def __init__(self, cvTypeId: str = "Connected", evId: str = "EV", evVariables: list[int] = None, variables: list[int] = None) -> None:
+        # The vehicle type ID for CVs.
+        self.cvTypeId = cvTypeId
+        # The vehicle ID of the EV.
+        self.evId = evId
+        # Variables subscribed to for every vehicle.
+        self.variables = SUBSCRIBED_VARIABLES + \
+            [var for var in variables or [] if var not in SUBSCRIBED_VARIABLES]
+        # Variables subscribed to for the EV, on top of those of every vehicle.
+        self.evVariables = self.variables + \
+            [var for var in evVariables or [] if var not in self.variables]
+        # All vehicles currently on the network.
+        self.vehicles: dict[str, Vehicle] = {}
+        # CVs currently on the network.
+        self.connectedVehicles: dict[str, Vehicle] = {}
+        # Reference to the EV, while it is on the network.
+        self.emergencyVehicle: EmergencyVehicle = None
+        # IDs of the vehicles that arrived, and departed, during the last step.
+        self.arrivedIds: tuple[str] = ()
+        self.departedIds: tuple[str] = ()
+        # The subscribed values of every vehicle on the network, keyed by ID, as of the last update.
+        self.results: dict[str, dict] = {}
+        # IDs of vehicles on the network that never departed, e.g. those of a loaded state. See `addRunning`.
+        self.runningIds: tuple[str] = ()
+
+    def addRunning(self) -> None:
+        """Registers the vehicles already on the network, e.g. after loading a saved state, with the next update."""
+        self.runningIds = traci.vehicle.getIDList()
+
+    def update(self) -> None:
+        """Applies the departures and arrivals of the last step, and refreshes the subscribed values."""
+        self.arrivedIds = traci.simulation.getArrivedIDList()
+        for vehId in self.arrivedIds:
+            self.remove(vehId)
+
+        departedIds = list(dict.fromkeys(
+            [*self.runningIds, *traci.simulation.getDepartedIDList()]))
+        self.runningIds = ()
+        self.departedIds = tuple(departedIds)
+        for vehId in departedIds:
+            Vehicle.subscribe(
+                vehId, self.evVariables if vehId == self.evId else self.variables)
+
+        # One batch read for the values of every vehicle.
+        subResults = traci.vehicle.getAllSubscriptionResults()
+        self.results = subResults
+        for vehId in departedIds:
+            self.add(vehId, subResults[vehId])
+        for vehId, values in subResults.items():
+            veh = self.vehicles.get(vehId)
+            if veh is not None:
+                veh._values = values
+
+    def add(self, vehId: str, subscriptionResults: dict) -> None:
+        """Registers a newly departed vehicle.
+
+        Args:
+            vehId (str): ID of the vehicle.
+            subscriptionResults (dict): The vehicle's subscribed values.
+        """
+        if vehId == self.evId:
+            veh = EmergencyVehicle(vehId, subscriptionResults)
+            self.emergencyVehicle = veh
+        else:
+            veh = Vehicle(vehId, subscriptionResults)
+        self.vehicles[vehId] = veh
+        if veh.type == self.cvTypeId:
+            self.connectedVehicles[vehId] = veh
+
+    def remove(self, vehId: str) -> None:
+        """Unregisters an arrived vehicle.
+
+        Args:
+            vehId (str): ID of the vehicle.
+        """
+        self.vehicles.pop(vehId, None)
+        self.connectedVehicles.pop(vehId, None)
+        if vehId == self.evId:
+            self.emergencyVehicle = None
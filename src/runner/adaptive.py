@@ -0,0 +1,172 @@
+import math
+from statistics import NormalDist
+from typing import Callable
+import numpy as np
+from termcolor import colored
+from ..models.Simulation import findOutputFiles
+from ..utilities import conflicts
+from . import completion, process_conflicts, run_store
+
+# The fewest reruns a cell stops after, so that its confidence intervals have at least 3 degrees of freedom (see `tQuantile`).
+MIN_RUNS = 4
+
+# The metrics that have to converge before a cell stops, i.e. the EV's travel time and time loss, and the number of conflicts of each type.
+METRICS = ["duration", "timeLoss", *
+           [type.lower() for type in process_conflicts.REPORTED_TYPES]]
+
+
+def tQuantile(p: float, df: int) -> float:
+    """Returns the p-th quantile of Student's t distribution.
+
+    Uses the Cornish-Fisher expansion around the normal quantile, which is
+    accurate to about 0.01 from 3 degrees of freedom on.
+
+    Args:
+        p (float): The probability, between 0 and 1.
+        df (int): The degrees of freedom.
+
+    Returns:
+        float: The quantile.
+    """
+    z = NormalDist().inv_cdf(p)
+    return (z
+            + (z**3 + z) / (4 * df)
+            + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+
+def getRelativeWidth(values: list[float], confidence: float) -> float:
+    """Returns the half-width of the confidence interval of the mean, relative to the mean.
+
+    Args:
+        values (list[float]): The value of a metric, in each run.
+        confidence (float): The confidence level, e.g. 0.95.
+
+    Returns:
+        float: The relative half-width. Infinite with fewer than 2 values.
+    """
+    if len(values) < 2:
+        return math.inf
+    mean = np.mean(values)
+    halfWidth = tQuantile((1 + confidence) / 2, len(values) - 1) * \
+        np.std(values, ddof=1) / math.sqrt(len(values))
+    if halfWidth == 0:
+        return 0.0
+    return halfWidth / abs(mean) if mean != 0 else math.inf
+
+
+def getRunMetrics(job: dict, outputDir: str) -> dict[str, float]:
+    """Returns the metrics of a completed run.
+
+    Args:
+        job (dict): The job of the run.
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        dict[str, float]: The value of each of `METRICS`.
+    """
+    files = findOutputFiles(outputDir, job["prefix"])
+    tripinfo = run_store.read(files["tripinfo"], ['id', 'duration', 'timeLoss'])
+    ev = tripinfo[tripinfo['id'].str.contains("EV")]
+    counts = conflicts.count(run_store.read(files["ssm"], ['type'])['type'])
+
+    metrics = {"duration": ev['duration'].median(),
+               "timeLoss": ev['timeLoss'].median()}
+    for type in process_conflicts.REPORTED_TYPES:
+        metrics[type.lower()] = float(
+            counts[conflicts.CONFLICT_TYPES.index(type)])
+    return metrics
+
+
+def getCellWidth(runMetrics: list[dict[str, float]], confidence: float, metrics: list[str] = None) -> float:
+    """Returns the widest relative confidence interval over the metrics of a cell's runs.
+
+    Args:
+        runMetrics (list[dict[str, float]]): The metrics of each completed run of the cell. See `getRunMetrics`.
+        confidence (float): The confidence level.
+        metrics (list[str], optional): The metrics to consider. Defaults to `METRICS`.
+
+    Returns:
+        float: The relative half-width.
+    """
+    return max(getRelativeWidth([values[metric] for values in runMetrics if not math.isnan(values[metric])], confidence)
+               for metric in metrics or METRICS)
+
+
+def runAdaptive(runBatch: Callable[[list[dict]], None], jobs: list[dict], outputDir: str, ciWidth: float, minRuns: int, maxRuns: int, confidence: float = 0.95, metrics: list[str] = None, completedJobs: list[dict] = None) -> None:
+    """Keeps rerunning each (demand, penetration) cell until its results converge.
+
+    Every cell first runs `minRuns` reruns. After that, cells whose confidence
+    interval of any of the metrics is still wider than `ciWidth` (relative to the
+    mean) get one more rerun each, in rounds, until they converge or reach
+    `maxRuns`. Reruns are taken from the manifest in order, so their seeds
+    don't depend on when a cell stops. A rerun that fails isn't retried, nor
+    counted. Its cell takes the next rerun of the manifest instead.
+
+    Args:
+        runBatch (Callable[[list[dict]], None]): Runs a batch of jobs, e.g. `run_simulation.runSweep`. Must attempt every job, even after one failed, and may raise afterwards.
+        jobs (list[dict]): The jobs of the manifest.
+        outputDir (str): The output directory of the case study.
+        ciWidth (float): The target half-width of the confidence intervals, relative to the mean, e.g. 0.05 for ±5%.
+        minRuns (int): The number of reruns of a cell before it may stop. At least `MIN_RUNS`.
+        maxRuns (int): The maximum number of reruns of a cell.
+        confidence (float, optional): The confidence level. Defaults to 0.95.
+        metrics (list[str], optional): The metrics that have to converge. Defaults to `METRICS`.
+        completedJobs (list[dict], optional): The jobs completed earlier, e.g. when resuming. Defaults to none.
+    """
+    minRuns = max(MIN_RUNS, minRuns)
+    metrics = metrics or METRICS
+    cells: dict[tuple[int, str], list[dict]] = {}
+    for job in jobs:
+        cells.setdefault((job["demand"], job["penetration"]), []).append(job)
+    completed = {job["prefix"] for job in completedJobs or []}
+    failed: set[str] = set()
+    # The metrics of every completed run, read once.
+    runMetrics: dict[str, dict[str, float]] = {}
+
+    active = list(cells)
+    roundNum = 0
+    while active:
+        # The next reruns of every cell that hasn't converged yet.
+        batch = []
+        for cell in active:
+            done = sum(job["prefix"] in completed for job in cells[cell])
+            needed = min(max(minRuns, done + 1), maxRuns) - done
+            batch += [job for job in cells[cell]
+                      if job["prefix"] not in completed and job["prefix"] not in failed][:needed]
+        roundNum += 1
+        print(
+            f"""\t> Adaptive round ({colored(roundNum, 'yellow')}): ({colored(len(batch), 'yellow')}) runs across ({colored(len(active), 'yellow')}) cells...""")
+        if batch:
+            try:
+                runBatch(batch)
+            except Exception as e:
+                print(
+                    f"""\t{colored('[✗]', 'red')} Adaptive round ({roundNum}) had failures. Reason: {colored(e, 'red')}""")
+            # Only count the runs that completed. The others are replaced by the next reruns of their cells.
+            for job in batch:
+                if completion.isComplete(job, outputDir):
+                    completed.add(job["prefix"])
+                else:
+                    failed.add(job["prefix"])
+
+        stillActive = []
+        for cell in active:
+            cellJobs = [job for job in cells[cell]
+                        if job["prefix"] in completed]
+            for job in cellJobs:
+                if job["prefix"] not in runMetrics:
+                    runMetrics[job["prefix"]] = getRunMetrics(job, outputDir)
+            width = getCellWidth(
+                [runMetrics[job["prefix"]] for job in cellJobs], confidence, metrics)
+            label = f"{colored(f'd{cell[0]}', 'magenta')}_{colored(f'p{cell[1]}', 'cyan')}"
+            if width <= ciWidth:
+                print(
+                    f"""\t{colored('[✓]', 'green')} ({label}) converged after ({colored(len(cellJobs), 'yellow')}) runs (±{width:.1%}).""")
+            elif len(cellJobs) >= maxRuns or all(job["prefix"] in completed or job["prefix"] in failed for job in cells[cell]):
+                print(
+                    f"""\t{colored('[-]', 'yellow')} ({label}) stopped at the maximum of ({colored(len(cellJobs), 'yellow')}) runs (±{width:.1%}).""")
+            else:
+                stillActive.append(cell)
+        active = stillActive
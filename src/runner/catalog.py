@@ -0,0 +1,186 @@
+import json
+import os
+from pathlib import Path
+from ..models.Simulation import findOutputFiles
+from .completion import hasOutputs
+
+# Run statuses.
+COMPLETE = "complete"
+FAILED = "failed"
+
+# Catalogs by output directory, with the modification time they were read at. See `getCatalog`.
+catalogs: dict[str, tuple[float, dict[str, dict], dict[str, dict]]] = {}
+
+
+def getCatalogFile(outputDir: str) -> str:
+    """Returns the path of the run catalog of a case study.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        str: The catalog file.
+    """
+    return f"{outputDir}/done/catalog.jsonl"
+
+
+def recordRun(job: dict, outputDir: str, status: str = COMPLETE) -> None:
+    """Appends a run, its output files, and its status to the catalog. Later entries of a run replace earlier ones.
+
+    Args:
+        job (dict): The job of the run.
+        outputDir (str): The output directory of the case study.
+        status (str, optional): `COMPLETE` or `FAILED`. Defaults to `COMPLETE`.
+    """
+    entry = {
+        "prefix": job["prefix"],
+        "demand": job["demand"],
+        "penetration": job["penetration"],
+        "runNum": job["runNum"],
+        "status": status,
+        "files": findOutputFiles(outputDir, job["prefix"]),
+    }
+    catalogFile = getCatalogFile(outputDir)
+    os.makedirs(os.path.dirname(catalogFile), exist_ok=True)
+    # A single short write in append mode, so that concurrent workers don't interleave lines.
+    with open(catalogFile, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def readCatalog(outputDir: str) -> dict[str, dict]:
+    """Reads the latest entry of every run in the catalog.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        dict[str, dict]: The entries, by run prefix, in the order the runs were first recorded.
+    """
+    catalogFile = getCatalogFile(outputDir)
+    if not os.path.isfile(catalogFile):
+        return {}
+    entries = {}
+    with open(catalogFile) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["prefix"]] = entry
+    return entries
+
+
+def getCatalog(outputDir: str) -> tuple[dict[str, dict], dict[str, dict]]:
+    """Returns the (cached) catalog of a case study, re-read only when the catalog file changed.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        tuple[dict[str, dict], dict[str, dict]]: The entries by run prefix, and by output file.
+    """
+    catalogFile = getCatalogFile(outputDir)
+    mtime = os.path.getmtime(catalogFile) if os.path.isfile(
+        catalogFile) else None
+    if outputDir not in catalogs or catalogs[outputDir][0] != mtime:
+        entries = readCatalog(outputDir)
+        byFile = {Path(file).as_posix(): entry
+                  for entry in entries.values() for file in entry["files"].values()}
+        catalogs[outputDir] = (mtime, entries, byFile)
+    return catalogs[outputDir][1:]
+
+
+def update(jobs: list[dict], outputDir: str) -> int:
+    """Catalogs the runs with complete outputs that aren't in the catalog yet, e.g. those run before it existed.
+
+    Args:
+        jobs (list[dict]): The jobs.
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        int: The number of runs added.
+    """
+    entries = readCatalog(outputDir)
+    added = 0
+    for job in jobs:
+        if job["prefix"] not in entries and hasOutputs(job, outputDir):
+            recordRun(job, outputDir)
+            added += 1
+    return added
+
+
+def queryRuns(entries: dict[str, dict], demand: int = None, penetration: str = None, status: str = COMPLETE) -> list[dict]:
+    """Selects the runs of a cell, or of all cells.
+
+    Args:
+        entries (dict[str, dict]): The catalog entries. See `readCatalog`.
+        demand (int, optional): The traffic demand. Defaults to all demands.
+        penetration (str, optional): The penetration rate (e.g. "25_75"). Defaults to all penetration rates.
+        status (str, optional): The status of the runs. Defaults to `COMPLETE`.
+
+    Returns:
+        list[dict]: The entries of the selected runs.
+    """
+    return [entry for entry in entries.values()
+            if entry["status"] == status
+            and (demand is None or entry["demand"] == demand)
+            and (penetration is None or entry["penetration"] == penetration)]
+
+
+def getCells(entries: list[dict]) -> list[tuple[int, str]]:
+    """Returns the distinct (demand, penetration) cells of the runs, in order.
+
+    Args:
+        entries (list[dict]): The catalog entries.
+
+    Returns:
+        list[tuple[int, str]]: The cells.
+    """
+    return list(dict.fromkeys((entry["demand"], entry["penetration"]) for entry in entries))
+
+
+def getCellLabels(demand: int, penetration: str) -> tuple[str, str]:
+    """Returns the demand and penetration labels of a cell, as they appear in the processed data.
+
+    E.g. (1500, "25_75") -> ("1500", "25").
+
+    Args:
+        demand (int): The traffic demand.
+        penetration (str): The penetration rate.
+
+    Returns:
+        tuple[str, str]: The demand, and penetration labels.
+    """
+    return str(demand), penetration.split('_')[0]
+
+
+def getRunLabels(entry: dict) -> tuple[str, str, str]:
+    """Returns the demand, penetration, and run labels of a run, as they appear in the processed data.
+
+    E.g. the run `d1500_p25_75_r3` -> ("1500", "25", "3").
+
+    Args:
+        entry (dict): The catalog entry, or job, of the run.
+
+    Returns:
+        tuple[str, str, str]: The demand, penetration, and run labels.
+    """
+    return (*getCellLabels(entry["demand"], entry["penetration"]), str(entry["runNum"]))
+
+
+def findRun(file: str) -> dict:
+    """Returns the catalog entry of the run that an output file belongs to.
+
+    Args:
+        file (str): The output file, within `<outputDir>/<folder>/`.
+
+    Raises:
+        ValueError: If the file isn't in the catalog.
+
+    Returns:
+        dict: The catalog entry.
+    """
+    path = Path(file)
+    _, byFile = getCatalog(path.parent.parent.as_posix())
+    entry = byFile.get(path.as_posix())
+    if entry is None:
+        raise ValueError(f"{file} isn't in the run catalog.")
+    return entry
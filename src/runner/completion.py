@@ -0,0 +1,186 @@
+import json
+import os
+from ..models.Simulation import findOutputFiles
+from .generate_trips import fileChecksum
+
+# The closing tag of each XML output file. A file without it was cut short.
+CLOSING_TAGS = {
+    "tripinfo": b"</tripinfos>",
+    "ssm": b"</SSMLog>",
+    "fcd": b"</fcd-export>",
+}
+
+# Parquet files end with their magic number, after the footer. A file without it was cut short.
+PARQUET_MAGIC = b"PAR1"
+
+
+def getMarkerFile(outputDir: str, prefix: str) -> str:
+    """Returns the path of a run's completion marker.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+        prefix (str): The run prefix.
+
+    Returns:
+        str: The marker file.
+    """
+    return f"{outputDir}/done/{prefix}.json"
+
+
+def isWellFormed(filePath: str, closingTag: bytes) -> bool:
+    """Returns True if the XML file exists and ends with its closing tag.
+
+    Args:
+        filePath (str): The XML file.
+        closingTag (bytes): The expected closing tag.
+
+    Returns:
+        bool: Whether the file was written to completion.
+    """
+    if not os.path.isfile(filePath):
+        return False
+    with open(filePath, "rb") as f:
+        f.seek(max(0, os.path.getsize(filePath) - 256))
+        return closingTag in f.read()
+
+
+def isWritten(filePath: str, kind: str) -> bool:
+    """Returns True if the output file exists and was written to completion.
+
+    Args:
+        filePath (str): The output file.
+        kind (str): The kind of output, i.e. `tripinfo`, `ssm`, or `fcd`.
+
+    Returns:
+        bool: Whether the file is complete. Captured (`.npz`) files are written at once, and always are.
+    """
+    if filePath.endswith(".npz"):
+        return os.path.isfile(filePath)
+    if filePath.endswith(".parquet"):
+        return isWellFormed(filePath, PARQUET_MAGIC)
+    return isWellFormed(filePath, CLOSING_TAGS[kind])
+
+
+def markComplete(job: dict, outputDir: str) -> None:
+    """Records that a run completed, along with the checksums of its outputs.
+
+    Args:
+        job (dict): The completed job.
+        outputDir (str): The output directory of the case study.
+    """
+    files = {}
+    for kind, filePath in findOutputFiles(outputDir, job["prefix"]).items():
+        if os.path.isfile(filePath):
+            files[kind] = {"path": filePath,
+                           "size": os.path.getsize(filePath),
+                           "sha1": fileChecksum(filePath)}
+
+    markerFile = getMarkerFile(outputDir, job["prefix"])
+    os.makedirs(os.path.dirname(markerFile), exist_ok=True)
+    with open(markerFile, "w") as f:
+        json.dump({"job": job, "files": files}, f)
+
+
+def isComplete(job: dict, outputDir: str) -> bool:
+    """Returns True if the run completed, for the same job, and none of its outputs changed since.
+
+    Args:
+        job (dict): The job.
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        bool: Whether the run can be skipped.
+    """
+    markerFile = getMarkerFile(outputDir, job["prefix"])
+    if not os.path.isfile(markerFile):
+        return False
+    try:
+        with open(markerFile) as f:
+            marker = json.load(f)
+    except ValueError:
+        return False
+
+    # A different job (e.g. other seeds) under the same prefix must rerun.
+    if marker["job"] != job:
+        return False
+
+    for kind in CLOSING_TAGS:
+        file = marker["files"].get(kind)
+        if file is None or not isWritten(file["path"], kind):
+            return False
+        if os.path.getsize(file["path"]) != file["size"] or fileChecksum(file["path"]) != file["sha1"]:
+            return False
+    return True
+
+
+def hasOutputs(job: dict, outputDir: str) -> bool:
+    """Returns True if all outputs of the run exist and were written to completion, whether or not it was marked complete.
+
+    Args:
+        job (dict): The job.
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        bool: Whether the run has usable outputs.
+    """
+    for kind, filePath in findOutputFiles(outputDir, job["prefix"]).items():
+        if not isWritten(filePath, kind):
+            return False
+    return True
+
+
+def getPendingJobs(jobs: list[dict], outputDir: str) -> list[dict]:
+    """Returns the jobs that are missing, incomplete, or whose outputs are corrupted.
+
+    Args:
+        jobs (list[dict]): The jobs.
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        list[dict]: The jobs to run, in order.
+    """
+    return [job for job in jobs if not isComplete(job, outputDir)]
+
+
+def getInputSignature(files: list[str]) -> list[list]:
+    """Returns a cheap fingerprint (name, size, modification time) of a set of input files.
+
+    Args:
+        files (list[str]): The input files.
+
+    Returns:
+        list[list]: The fingerprint.
+    """
+    signature = []
+    for file in sorted(files):
+        stat = os.stat(file)
+        signature.append([file, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def isUpToDate(files: list[str], outputFile: str) -> bool:
+    """Returns True if the output was produced from exactly the given, unchanged, input files.
+
+    Args:
+        files (list[str]): The input files.
+        outputFile (str): The output file.
+
+    Returns:
+        bool: Whether the output can be reused.
+    """
+    signatureFile = f"{outputFile}.inputs.json"
+    if not os.path.isfile(outputFile) or not os.path.isfile(signatureFile):
+        return False
+    with open(signatureFile) as f:
+        return json.load(f) == getInputSignature(files)
+
+
+def recordInputs(files: list[str], outputFile: str) -> None:
+    """Records the input files an output was produced from. See `isUpToDate`.
+
+    Args:
+        files (list[str]): The input files.
+        outputFile (str): The output file.
+    """
+    with open(f"{outputFile}.inputs.json", "w") as f:
+        json.dump(getInputSignature(files), f)
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import random
+import xml.etree.ElementTree as et
+import sumolib
+from sumolib.miscutils import euclidean
+
+# Bump whenever the generated output changes, to invalidate cached trip files.
+GENERATOR_VERSION = 1
+
+# The vehicle class that trips are validated for.
+VEHICLE_CLASS = "passenger"
+
+# The number of attempts at finding a valid origin/destination pair for a single trip.
+MAX_TRIES = 100
+
+# The end of the insertion period, in seconds.
+END_TIME = 3600
+
+
+def fileChecksum(filePath: str) -> str:
+    """Returns the SHA-1 checksum of a file's content.
+
+    Args:
+        filePath (str): The file to hash.
+
+    Returns:
+        str: Hex digest of the file.
+    """
+    digest = hashlib.sha1()
+    with open(filePath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TripGenerator:
+    """In-process equivalent of `randomTrips.py --fringe-junctions --validate`.
+
+    The network is parsed once, and the fringe edges, their weights, and the
+    validated routes between them are cached for the lifetime of the generator.
+    Trips are then drawn from a seeded RNG, so identical inputs yield identical
+    trip files, which are cached on disk by content.
+    """
+
+    def __init__(self, networkFilePath: str, configFilePath: str = "src/config/trips.cfgtrips.xml") -> None:
+        self.networkFilePath = networkFilePath
+        self.net = sumolib.net.readNet(networkFilePath)
+
+        # Read the same settings as randomTrips would.
+        config = {node.tag: node.attrib.get("value")
+                  for node in et.parse(configFilePath).getroot()}
+        self.fringeFactor = float(config.get("fringe-factor", 1.0))
+        self.minDistance = float(config.get("min-distance", 0.0))
+        self.tripAttributes = config.get("trip-attributes", "")
+
+        # Identifies the inputs that every trip file depends on.
+        self.inputHash = f"{GENERATOR_VERSION}:{fileChecksum(networkFilePath)}:{fileChecksum(configFilePath)}"
+
+        self.sources, self.sourceWeights = self.weighEdges(
+            lambda edge: edge.getFromNode())
+        self.sinks, self.sinkWeights = self.weighEdges(
+            lambda edge: edge.getToNode())
+
+        # Validated routes between edge pairs. `None` if no route exists.
+        self.routes: dict[tuple[str, str], tuple[str]] = {}
+
+    def weighEdges(self, getFringeNode) -> tuple[list, list[float]]:
+        """Weighs all edges as trip origins or destinations. Fringe edges are favoured by the fringe factor.
+
+        Args:
+            getFringeNode (Callable): Returns the node of an edge that decides whether it is on the fringe.
+
+        Returns:
+            tuple[list, list[float]]: The candidate edges, and their cumulative weights.
+        """
+        roundabouts = set()
+        for roundabout in self.net.getRoundabouts():
+            roundabouts.update(roundabout.getEdges())
+
+        edges = []
+        cumWeights = []
+        total = 0.0
+        for edge in self.net.getEdges():
+            if not edge.allows(VEHICLE_CLASS) or edge.getID() in roundabouts:
+                continue
+            weight = 1.0
+            if edge.getSpeed() > 0 and getFringeNode(edge).getFringe() is not None:
+                weight *= self.fringeFactor
+            total += weight
+            edges.append(edge)
+            cumWeights.append(total)
+        return edges, cumWeights
+
+    def getRoute(self, source, sink) -> tuple[str]:
+        """Returns the fastest route between two edges, or `None` if there is none.
+
+        Args:
+            source (sumolib.net.edge.Edge): The origin edge.
+            sink (sumolib.net.edge.Edge): The destination edge.
+
+        Returns:
+            tuple[str]: The IDs of the route's edges.
+        """
+        key = (source.getID(), sink.getID())
+        if key not in self.routes:
+            path, _ = self.net.getFastestPath(
+                source, sink, vClass=VEHICLE_CLASS)
+            self.routes[key] = None if path is None else tuple(
+                edge.getID() for edge in path)
+        return self.routes[key]
+
+    def getTrip(self, rng: random.Random) -> tuple[str]:
+        """Draws a random, valid route.
+
+        Args:
+            rng (random.Random): The RNG to draw from.
+
+        Returns:
+            tuple[str]: The IDs of the route's edges, or `None` if no valid route was found.
+        """
+        for _ in range(MAX_TRIES):
+            source = rng.choices(self.sources, cum_weights=self.sourceWeights)[0]
+            sink = rng.choices(self.sinks, cum_weights=self.sinkWeights)[0]
+            distance = euclidean(source.getFromNode().getCoord(),
+                                 sink.getToNode().getCoord())
+            if distance < self.minDistance:
+                continue
+            route = self.getRoute(source, sink)
+            if route is not None:
+                return route
+        return None
+
+    def writeTrips(self, demand: float, seed: int, outputFilePath: str) -> None:
+        """Writes a routes file with equally spaced departures.
+
+        Args:
+            demand (float): The traffic demand, in vehicles per hour.
+            seed (int): The seed of the RNG.
+            outputFilePath (str): The routes file to write.
+        """
+        rng = random.Random(seed)
+        period = 3600.0 / demand
+        tmpFilePath = f"{outputFilePath}.{os.getpid()}.tmp"
+        with open(tmpFilePath, "w") as f:
+            f.write("<routes>\n")
+            index = 0
+            departure = 0.0
+            while departure < END_TIME:
+                route = self.getTrip(rng)
+                if route is not None:
+                    f.write(
+                        f'    <vehicle id="{index}" depart="{departure:.2f}" {self.tripAttributes}>\n'
+                        f'        <route edges="{" ".join(route)}"/>\n'
+                        '    </vehicle>\n')
+                    index += 1
+                departure += period
+            f.write("</routes>\n")
+        # Concurrent workers may write the same file. Either copy is valid.
+        os.replace(tmpFilePath, outputFilePath)
+
+    def getTrips(self, demand: float, seed: int, cacheDir: str) -> str:
+        """Returns a routes file for the given demand and seed, generating it if it isn't cached yet.
+
+        Args:
+            demand (float): The traffic demand, in vehicles per hour.
+            seed (int): The seed of the RNG.
+            cacheDir (str): The directory of the cached routes files.
+
+        Returns:
+            str: Path of the routes file.
+        """
+        key = hashlib.sha1(
+            f"{self.inputHash}:{demand}:{seed}".encode()).hexdigest()[:16]
+        tripFilePath = f"{cacheDir}/trips_{key}.rou.xml"
+        if not os.path.isfile(tripFilePath):
+            os.makedirs(cacheDir, exist_ok=True)
+            self.writeTrips(demand, seed, tripFilePath)
+        return tripFilePath
+
+
+# Generators by network file, so that each process parses a network only once.
+generators: dict[str, TripGenerator] = {}
+
+
+def getTripGenerator(networkFilePath: str) -> TripGenerator:
+    """Returns the (cached) trip generator of a network.
+
+    Args:
+        networkFilePath (str): The network file.
+
+    Returns:
+        TripGenerator: The generator.
+    """
+    if networkFilePath not in generators:
+        generators[networkFilePath] = TripGenerator(networkFilePath)
+    return generators[networkFilePath]
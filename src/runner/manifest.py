@@ -0,0 +1,111 @@
+import json
+import random
+from pathlib import Path
+from .run_simulation import createJob
+
+# Window in which the EV is inserted, in seconds.
+EV_INSERTION_WINDOW = (60 * 10, 60 * 15)
+
+# The default number of reruns per seed family, when warm-starting.
+FAMILY_SIZE = 5
+
+
+def createManifest(demands: list[int], vTypeFiles: list[str], reruns: int, seed: int, familySize: int = None) -> list[dict]:
+    """Describes every run of the sweep, including all of its random inputs.
+
+    Seeds are derived from the master seed, demand, and run number only. Every
+    penetration rate of a given demand and run therefore sees the same traffic
+    and EV insertion time, and differs only in its vehicle types.
+
+    With a `familySize`, runs are warm-started: consecutive reruns are grouped
+    into seed families of that size, which share their trips and the saved state
+    of the network at the start of the EV insertion window. Each run still has
+    its own SUMO seed and EV insertion time.
+
+    Runs of a family aren't independent samples: they share their traffic. Only
+    runs of different families are, so a cell's reruns amount to as many
+    independent samples as it has families. Keep families small, so that
+    averages and confidence intervals over reruns stay meaningful.
+
+    Args:
+        demands (list[int]): The traffic demands, in vehicles per hour.
+        vTypeFiles (list[str]): The vType distribution files of the CV penetration rates.
+        reruns (int): The number of reruns per (demand, penetration) cell.
+        seed (int): The master seed.
+        familySize (int, optional): The number of reruns per seed family. Defaults to cold-starting every run.
+
+    Returns:
+        list[dict]: The jobs, in execution order.
+    """
+    jobs = []
+    for demand in demands:
+        for vTypeFile in vTypeFiles:
+            penetrationRatio = Path(vTypeFile).stem.replace('.add', '')
+            for runNum in range(reruns):
+                rng = random.Random(f"{seed}:d{demand}:r{runNum}")
+                job = createJob(demand, vTypeFile,
+                                penetrationRatio, runNum, reruns)
+                job["tripSeed"] = rng.randrange(2**31)
+                job["sumoSeed"] = rng.randrange(2**31)
+                job["evInsertionTime"] = rng.randint(*EV_INSERTION_WINDOW)
+                if familySize:
+                    family = runNum // familySize
+                    familyRng = random.Random(f"{seed}:d{demand}:f{family}")
+                    job["family"] = family
+                    job["tripSeed"] = familyRng.randrange(2**31)
+                    job["warmupSeed"] = familyRng.randrange(2**31)
+                    job["warmup"] = EV_INSERTION_WINDOW[0]
+                jobs.append(job)
+    return jobs
+
+
+def writeManifest(jobs: list[dict], filePath: str) -> None:
+    """Writes the jobs as JSON lines, one job per line.
+
+    Args:
+        jobs (list[dict]): The jobs.
+        filePath (str): The manifest file.
+    """
+    with open(filePath, "w") as f:
+        for job in jobs:
+            f.write(json.dumps(job) + "\n")
+
+
+def readManifest(filePath: str) -> list[dict]:
+    """Reads the jobs of a manifest file.
+
+    Args:
+        filePath (str): The manifest file.
+
+    Returns:
+        list[dict]: The jobs, in execution order.
+    """
+    with open(filePath) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def filterJobs(jobs: list[dict], prefixes: list[str] = None) -> list[dict]:
+    """Selects the jobs with the given run prefixes (e.g. "d1500_p25_75_r3").
+
+    Args:
+        jobs (list[dict]): The jobs.
+        prefixes (list[str], optional): The prefixes to keep. Defaults to all jobs.
+
+    Returns:
+        list[dict]: The selected jobs, in execution order.
+    """
+    if not prefixes:
+        return jobs
+    return [job for job in jobs if job["prefix"] in prefixes]
+
+
+def getCells(jobs: list[dict]) -> list[tuple[int, str]]:
+    """Returns the distinct (demand, penetration) cells of the jobs, in order.
+
+    Args:
+        jobs (list[dict]): The jobs.
+
+    Returns:
+        list[tuple[int, str]]: The cells.
+    """
+    return list(dict.fromkeys((job["demand"], job["penetration"]) for job in jobs))
@@ -0,0 +1,209 @@
+import collections
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+import pandas as pd
+from termcolor import colored
+from ..utilities.running_stats import RunningStats
+from . import catalog, completion, process_conflicts, process_FCDs, process_tripinfo, run_store
+
+# The processor of each kind of output, and the title of its output files.
+PROCESSORS = {
+    "tripinfo": process_tripinfo,
+    "ssm": process_conflicts,
+    "fcd": process_FCDs,
+}
+
+# The runs submitted to the workers at a time, per worker, ahead of the run being merged.
+RUNS_PER_WORKER = 2
+
+
+class Reducer:
+    """Reduces the data of every run into output files, one run at a time.
+
+    Each run's data is first reduced to a partial result, which is combined
+    into those of the other runs of the same output file. Once all runs were
+    read, the combined results of each output file are written.
+    """
+
+    def __init__(self, kind: str, title: str, getOutputFile: Callable[[dict], str], reduceRun: Callable[[pd.DataFrame, dict], object], write: Callable[[object, str], None]) -> None:
+        # The kind of output read, i.e. `tripinfo`, `ssm`, or `fcd`.
+        self.kind = kind
+        # The name of the reducer, in progress messages.
+        self.title = title
+        # Returns the output file a job contributes to.
+        self.getOutputFile = getOutputFile
+        # Reduces the data of a single run.
+        self.reduceRun = reduceRun
+        # Writes the combined results of all runs of an output file.
+        self.write = write
+        # Combined results, by output file. See `combinePartials`.
+        self.partials: dict[str, object] = {}
+
+
+def combinePartials(combined, partial):
+    """Combines the partial result of a run into those of earlier runs.
+
+    Running statistics are merged as they arrive, so they don't grow with the
+    number of runs. Any other partial results are collected in a list.
+
+    Args:
+        combined (object): The combined results so far. `None` for the first run.
+        partial (object): The partial result of the run.
+
+    Returns:
+        object: The combined results.
+    """
+    if isinstance(partial, RunningStats):
+        return partial if combined is None else combined.merge(partial)
+    if combined is None:
+        combined = []
+    combined.append(partial)
+    return combined
+
+
+def getReducers(outputDir: str) -> list[Reducer]:
+    """Returns the reducers producing the per-cell averages and the aggregates, of every kind of output.
+
+    Args:
+        outputDir (str): The output directory of the case study.
+
+    Returns:
+        list[Reducer]: The reducers.
+    """
+    reducers = []
+    for kind, processor in PROCESSORS.items():
+        reducers.append(Reducer(
+            kind, f"{kind.upper()} averages",
+            lambda job, kind=kind: f"{outputDir}/stats/{kind}_d{job['demand']}_p{job['penetration']}.csv",
+            lambda data, job, processor=processor: processor.averageRun(data),
+            processor.writeAverage))
+        reducers.append(Reducer(
+            kind, f"{kind.upper()} aggregation",
+            lambda job, kind=kind: f"{outputDir}/agg/{kind}.csv",
+            lambda data, job, processor=processor: processor.aggregateRun(
+                data, *catalog.getRunLabels(job)),
+            processor.writeAggregate))
+    return reducers
+
+
+def reduceFiles(reducers: list[Reducer], job: dict, files: dict[str, str], staleOutputs: set[str]) -> list[tuple[int, str, pd.DataFrame]]:
+    """Reads the output files of a single run once, and reduces them with every reducer of a stale output file.
+
+    Args:
+        reducers (list[Reducer]): The reducers.
+        job (dict): The job of the run.
+        files (dict[str, str]): The run's output files, by kind.
+        staleOutputs (set[str]): The output files to produce.
+
+    Returns:
+        list[tuple[int, str, pd.DataFrame]]: The index of the reducer, the output file, and the partial result, of each reduction.
+    """
+    partials = []
+    for kind, processor in PROCESSORS.items():
+        kindReducers = [(index, reducer) for index, reducer in enumerate(reducers)
+                        if reducer.kind == kind and reducer.getOutputFile(job) in staleOutputs]
+        if not kindReducers or not os.path.isfile(files[kind]):
+            continue
+        data = run_store.read(files[kind], processor.COLUMNS)
+        for index, reducer in kindReducers:
+            partials.append(
+                (index, reducer.getOutputFile(job), reducer.reduceRun(data, job)))
+    return partials
+
+
+def reduceFilesInWorker(outputDir: str, job: dict, files: dict[str, str], staleOutputs: set[str]) -> list[tuple[int, str, pd.DataFrame]]:
+    """Same as `reduceFiles`, inside a worker process. Reducers can't be pickled, so each worker creates its own."""
+    return reduceFiles(getReducers(outputDir), job, files, staleOutputs)
+
+
+def reduceInPool(executor: ProcessPoolExecutor, outputDir: str, runFiles: list[tuple[dict, dict[str, str]]], staleOutputs: set[str], window: int):
+    """Reduces runs across a pool of worker processes, and yields their partial results in job order.
+
+    At most `window` runs are submitted at a time, so that the partial results
+    of later runs don't pile up while an earlier run is still being reduced.
+
+    Args:
+        executor (ProcessPoolExecutor): The pool.
+        outputDir (str): The output directory of the case study.
+        runFiles (list[tuple[dict, dict[str, str]]]): The job, and output files, of every run.
+        staleOutputs (set[str]): The output files to rewrite. See `reduceFiles`.
+        window (int): The maximum number of runs submitted at a time.
+
+    Yields:
+        list[tuple[int, str, pd.DataFrame]]: The partial results of each run. See `reduceFiles`.
+    """
+    pending = collections.deque()
+    for job, files in runFiles:
+        pending.append(executor.submit(
+            reduceFilesInWorker, outputDir, job, files, staleOutputs))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def mergePartials(reducers: list[Reducer], runPartials) -> None:
+    """Collects the partial results of all runs into their reducers, in job order.
+
+    Args:
+        reducers (list[Reducer]): The reducers.
+        runPartials (Iterable[list[tuple[int, str, pd.DataFrame]]]): The partial results of each run. See `reduceFiles`.
+    """
+    for partials in runPartials:
+        for index, outputFile, partial in partials:
+            reducers[index].partials[outputFile] = combinePartials(
+                reducers[index].partials.get(outputFile), partial)
+
+
+def run(jobs: list[dict], outputDir: str, changedOnly: bool = False, numJobs: int = 1) -> None:
+    """Reads the output files of every run exactly once, and fans them out to all reducers.
+
+    With several worker processes, runs are read and reduced in parallel. Only
+    the (small) partial results are sent back, and they are merged in job
+    order, so the output files don't depend on the number of workers.
+
+    Args:
+        jobs (list[dict]): The jobs whose runs to process. Runs that aren't cataloged as complete are skipped.
+        outputDir (str): The output directory of the case study.
+        changedOnly (bool, optional): Only rewrite the output files whose input files changed since they were last written.
+        numJobs (int, optional): The number of worker processes. Defaults to processing in this process.
+    """
+    reducers = getReducers(outputDir)
+    for folder in ["stats", "agg"]:
+        os.makedirs(f"{outputDir}/{folder}", exist_ok=True)
+
+    # The input files of every output file.
+    entries = catalog.readCatalog(outputDir)
+    runFiles = [(job, entries[job["prefix"]]["files"]) for job in jobs
+                if entries.get(job["prefix"], {}).get("status") == catalog.COMPLETE]
+    inputs: dict[str, list[str]] = {}
+    for job, files in runFiles:
+        for reducer in reducers:
+            if os.path.isfile(files[reducer.kind]):
+                inputs.setdefault(reducer.getOutputFile(job), []).append(
+                    files[reducer.kind])
+
+    staleOutputs = {outputFile for outputFile, files in inputs.items()
+                    if not changedOnly or not completion.isUpToDate(files, outputFile)}
+    skipped = len(inputs) - len(staleOutputs)
+    if skipped:
+        print(
+            f"\t{colored('[-]', 'yellow')} ({colored(skipped, 'yellow')}) output files unchanged. Skipped.")
+
+    # A single pass over all runs. Each file is read once, by all of its reducers.
+    if numJobs > 1:
+        with ProcessPoolExecutor(max_workers=numJobs) as executor:
+            mergePartials(reducers, reduceInPool(executor, outputDir, runFiles,
+                                                 staleOutputs, RUNS_PER_WORKER * numJobs))
+    else:
+        mergePartials(reducers, (reduceFiles(reducers, job, files, staleOutputs)
+                                 for job, files in runFiles))
+
+    for reducer in reducers:
+        for outputFile, runData in reducer.partials.items():
+            reducer.write(runData, outputFile)
+            completion.recordInputs(inputs[outputFile], outputFile)
+        if reducer.partials:
+            print(
+                f"\t{colored('[✓]', 'green')} {reducer.title} complete. Wrote ({colored(len(reducer.partials), 'yellow')}) files.")
@@ -1,55 +1,71 @@
-from ..utilities import xml_to_csv
+from ..utilities.running_stats import RunningStats
+from . import catalog, run_store
 import pandas as pd
-import re
 
 
-def aggregate(files: list[str], outputFile: str):
-    runData = []
-    cols = ['id', 'speed']
-    for file in files:
-        # Extract the values for demand and PR from the file name.
-        demand = (re.search('d(\d{2,5})', file)).group(1)
-        pr = (re.search('p(\d{1,3})', file)).group(1)
-        run = (re.search('r(\d{1,3})', file)).group(1)
-
-        data = xml_to_csv.parse_XML(file, cols).dropna()
-        df = pd.DataFrame([round(data['speed'].median(), 2)],
-                          columns=["Average Speed"])
-        df['Demand'] = demand
-        df['Penetration'] = pr
-        df['Run'] = run
-        runData.append(df)
+# The columns read of each FCD file.
+COLUMNS = ['id', 'speed']
+
+
+def aggregateRun(data: pd.DataFrame, demand: str, pr: str, run: str) -> pd.DataFrame:
+    """Reduces the FCD of a single run to its row of the aggregate. See `writeAggregate`."""
+    data = data.dropna()
+    df = pd.DataFrame([round(data['speed'].median(), 2)],
+                      columns=["Average Speed"])
+    df['Demand'] = demand
+    df['Penetration'] = pr
+    df['Run'] = run
+    return df
 
+
+def writeAggregate(runData: list[pd.DataFrame], outputFile: str) -> None:
     data = pd.concat(runData)
     data.to_csv(outputFile, sep=',', index=False)
 
 
-def averageResults(files, outputFile):
+def aggregate(files: list[str], outputFile: str):
     runData = []
-    cols = ['id', 'speed']
     for file in files:
-        data = xml_to_csv.parse_XML(file, cols).dropna()
-        runData.append(data)
+        # Look up the values for demand and PR in the run catalog.
+        demand, pr, run = catalog.getRunLabels(catalog.findRun(file))
+
+        data = run_store.read(file, COLUMNS)
+        runData.append(aggregateRun(data, demand, pr, run))
+
+    writeAggregate(runData, outputFile)
 
-    data = pd.concat(runData).groupby('id')[['speed']].agg(
-        lambda x: x.astype(float).median())
+
+def averageRun(data: pd.DataFrame) -> RunningStats:
+    """Reduces the FCD of a single run to its part of the rerun average. See `writeAverage`."""
+    return RunningStats(['speed']).add(data[COLUMNS].dropna(), by='id')
+
+
+def writeAverage(stats: RunningStats, outputFile: str) -> None:
+    data = stats.median()
 
     data.to_csv(outputFile, sep=',', index=False)
 
 
-def generateReport(files: list[str], outputFile: str) -> None:
+def averageResults(files, outputFile):
+    stats = RunningStats(['speed'])
+    for file in files:
+        data = run_store.read(file, COLUMNS)
+        stats.merge(averageRun(data))
+
+    writeAverage(stats, outputFile)
+
+
+def generateReport(cellFiles: dict[tuple[int, str], str], outputFile: str) -> None:
     """Merges, cleans, and formats all FCD stat files. Exports as CSV.
 
     Args:
-        inputFileDir (str): The directory of the stat files.
+        cellFiles (dict[tuple[int, str], str]): The stat file of each (demand, penetration) cell.
         outputFile (str): The directory for the output file.
     """
 
     dfs = []
-    for file in files:
-        # Extract the values for demand and PR from the file name.
-        demandVal = (re.search('d(\d{2,5})', file)).group(1)
-        penVal = (re.search('p(\d{1,3})', file)).group(1)
+    for (demand, penetration), file in cellFiles.items():
+        demandVal, penVal = catalog.getCellLabels(demand, penetration)
 
         # Extract CSV data.
         df = pd.read_csv(file)
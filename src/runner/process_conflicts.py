@@ -1,24 +1,11 @@
 from .utils import runPythonFile
-from ..utilities import xml_to_csv
+from ..utilities import xml_to_csv, conflicts
+from . import catalog, run_store
 import pandas as pd
 import numpy as np
-import re
-
-CONFLICTS_LIST = {
-    '1': 'FOLLOWING',
-    '2': 'FOLLOWING',
-    '3': 'FOLLOWING',
-    '5': 'MERGING',
-    '6': 'MERGING',
-    '7': 'MERGING',
-    '8': 'MERGING',
-    '9': 'CROSSING',
-    '10': 'CROSSING',
-    '12': 'CROSSING',
-    '13': 'CROSSING',
-    '11': 'CROSSING',
-    '111': 'COLLISION'
-}
+
+# The conflict types reported, in order. Collisions aren't conflicts.
+REPORTED_TYPES = ['CROSSING', 'FOLLOWING', 'MERGING']
 
 
 def main(inputFilePath, outputFilePath):
@@ -35,43 +22,59 @@ def main(inputFilePath, outputFilePath):
     )
 
 
+# The columns read of each SSM file.
+COLUMNS = ['type']
+
+
+def averageRun(data: pd.DataFrame) -> np.ndarray:
+    """Reduces the conflicts of a single run to its part of the rerun average. See `writeAverage`.
+
+    Returns:
+        np.ndarray: The number of conflicts, by type. See `conflicts.CONFLICT_TYPES`.
+    """
+    return conflicts.count(data['type'])
+
+
 def averageResults(files, outputFile):
-    desiredCols = ['CROSSING', 'FOLLOWING', 'MERGING']
-    cols = ['type']
     # Flatten. Average. Export as CSV.
     runData = []
     for file in files:
-        data = xml_to_csv.parse_XML(file, cols)
-        data['type'] = data['type'].replace(CONFLICTS_LIST)
-        data = data.groupby(['type'], as_index=False).size()
-        runData.append(data)
+        data = run_store.read(file, COLUMNS)
+        runData.append(averageRun(data))
+
+    writeAverage(runData, outputFile)
+
+
+def writeAverage(runData: list[np.ndarray], outputFile: str) -> None:
+    counts = np.vstack(runData)
 
-    # Merge and average all dataframes by 'type' column.
-    df = pd.concat(runData).replace(
-        0, np.nan).groupby("type", as_index=False).median()
+    # Average each type over the runs in which it occurred.
+    rows = []
+    for type in sorted(conflicts.CONFLICT_TYPES):
+        typeCounts = counts[:, conflicts.CONFLICT_TYPES.index(type)]
+        typeCounts = typeCounts[typeCounts > 0]
+        if len(typeCounts) > 0:
+            rows.append((type, np.median(typeCounts)))
 
-    # Add missing 'type' rows with value of zero.
-    for col in desiredCols:
-        if (df['type'].eq(col)).any() == False:
-            tempDf = pd.DataFrame({'type': [col], 'size': [0]})
-            df = pd.concat((df, tempDf), axis=0)
+    # Add missing types with value of zero.
+    occurred = [type for type, _ in rows]
+    rows += [(type, 0.0) for type in REPORTED_TYPES if type not in occurred]
+    df = pd.DataFrame(rows, columns=['type', 'size'])
 
     # Output as CSV.
     df.to_csv(outputFile, sep=',', index=False)
 
 
-def generateReport(files: list[str], outputFile: str) -> None:
+def generateReport(cellFiles: dict[tuple[int, str], str], outputFile: str) -> None:
     """Merges, cleans, and formats all SSM stat files. Exports as CSV.
 
     Args:
-        inputFileDir (str): The directory of the SSM stat files.
+        cellFiles (dict[tuple[int, str], str]): The SSM stat file of each (demand, penetration) cell.
         outputFile (str): The directory for the output file.
     """
     dfs = []
-    for file in files:
-        # Extract the values for demand and PR from the file name.
-        demandVal = (re.search('d(\d{2,5})', file)).group(1)
-        penVal = (re.search('p(\d{1,3})', file)).group(1)
+    for (demand, penetration), file in cellFiles.items():
+        demandVal, penVal = catalog.getCellLabels(demand, penetration)
 
         # Extract CSV data.
         df = pd.read_csv(file)
@@ -104,39 +107,33 @@ def generateReport(files: list[str], outputFile: str) -> None:
     dfMerged.to_csv(outputFile, index=False)
 
 
+def aggregateRun(data: pd.DataFrame, demand: str, pr: str, run: str) -> pd.DataFrame:
+    """Reduces the conflicts of a single run to its row of the aggregate. See `writeAggregate`."""
+    counts = conflicts.count(data['type'])
+
+    data = pd.DataFrame({'Penetration': [pr], 'Demand': [demand], 'Run': [run]})
+    for type in REPORTED_TYPES:
+        data[type] = float(counts[conflicts.CONFLICT_TYPES.index(type)])
+    return data
+
+
 def aggregate(files: list[str], outputFile: str):
     runData = []
-    desiredCols = ['CROSSING', 'FOLLOWING', 'MERGING']
-    cols = ['type']
     for file in files:
-        # Extract the values for demand and PR from the file name.
-        demand = (re.search('d(\d{2,5})', file)).group(1)
-        pr = (re.search('p(\d{1,3})', file)).group(1)
-        run = (re.search('r(\d{1,3})', file)).group(1)
-
-        data = xml_to_csv.parse_XML(file, cols).dropna()
-        data['type'] = data['type'].replace(CONFLICTS_LIST)
-        data = data.groupby(['type'], as_index=False).size()
-        # Remove "collision" conflict type.
-        data = data[data["type"].str.contains("COLLISION") == False]
+        # Look up the values for demand and PR in the run catalog.
+        demand, pr, run = catalog.getRunLabels(catalog.findRun(file))
 
-        # Add missing 'type' rows with value of zero.
-        for col in desiredCols:
-            if (data['type'].eq(col)).any() == False:
-                tempDf = pd.DataFrame({'type': [col], 'size': [0]})
-                data = pd.concat((data, tempDf), axis=0)
+        data = run_store.read(file, COLUMNS)
+        runData.append(aggregateRun(data, demand, pr, run))
 
-        data['Demand'] = demand
-        data['Penetration'] = pr
-        data['Run'] = run
-        runData.append(data)
+    writeAggregate(runData, outputFile)
 
-    # Pivot conflict types into columns.
+
+def writeAggregate(runData: list[pd.DataFrame], outputFile: str) -> None:
+    # One row per run, with conflict types as columns.
     dfMerged = pd.concat(runData)
-    dfMerged = dfMerged.pivot_table(values='size', index=[
-                                    'Penetration', 'Demand', 'Run'], columns='type')
-    dfMerged.reset_index(inplace=True)
-    dfMerged.columns.name = None
+    dfMerged = dfMerged.sort_values(
+        by=['Penetration', 'Demand', 'Run']).reset_index(drop=True)
 
     # Capitalize column names.
     dfMerged.columns = dfMerged.columns.str.capitalize()
@@ -1,35 +1,48 @@
-from ..utilities import xml_to_csv
+from ..utilities.running_stats import RunningStats
+from . import catalog, run_store
 import pandas as pd
-import re
+
+
+# The columns read of each tripinfo file.
+COLUMNS = ['id', 'duration', 'waitingTime',
+           'timeLoss', 'waitingCount']
+
+
+# The columns averaged over reruns.
+AVERAGE_COLUMNS = ['duration', 'waitingTime', 'timeLoss', 'waitingCount']
+
+
+def averageRun(data: pd.DataFrame) -> RunningStats:
+    """Reduces the tripinfo of a single run to its part of the rerun average. See `writeAverage`."""
+    data = data[data['id'].str.contains("EV")]
+    return RunningStats(AVERAGE_COLUMNS).add(data, by='id')
+
+
+def writeAverage(stats: RunningStats, outputFile: str) -> None:
+    data = stats.median()
+    data.to_csv(outputFile, sep=',', index=False)
 
 
 def averageResults(files, outputFile):
-    runData = []
-    cols = ['id', 'duration', 'waitingTime',
-            'timeLoss', 'waitingCount']
+    stats = RunningStats(AVERAGE_COLUMNS)
     for file in files:
-        data = xml_to_csv.parse_XML(file, cols)
-        df = data[data['id'].str.contains("EV")]
-        runData.append(df)
+        data = run_store.read(file, COLUMNS)
+        stats.merge(averageRun(data))
 
-    data = pd.concat(runData).groupby('id')[['duration', 'waitingTime',
-                                             'timeLoss', 'waitingCount']].agg(lambda x: x.astype(float).median())
-    data.to_csv(outputFile, sep=',', index=False)
+    writeAverage(stats, outputFile)
 
 
-def generateReport(files: list[str], outputFile: str) -> None:
+def generateReport(cellFiles: dict[tuple[int, str], str], outputFile: str) -> None:
     """Merges, cleans, and formats all Tripinfo stat files. Exports as CSV.
 
     Args:
-        inputFileDir (str): The directory of the Tripinfo stat files.
+        cellFiles (dict[tuple[int, str], str]): The Tripinfo stat file of each (demand, penetration) cell.
         outputFile (str): The directory for the output file.
     """
 
     dfs = []
-    for file in files:
-        # Extract the values for demand and PR from the file name.
-        demandVal = (re.search('d(\d{2,5})', file)).group(1)
-        penVal = (re.search('p(\d{1,3})', file)).group(1)
+    for (demand, penetration), file in cellFiles.items():
+        demandVal, penVal = catalog.getCellLabels(demand, penetration)
 
         # Extract CSV data.
         df = pd.read_csv(file)
@@ -50,22 +63,29 @@ def generateReport(files: list[str], outputFile: str) -> None:
     dfMerged.to_csv(outputFile, index=False)
 
 
+def aggregateRun(data: pd.DataFrame, demand: str, pr: str, run: str) -> pd.DataFrame:
+    """Reduces the tripinfo of a single run to its rows of the aggregate. See `writeAggregate`."""
+    data = data[['duration', 'waitingTime',
+                 'timeLoss', 'waitingCount']].copy()
+    data['Demand'] = demand
+    data['Penetration'] = pr
+    data['Run'] = run
+    return data
+
+
 def aggregate(files: list[str], outputFile: str) -> None:
     runData = []
-    cols = ['duration', 'waitingTime',
-            'timeLoss', 'waitingCount']
     for file in files:
-        # Extract the values for demand and PR from the file name.
-        demand = (re.search('d(\d{2,5})', file)).group(1)
-        pr = (re.search('p(\d{1,3})', file)).group(1)
-        run = (re.search('r(\d{1,3})', file)).group(1)
+        # Look up the values for demand and PR in the run catalog.
+        demand, pr, run = catalog.getRunLabels(catalog.findRun(file))
+
+        data = run_store.read(file, COLUMNS)
+        runData.append(aggregateRun(data, demand, pr, run))
+
+    writeAggregate(runData, outputFile)
 
-        data = xml_to_csv.parse_XML(file, cols)
-        data['Demand'] = demand
-        data['Penetration'] = pr
-        data['Run'] = run
-        runData.append(data)
 
+def writeAggregate(runData: list[pd.DataFrame], outputFile: str) -> None:
     data = pd.concat(runData)
 
     # Capitalize column names.
@@ -1,34 +1,82 @@
 #!/usr/bin/env python3
 
+import contextlib
+import io
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from termcolor import colored
 from ..models.Simulation import Simulation
+from ..models.SumoSession import SumoSession
+from ..models.TerminationPolicy import TerminationPolicy
+from ..models.ProximityEngine import ProximityEngine
+from .generate_trips import getTripGenerator
+from . import catalog, completion, run_store, warm_start
 
+realWorld = {
+    "network": "src/case_study_real_world/config/realworld.net.xml",
+    "output": "src/case_study_real_world/output",
+    "evTrip": {"origin": "-256520229#0", "dest": "-131826240#1"}
+}
 
-def main(sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, outputDir: str, demand: float, prefix: str, runNum: int, evTrip):
+# The SUMO session of this (worker) process, when SUMO is reused across runs. See `getSession`.
+session: SumoSession = None
+
+
+def getSession() -> SumoSession:
+    """Returns the SUMO session of this (worker) process, creating it on first use.
+
+    Returns:
+        SumoSession: The session.
+    """
+    global session
+    if session is None:
+        session = SumoSession()
+    return session
+
+
+def main(sumoBinary, networkFilePath: str, vTypeFilePath: str, tripCacheDir: str, outputDir: str, demand: float, prefix: str, runNum: int, evTrip, tripSeed: int = None, sumoSeed: int = None, evInsertionTime: int = None, fcdFormat: str = "xml", termination: TerminationPolicy = None, warmup: int = None, warmupSeed: int = None, session: SumoSession = None, profile: bool = False, proximity: ProximityEngine = None):
     # FIXME - This function is basically useless. Tailor it for both case studies.
 
-    sim = Simulation(evTrip)
+    # Generate random trips, or reuse the ones generated earlier for the same inputs.
+    if tripSeed is None:
+        tripSeed = random.randrange(2**31)
+    tripFilePath = getTripGenerator(networkFilePath).getTrips(
+        demand, tripSeed, tripCacheDir)
+
+    # Start from the saved state of the network after the warm-up, shared by the runs of a seed family.
+    stateFilePath = None
+    if warmup is not None:
+        if evInsertionTime is not None and evInsertionTime < warmup:
+            raise ValueError(
+                f"The EV can't be inserted at {evInsertionTime}, during the warm-up of {warmup} seconds.")
+        stateFilePath = warm_start.ensureState(sumoBinary, networkFilePath, vTypeFilePath,
+                                               tripFilePath, f"{outputDir}/states", warmup, warmupSeed)
+
+    sim = Simulation(evTrip, fcdFormat, termination, session, profile, proximity)
     sim.run(
         sumoBinary=sumoBinary,
         networkFilePath=networkFilePath,
         vTypeFilePath=vTypeFilePath,
         tripFilePath=tripFilePath,
         outputDir=outputDir,
-        demand=demand,
         runNum=runNum,
-        prefix=prefix)
+        prefix=prefix,
+        evInsertionTime=evInsertionTime,
+        sumoSeed=sumoSeed,
+        stateFilePath=stateFilePath)
 
 
 def runGrid(sumoBinary, vTypeFile: str, demand: float, prefix: str, runNum: int, runStats):
     network = "src/case_study_grid/config/grid.net.xml"
-    trips = "src/case_study_grid/config/trips.trips.xml"
     output = "src/case_study_grid/output"
     evTrip = {"origin": "top0A2", "dest": "C0bottom2"}
 
     main(sumoBinary=sumoBinary,
          networkFilePath=network,
          vTypeFilePath=vTypeFile,
-         tripFilePath=trips,
+         tripCacheDir=f"{output}/trips",
          outputDir=output,
          demand=demand,
          prefix=prefix,
@@ -39,21 +87,218 @@ def runGrid(sumoBinary, vTypeFile: str, demand: float, prefix: str, runNum: int,
         f"""\t{colored('[✓]', 'green')} Simulation ({colored(runStats['current']+1, 'yellow')} / {colored(runStats['total'],'yellow')}) complete.""")
 
 
-def runRealWorld(sumoBinary, vTypeFile: str, demand: float, prefix: str, runNum: int, runStats):
-    network = "src/case_study_real_world/config/realworld.net.xml"
-    trips = "src/case_study_real_world/config/trips.trips.xml"
-    output = "src/case_study_real_world/output"
-    evTrip = {"origin": "-256520229#0", "dest": "-131826240#1"}
+def runRealWorld(sumoBinary, vTypeFile: str, demand: float, prefix: str, runNum: int, runStats, job: dict, fcdFormat: str = "xml", termination: TerminationPolicy = None, reuseSumo: bool = False, profile: bool = False, proximity: ProximityEngine = None):
+    output = realWorld["output"]
 
     main(sumoBinary=sumoBinary,
-         networkFilePath=network,
+         networkFilePath=realWorld["network"],
          vTypeFilePath=vTypeFile,
-         tripFilePath=trips,
+         tripCacheDir=f"{output}/trips",
          outputDir=output,
          demand=demand,
          prefix=prefix,
-         evTrip=evTrip,
-         runNum=runNum)
+         evTrip=realWorld["evTrip"],
+         runNum=runNum,
+         tripSeed=job.get("tripSeed"),
+         sumoSeed=job.get("sumoSeed"),
+         evInsertionTime=job.get("evInsertionTime"),
+         fcdFormat=fcdFormat,
+         termination=termination,
+         warmup=job.get("warmup"),
+         warmupSeed=job.get("warmupSeed"),
+         session=getSession() if reuseSumo else None,
+         profile=profile,
+         proximity=proximity)
 
     print(
         f"""\t{colored('[✓]', 'green')} Simulation ({colored(runStats['current']+1, 'yellow')} / {colored(runStats['total'],'yellow')}) complete.""")
+
+
+def runJob(sumoBinary, job: dict, fcdFormat: str = "xml", termination: TerminationPolicy = None, reuseSumo: bool = False, profile: bool = False, proximity: ProximityEngine = None) -> float:
+    """Runs a single real-world simulation job. Executed inside a worker process.
+
+    Console output of the run is swallowed; progress is reported by the parent
+    process instead, in job order.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        job (dict): The job to run. See `createJob`.
+        fcdFormat (str, optional): The format of the FCD: SUMO's `xml` or `parquet` output, or `traci` capture. Defaults to `xml`.
+        termination (TerminationPolicy, optional): Decides when the simulation stops. Defaults to when the EV left.
+        reuseSumo (bool, optional): Whether to run in this worker's SUMO session, instead of a new SUMO process.
+        profile (bool, optional): Whether to record the timings and TraCI command counts of every step.
+        proximity (ProximityEngine, optional): Finds the vehicles around the EV, to halt them. Vehicles aren't halted without it.
+
+    Returns:
+        float: The wall-clock duration of the run, in seconds.
+    """
+    tic = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        runRealWorld(sumoBinary, job["vTypeFile"], job["demand"],
+                     job["prefix"], job["runNum"], job["runStats"], job, fcdFormat, termination, reuseSumo, profile, proximity)
+    completion.markComplete(job, realWorld["output"])
+    run_store.convertRun(job, realWorld["output"])
+    catalog.recordRun(job, realWorld["output"])
+    return time.perf_counter() - tic
+
+
+def warmUpJob(sumoBinary, job: dict) -> str:
+    """Saves the state of the network after the warm-up of a job's seed family, if it wasn't saved yet. Executed inside a worker process.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        job (dict): The job, with a `warmup`. See `manifest.createManifest`.
+
+    Returns:
+        str: The state file.
+    """
+    output = realWorld["output"]
+    tripFilePath = getTripGenerator(realWorld["network"]).getTrips(
+        job["demand"], job["tripSeed"], f"{output}/trips")
+    return warm_start.ensureState(sumoBinary, realWorld["network"], job["vTypeFile"],
+                                  tripFilePath, f"{output}/states", job["warmup"], job.get("warmupSeed"))
+
+
+def createJob(demand: int, vTypeFile: str, penetrationRatio: str, runNum: int, reruns: int) -> dict:
+    """Describes a single, independent simulation run.
+
+    Args:
+        demand (int): The traffic demand, in vehicles per hour.
+        vTypeFile (str): The vType distribution file of the CV penetration rate.
+        penetrationRatio (str): The name of the penetration rate (e.g. "25_75").
+        runNum (int): The rerun number.
+        reruns (int): The total number of reruns.
+
+    Returns:
+        dict: The job. See `manifest.createManifest` for its seeds.
+    """
+    return {
+        "demand": demand,
+        "vTypeFile": vTypeFile,
+        "penetration": penetrationRatio,
+        "runNum": runNum,
+        "prefix": f"d{demand}_p{penetrationRatio}_r{runNum}",
+        "runStats": {"current": runNum, "total": reruns}
+    }
+
+
+def getRunSettings(termination: TerminationPolicy, proximity: ProximityEngine = None) -> dict:
+    """Describes the options that change a run's outputs, on top of its random inputs.
+
+    The settings are recorded with every job, and so with its completion
+    marker, so that runs completed with other settings are pending on resume.
+
+    Args:
+        termination (TerminationPolicy): Decides when the simulations stop.
+        proximity (ProximityEngine, optional): Finds the vehicles around the EV, to halt them. `None` without halting.
+
+    Returns:
+        dict: The settings.
+    """
+    return {
+        "termination": dict(vars(termination)),
+        "halting": None if proximity is None else dict(vars(proximity)),
+    }
+
+
+def prepareOutputDirectory(outputDir: str = realWorld["output"]) -> None:
+    """Creates the per-run output folders, if they don't exist yet."""
+    for folder in ["ssm", "dump", "fcd", "trips", "logs", "done", "states"]:
+        os.makedirs(f"{outputDir}/{folder}", exist_ok=True)
+
+
+def runSequential(sumoBinary, jobs: list[dict], fcdFormat: str = "xml", termination: TerminationPolicy = None, reuseSumo: bool = False, profile: bool = False, proximity: ProximityEngine = None) -> None:
+    """Runs all jobs one after another, in this process.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        jobs (list[dict]): The jobs to run.
+        fcdFormat (str, optional): The format of the FCD: SUMO's `xml` or `parquet` output, or `traci` capture. Defaults to `xml`.
+        termination (TerminationPolicy, optional): Decides when the simulations stop. Defaults to when the EV left.
+        reuseSumo (bool, optional): Whether to keep one SUMO process alive across runs, instead of starting one per run.
+        profile (bool, optional): Whether to record the timings and TraCI command counts of every step, under `profile/`.
+        proximity (ProximityEngine, optional): Finds the vehicles around the EV, to halt them. Vehicles aren't halted without it.
+
+    Raises:
+        Exception: If any of the jobs failed. All other jobs still run to completion.
+    """
+    prepareOutputDirectory()
+    failures = []
+    for index, job in enumerate(jobs):
+        print(
+            f"""\t> Starting run ({colored(index+1, 'yellow')} / {colored(len(jobs), 'yellow')}) {job['prefix']}...""")
+        tic = time.perf_counter()
+        try:
+            # runGrid(sumoBinary, job["vTypeFile"], job["demand"], job["prefix"], job["runNum"], job["runStats"])
+            runRealWorld(sumoBinary, job["vTypeFile"], job["demand"],
+                         job["prefix"], job["runNum"], job["runStats"], job, fcdFormat, termination, reuseSumo, profile, proximity)
+        except Exception as e:
+            failures.append(job["prefix"])
+            catalog.recordRun(job, realWorld["output"], catalog.FAILED)
+            print(
+                f"""\t{colored('[✗]', 'red')} Simulation {job['prefix']} failed. Reason: {colored(e, 'red')}""")
+            continue
+        completion.markComplete(job, realWorld["output"])
+        run_store.convertRun(job, realWorld["output"])
+        catalog.recordRun(job, realWorld["output"])
+        toc = time.perf_counter()
+        print(
+            f"""SUMO took ({colored(f"{toc-tic:0.4f}", "red")}) seconds.""")
+
+    if failures:
+        raise Exception(f"{len(failures)} simulation(s) failed: {', '.join(failures)}")
+
+
+def runSweep(sumoBinary, jobs: list[dict], numJobs: int, fcdFormat: str = "xml", termination: TerminationPolicy = None, reuseSumo: bool = False, profile: bool = False, proximity: ProximityEngine = None) -> None:
+    """Runs all jobs across a pool of worker processes.
+
+    Every worker owns its own SUMO instance and TraCI connection. Progress is
+    reported in job order, regardless of the order in which jobs finish.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        jobs (list[dict]): The jobs to run.
+        numJobs (int): The number of worker processes.
+        fcdFormat (str, optional): The format of the FCD: SUMO's `xml` or `parquet` output, or `traci` capture. Defaults to `xml`.
+        termination (TerminationPolicy, optional): Decides when the simulations stop. Defaults to when the EV left.
+        reuseSumo (bool, optional): Whether to keep one SUMO process alive across runs (per worker), instead of starting one per run.
+        profile (bool, optional): Whether to record the timings and TraCI command counts of every step, under `profile/`.
+        proximity (ProximityEngine, optional): Finds the vehicles around the EV, to halt them. Vehicles aren't halted without it.
+
+    Raises:
+        Exception: If any of the jobs failed. All other jobs still run to completion.
+    """
+    prepareOutputDirectory()
+    failures = []
+    with ProcessPoolExecutor(max_workers=numJobs) as executor:
+        # Warm up every seed family once, before any of its runs starts from the saved state.
+        families = {(job["demand"], job["vTypeFile"], job["tripSeed"], job.get("warmupSeed"), job["warmup"]): job
+                    for job in jobs if job.get("warmup") is not None}
+        if families:
+            print(
+                f"""\t> Warming up ({colored(len(families), 'yellow')}) seed families...""")
+            warmups = [(job, executor.submit(warmUpJob, sumoBinary, job))
+                       for job in families.values()]
+            for job, future in warmups:
+                try:
+                    future.result()
+                except Exception as e:
+                    # The runs of the family retry the warm-up, and fail on their own.
+                    print(
+                        f"""\t{colored('[✗]', 'red')} Warm-up of {job['prefix']} failed. Reason: {colored(e, 'red')}""")
+        futures = [executor.submit(runJob, sumoBinary, job, fcdFormat, termination, reuseSumo, profile, proximity) for job in jobs]
+        for index, (job, future) in enumerate(zip(jobs, futures)):
+            progress = f"({colored(index+1, 'yellow')} / {colored(len(jobs), 'yellow')})"
+            try:
+                duration = future.result()
+            except Exception as e:
+                failures.append(job["prefix"])
+                catalog.recordRun(job, realWorld["output"], catalog.FAILED)
+                print(
+                    f"""\t{colored('[✗]', 'red')} Simulation {progress} {job['prefix']} failed. Reason: {colored(e, 'red')}""")
+                continue
+            print(
+                f"""\t{colored('[✓]', 'green')} Simulation {progress} {job['prefix']} complete in ({colored(f"{duration:0.4f}", "red")}) seconds.""")
+
+    if failures:
+        raise Exception(f"{len(failures)} simulation(s) failed: {', '.join(failures)}")
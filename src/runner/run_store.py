@@ -0,0 +1,232 @@
+import json
+import os
+from pathlib import Path
+import pandas as pd
+from ..models import FcdRecorder
+from ..models.Simulation import findOutputFiles
+from ..utilities import xml_to_csv
+from . import catalog
+
+# Parquet needs pyarrow. Without it, runs are stored as pickled DataFrames instead.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    STORE_EXTENSION = "parquet"
+except ImportError:
+    pa = None
+    STORE_EXTENSION = "pkl"
+
+# The columns kept of each kind of output, and their types. Columns that
+# aren't listed in the types are kept as strings.
+STORE_COLUMNS = {
+    "tripinfo": (['id', 'duration', 'waitingTime', 'timeLoss', 'waitingCount'],
+                 {'duration': float, 'waitingTime': float, 'timeLoss': float, 'waitingCount': int}),
+    "ssm": (['type'], {}),
+    "fcd": (['id', 'speed'], {'speed': float}),
+}
+
+# The key of the run metadata, within the file metadata.
+METADATA_KEY = b"run"
+
+
+def getStoreFile(xmlFile: str) -> str:
+    """Returns the columnar file of a SUMO output file.
+
+    E.g. `output/dump/tripinfo_d1500_p0_100_r0.xml` -> `output/store/tripinfo_d1500_p0_100_r0.parquet`.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+
+    Returns:
+        str: The columnar file.
+    """
+    path = Path(xmlFile)
+    return f"{path.parent.parent.as_posix()}/store/{path.stem}.{STORE_EXTENSION}"
+
+
+def getKind(xmlFile: str) -> str:
+    """Returns the kind of SUMO output file, from its name.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+
+    Returns:
+        str: One of `tripinfo`, `ssm`, or `fcd`.
+    """
+    return Path(xmlFile).stem.split('_')[0]
+
+
+def getRunMetadata(entry: dict) -> dict:
+    """Returns the metadata a run's columnar files are tagged with.
+
+    Args:
+        entry (dict): The job, or catalog entry, of the run.
+
+    Returns:
+        dict: Its demand, penetration, and run number.
+    """
+    return {"demand": entry["demand"], "penetration": entry["penetration"], "run": entry["runNum"]}
+
+
+def findMetadata(xmlFile: str) -> dict:
+    """Returns the run metadata of a SUMO output file, from the run catalog.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+
+    Returns:
+        dict: The metadata. Empty if the file's run isn't in the catalog.
+    """
+    try:
+        return getRunMetadata(catalog.findRun(xmlFile))
+    except ValueError:
+        return {}
+
+
+def getSchema(cols: list[str], dtypes: dict[str, type]):
+    """Returns the Parquet schema of a kind of output.
+
+    Args:
+        cols (list[str]): The stored columns.
+        dtypes (dict[str, type]): The numeric types of columns. Other columns are strings.
+
+    Returns:
+        pa.Schema: The schema. Columns may have missing values.
+    """
+    types = {int: pa.int64(), float: pa.float64()}
+    return pa.schema([(col, types.get(dtypes.get(col), pa.string())) for col in cols])
+
+
+def convert(xmlFile: str, metadata: dict = None) -> int:
+    """Parses a SUMO output file once, and stores its columns in the columnar store.
+    FCD output as Parquet, or captured through TraCI (`.npz`), is read as is.
+
+    XML files are streamed into the Parquet file chunk by chunk, so memory use
+    doesn't grow with the file size. Without pyarrow, the whole file is parsed at once.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+        metadata (dict, optional): Describes the run, e.g. its demand, penetration, and run number. Defaults to the metadata in the run catalog. See `findMetadata`.
+
+    Returns:
+        int: The number of rows stored.
+    """
+    if metadata is None:
+        metadata = findMetadata(xmlFile)
+    cols, dtypes = STORE_COLUMNS[getKind(xmlFile)]
+    storeFile = getStoreFile(xmlFile)
+    os.makedirs(os.path.dirname(storeFile), exist_ok=True)
+    tmpFile = f"{storeFile}.{os.getpid()}.tmp"
+
+    if pa is None:
+        if xmlFile.endswith(".npz"):
+            data = FcdRecorder.read(xmlFile, cols)
+        else:
+            data = xml_to_csv.parse_XML(xmlFile, cols, dtypes)
+        data.attrs["run"] = metadata
+        data.to_pickle(tmpFile)
+        os.replace(tmpFile, storeFile)
+        return len(data)
+
+    if xmlFile.endswith(".npz"):
+        data = FcdRecorder.read(xmlFile, cols)
+        chunks = [{col: data[col].to_numpy() for col in cols}]
+    elif xmlFile.endswith(".parquet"):
+        chunks = iterParquet(xmlFile, cols)
+    else:
+        chunks = xml_to_csv.iterparse_XML(xmlFile, cols, dtypes)
+    schema = getSchema(cols, dtypes).with_metadata(
+        {METADATA_KEY: json.dumps(metadata)})
+    rows = 0
+    with pq.ParquetWriter(tmpFile, schema) as writer:
+        # One row group per chunk. Missing values (NaN, or None) are stored as nulls.
+        for chunk in chunks:
+            writer.write_table(pa.table({col: pa.array(chunk[col], type=schema.field(col).type, from_pandas=True)
+                                         for col in cols}, schema=schema))
+            rows += len(chunk[cols[0]])
+    os.replace(tmpFile, storeFile)
+    return rows
+
+
+def iterParquet(filePath: str, cols: list[str], batchSize: int = 65536):
+    """Yields the columns of a Parquet file output by SUMO, batch by batch.
+
+    SUMO only writes the columns of attributes that occurred, e.g. only `time`
+    if no vehicle was on the network. Missing columns are filled with nulls.
+
+    Args:
+        filePath (str): The Parquet file.
+        cols (list[str]): The columns to read.
+        batchSize (int, optional): The number of rows per batch.
+
+    Yields:
+        dict[str, pa.Array]: The columns of each batch.
+    """
+    parquetFile = pq.ParquetFile(filePath)
+    presentCols = [col for col in cols if col in parquetFile.schema_arrow.names]
+    for batch in parquetFile.iter_batches(batch_size=batchSize, columns=presentCols):
+        yield {col: batch.column(col) if col in presentCols else pa.nulls(batch.num_rows)
+               for col in cols}
+
+
+def convertRun(job: dict, outputDir: str) -> None:
+    """Converts all SUMO output files of a run, tagging them with the run's metadata.
+
+    Args:
+        job (dict): The completed job.
+        outputDir (str): The output directory of the case study.
+    """
+    metadata = getRunMetadata(job)
+    for xmlFile in findOutputFiles(outputDir, job["prefix"]).values():
+        if os.path.isfile(xmlFile):
+            convert(xmlFile, metadata)
+
+
+def isFresh(xmlFile: str, storeFile: str) -> bool:
+    """Returns True if the columnar file exists, and is newer than the SUMO output file it was converted from."""
+    if not os.path.isfile(storeFile):
+        return False
+    if not os.path.isfile(xmlFile):
+        return True
+    return os.path.getmtime(storeFile) >= os.path.getmtime(xmlFile)
+
+
+def read(xmlFile: str, cols: list[str]) -> pd.DataFrame:
+    """Returns the columns of a SUMO output file, from the columnar store.
+    The file is converted first, if it wasn't yet or it changed since.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+        cols (list[str]): The columns to read. Must be stored columns of the file's kind.
+
+    Returns:
+        pd.DataFrame: The columns.
+    """
+    storedCols, _ = STORE_COLUMNS[getKind(xmlFile)]
+    missingCols = set(cols) - set(storedCols)
+    if missingCols:
+        raise ValueError(
+            f"Columns {sorted(missingCols)} aren't stored for {xmlFile}.")
+
+    storeFile = getStoreFile(xmlFile)
+    if not isFresh(xmlFile, storeFile):
+        convert(xmlFile)
+    if pa is not None:
+        return pq.read_table(storeFile, columns=cols).to_pandas()
+    return pd.read_pickle(storeFile)[cols].copy()
+
+
+def readMetadata(xmlFile: str) -> dict:
+    """Returns the run metadata of a SUMO output file's columnar file.
+
+    Args:
+        xmlFile (str): The SUMO output file.
+
+    Returns:
+        dict: The metadata. Empty if the run was neither converted with `convertRun`, nor in the run catalog when converted.
+    """
+    storeFile = getStoreFile(xmlFile)
+    if pa is not None:
+        metadata = pq.read_schema(storeFile).metadata or {}
+        return json.loads(metadata.get(METADATA_KEY, b"{}"))
+    return pd.read_pickle(storeFile).attrs.get("run", {})
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import traci
+from ..models.Simulation import getSumoCommand
+from .generate_trips import fileChecksum
+
+# Bump to invalidate all saved states, e.g. after changing SUMO options that affect the warm-up.
+STATE_VERSION = 1
+
+
+def getStateFile(stateDir: str, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, warmup: int, warmupSeed: int = None) -> str:
+    """Returns the path of the saved state of the network after the warm-up.
+
+    The state is keyed by every input of the warm-up: the network, vType
+    distribution, and trip files, the SUMO seed, and the warm-up duration.
+
+    Args:
+        stateDir (str): The directory the states are saved in.
+        networkFilePath (str): The network file.
+        vTypeFilePath (str): The vType distribution file.
+        tripFilePath (str): The trip file.
+        warmup (int): The duration of the warm-up, in seconds.
+        warmupSeed (int, optional): The SUMO seed of the warm-up.
+
+    Returns:
+        str: The state file.
+    """
+    key = ":".join([str(STATE_VERSION), fileChecksum(networkFilePath), fileChecksum(vTypeFilePath),
+                    fileChecksum(tripFilePath), str(warmupSeed), str(warmup)])
+    return f"{stateDir}/state_{hashlib.sha1(key.encode()).hexdigest()[:16]}.xml.gz"
+
+
+def saveState(sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, stateFile: str, warmup: int, warmupSeed: int = None) -> None:
+    """Simulates the warm-up, without any outputs, and saves the state of the network at its end.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        networkFilePath (str): The network file.
+        vTypeFilePath (str): The vType distribution file.
+        tripFilePath (str): The trip file.
+        stateFile (str): The state file to save.
+        warmup (int): The duration of the warm-up, in seconds.
+        warmupSeed (int, optional): The SUMO seed of the warm-up.
+    """
+    outputFiles = {"tripinfo": os.devnull, "ssm": os.devnull}
+    command = getSumoCommand(sumoBinary, networkFilePath, vTypeFilePath, tripFilePath,
+                             outputFiles, os.devnull, warmupSeed)
+    label = f"warmup_{os.getpid()}"
+    # Save under a temporary name first, so that a state is either complete or absent.
+    tmpFile = f"{stateFile[:-len('.xml.gz')]}.{os.getpid()}.tmp.xml.gz"
+    traci.start(command, label=label)
+    try:
+        traci.simulationStep(warmup)
+        traci.simulation.saveState(tmpFile)
+    finally:
+        traci.close()
+    os.replace(tmpFile, stateFile)
+
+
+def ensureState(sumoBinary, networkFilePath: str, vTypeFilePath: str, tripFilePath: str, stateDir: str, warmup: int, warmupSeed: int = None) -> str:
+    """Returns the saved state of the network after the warm-up, simulating the warm-up only if it wasn't saved yet.
+
+    Args:
+        sumoBinary (str): The SUMO binary to run.
+        networkFilePath (str): The network file.
+        vTypeFilePath (str): The vType distribution file.
+        tripFilePath (str): The trip file.
+        stateDir (str): The directory the states are saved in.
+        warmup (int): The duration of the warm-up, in seconds.
+        warmupSeed (int, optional): The SUMO seed of the warm-up.
+
+    Returns:
+        str: The state file.
+    """
+    stateFile = getStateFile(stateDir, networkFilePath,
+                             vTypeFilePath, tripFilePath, warmup, warmupSeed)
+    if not os.path.isfile(stateFile):
+        os.makedirs(stateDir, exist_ok=True)
+        saveState(sumoBinary, networkFilePath, vTypeFilePath,
+                  tripFilePath, stateFile, warmup, warmupSeed)
+    return stateFile
@@ -1,2 +1,3 @@
 from . import xml_to_csv
+from . import conflicts
 from . import generate_graph_conflict_heatmap
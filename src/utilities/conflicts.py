@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# The conflict categories, in the order of their counts.
+CONFLICT_TYPES = ['CROSSING', 'FOLLOWING', 'MERGING', 'COLLISION']
+
+# The SSM encounter type codes of each conflict category.
+# See https://sumo.dlr.de/docs/Simulation/Output/SSM_Device.html#encounter_types
+CONFLICT_CODES = {
+    'FOLLOWING': [1, 2, 3],
+    'MERGING': [5, 6, 7, 8],
+    'CROSSING': [9, 10, 11, 12, 13],
+    'COLLISION': [111],
+}
+
+# Maps every encounter type code to the index of its category. -1 for codes that aren't conflicts.
+CATEGORY_LOOKUP = np.full(max(max(codes)
+                          for codes in CONFLICT_CODES.values()) + 1, -1, dtype=np.int8)
+for category, codes in CONFLICT_CODES.items():
+    CATEGORY_LOOKUP[codes] = CONFLICT_TYPES.index(category)
+
+
+def parseCodes(types) -> np.ndarray:
+    """Parses encounter type codes into small integers.
+
+    Args:
+        types (array-like): The encounter type codes, as strings or numbers. Missing values are allowed.
+
+    Returns:
+        np.ndarray: The codes. -1 for missing or invalid codes.
+    """
+    codes = pd.to_numeric(pd.Series(types, dtype=object),
+                          errors='coerce').to_numpy(dtype=float, copy=True)
+    codes[np.isnan(codes)] = -1
+    return codes.astype(np.int16)
+
+
+def categorize(types) -> np.ndarray:
+    """Returns the category index of every encounter, in `CONFLICT_TYPES`.
+
+    Args:
+        types (array-like): The encounter type codes.
+
+    Returns:
+        np.ndarray: The category indices. -1 for encounters that aren't conflicts.
+    """
+    codes = parseCodes(types)
+    known = (codes >= 0) & (codes < len(CATEGORY_LOOKUP))
+    categories = np.full(len(codes), -1, dtype=np.int8)
+    categories[known] = CATEGORY_LOOKUP[codes[known]]
+    return categories
+
+
+def classify(types) -> pd.Categorical:
+    """Classifies encounter type codes into conflict categories.
+
+    Args:
+        types (array-like): The encounter type codes.
+
+    Returns:
+        pd.Categorical: The conflict categories, with `CONFLICT_TYPES` as categories. Missing for encounters that aren't conflicts.
+    """
+    return pd.Categorical.from_codes(categorize(types), categories=CONFLICT_TYPES)
+
+
+def count(types) -> np.ndarray:
+    """Counts the conflicts of each category.
+
+    Args:
+        types (array-like): The encounter type codes.
+
+    Returns:
+        np.ndarray: The number of conflicts, in the order of `CONFLICT_TYPES`.
+    """
+    categories = categorize(types)
+    return np.bincount(categories[categories >= 0], minlength=len(CONFLICT_TYPES))
+
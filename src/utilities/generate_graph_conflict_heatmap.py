@@ -10,24 +10,15 @@ if 'SUMO_HOME' in os.environ:
     sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
 import sumolib  # noqa
 
+# Run as a script, this module isn't part of the package.
+try:
+    from . import conflicts
+except ImportError:
+    import conflicts
+
 
 def normalize_conflict_types(df):
-    CONFLICTS_LIST = {
-        1: 'FOLLOWING',
-        2: 'FOLLOWING',
-        3: 'FOLLOWING',
-        5: 'MERGING',
-        6: 'MERGING',
-        7: 'MERGING',
-        8: 'MERGING',
-        9: 'CROSSING',
-        10: 'CROSSING',
-        12: 'CROSSING',
-        13: 'CROSSING',
-        11: 'CROSSING',
-        111: 'COLLISION'
-    }
-    df['type'] = df['type'].replace(CONFLICTS_LIST)
+    df['type'] = conflicts.classify(df['type'])
     return df
 
 
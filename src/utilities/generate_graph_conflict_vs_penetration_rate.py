@@ -9,6 +9,12 @@ if 'SUMO_HOME' in os.environ:
     sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
 import sumolib  # noqa
 
+# Run as a script, this module isn't part of the package.
+try:
+    from .generate_graph_conflict_heatmap import normalize_conflict_types
+except ImportError:
+    from generate_graph_conflict_heatmap import normalize_conflict_types
+
 
 def get_options(args=None):
     optParser = sumolib.options.ArgumentParser(
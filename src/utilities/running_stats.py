@@ -0,0 +1,207 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+# The values a quantile sketch keeps per level. Quantiles are exact up to this many values.
+SKETCH_CAPACITY = 8192
+
+
+class QuantileSketch:
+    """Mergeable sketch of the quantiles of a stream of values, with bounded memory.
+
+    Values are kept as they are, until there are more than `capacity` of them.
+    From then on, a level that holds more than `capacity` values is sorted, and
+    every other value moves up one level, where it stands for twice as many
+    values (as in the KLL sketch). The kept half alternates between compactions,
+    rather than being random, so results don't depend on a seed. Memory is
+    bounded by `capacity` values per level, with one level more each time the
+    number of values doubles. The rank error grows with the number of levels,
+    relative to `capacity`.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY) -> None:
+        # The maximum number of values per level.
+        self.capacity = capacity
+        # The values of each level. A value of level i stands for 2**i values.
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        # The number of compactions of each level, to alternate the half kept.
+        self.compactions: list[int] = [0]
+        # The number of values added.
+        self.count = 0
+
+    def add(self, values: np.ndarray) -> None:
+        """Adds values. They must not be missing."""
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self.compact()
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Adds the values of another sketch."""
+        for level, values in enumerate(other.levels):
+            self.addLevel(level)
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.count += other.count
+        self.compact()
+
+    def addLevel(self, level: int) -> None:
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+            self.compactions.append(0)
+
+    def compact(self) -> None:
+        """Halves every level over capacity, into the next level."""
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self.capacity:
+                values = np.sort(self.levels[level])
+                # An odd value out stays on its level, so that the total weight is kept.
+                rest, values = (values[-1:], values[:-1]) if len(values) % 2 else (values[:0], values)
+                promoted = values[self.compactions[level] % 2::2]
+                self.compactions[level] += 1
+                self.levels[level] = rest
+                self.addLevel(level + 1)
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        """Returns the q-th quantile. Exact (as `np.quantile`) while no more than `capacity` values were added.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The quantile. NaN without values.
+        """
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(levelValues), 2.0 ** level)
+                                  for level, levelValues in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = min(np.searchsorted(cumulative, q * cumulative[-1]), len(values) - 1)
+        return values[order][index]
+
+
+class RunningStats:
+    """Running statistics of numeric columns, by group, fed one run at a time.
+
+    Counts, means, and variances are updated in place with Chan et al.'s
+    parallel variant of Welford's algorithm. Medians and other quantiles are
+    taken from a `QuantileSketch` per group and column, so memory doesn't grow
+    with the number of runs. They are exact up to `SKETCH_CAPACITY` values per
+    group, e.g. the EV's speeds over about 10 reruns. Instances of separate
+    processes can be merged.
+
+    Missing values are skipped, column by column.
+    """
+
+    def __init__(self, columns: list[str]) -> None:
+        # The columns to describe.
+        self.columns = columns
+        # The count, mean, and sum of squared deviations of each column, by group.
+        self.counts: dict[object, np.ndarray] = {}
+        self.means: dict[object, np.ndarray] = {}
+        self.m2s: dict[object, np.ndarray] = {}
+        # The quantile sketch of each column, by group.
+        self.sketches: dict[object, list[QuantileSketch]] = {}
+
+    def add(self, data: pd.DataFrame, by: str) -> RunningStats:
+        """Adds the rows of a single run.
+
+        Args:
+            data (pd.DataFrame): The rows. Must include `by` and all columns.
+            by (str): The column to group by.
+
+        Returns:
+            RunningStats: Itself.
+        """
+        values = data[self.columns].to_numpy(dtype=float)
+        keys = data[by].to_numpy()
+        for key in pd.unique(keys):
+            self.update(key, values[keys == key])
+        return self
+
+    def update(self, key, values: np.ndarray) -> None:
+        """Adds a batch of values to a group.
+
+        Args:
+            key (object): The group.
+            values (np.ndarray): The values, with one column per entry of `columns`.
+        """
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        mean = np.divide(np.where(valid, values, 0).sum(axis=0), count,
+                         out=np.zeros(len(self.columns)), where=count > 0)
+        m2 = np.where(valid, (values - mean) ** 2, 0).sum(axis=0)
+        self.combine(key, count, mean, m2)
+        for sketch, column, isValid in zip(self.sketches[key], values.T, valid.T):
+            sketch.add(column[isValid])
+
+    def merge(self, other: RunningStats) -> RunningStats:
+        """Adds the statistics of another instance, e.g. of another process.
+
+        Args:
+            other (RunningStats): The statistics to add. Must describe the same columns.
+
+        Returns:
+            RunningStats: Itself.
+        """
+        for key in other.counts:
+            self.combine(key, other.counts[key], other.means[key],
+                         other.m2s[key])
+            for sketch, otherSketch in zip(self.sketches[key], other.sketches[key]):
+                sketch.merge(otherSketch)
+        return self
+
+    def combine(self, key, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        """Combines the moments of a batch into a group."""
+        if key not in self.counts:
+            self.counts[key] = count.copy()
+            self.means[key] = mean.copy()
+            self.m2s[key] = m2.copy()
+            self.sketches[key] = [QuantileSketch() for _ in self.columns]
+            return
+
+        total = self.counts[key] + count
+        delta = mean - self.means[key]
+        weight = np.divide(count, total, out=np.zeros(
+            len(self.columns)), where=total > 0)
+        self.means[key] = self.means[key] + delta * weight
+        self.m2s[key] = self.m2s[key] + m2 + \
+            delta ** 2 * self.counts[key] * weight
+        self.counts[key] = total
+
+    def describe(self, statistic) -> pd.DataFrame:
+        """Returns a statistic of every group, sorted by group."""
+        keys = sorted(self.counts)
+        rows = [statistic(key) for key in keys]
+        return pd.DataFrame(rows, index=pd.Index(keys), columns=self.columns)
+
+    def count(self) -> pd.DataFrame:
+        """Returns the number of (non-missing) values of each column, by group."""
+        return self.describe(lambda key: self.counts[key])
+
+    def mean(self) -> pd.DataFrame:
+        """Returns the mean of each column, by group."""
+        return self.describe(lambda key: np.where(self.counts[key] > 0, self.means[key], np.nan))
+
+    def var(self) -> pd.DataFrame:
+        """Returns the sample variance of each column, by group."""
+        return self.describe(lambda key: np.divide(
+            self.m2s[key], self.counts[key] - 1, out=np.full(len(self.columns), np.nan), where=self.counts[key] > 1))
+
+    def quantile(self, q: float) -> pd.DataFrame:
+        """Returns the q-th quantile of each column, by group. See `QuantileSketch.quantile`.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+        """
+        return self.describe(lambda key: [sketch.quantile(q) for sketch in self.sketches[key]])
+
+    def median(self) -> pd.DataFrame:
+        """Returns the median of each column, by group."""
+        return self.quantile(0.5)
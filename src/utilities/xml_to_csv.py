@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as et
 import os
@@ -16,6 +17,9 @@ data = []
 verbose = False
 timestamped = True
 
+# The number of rows per chunk, when streaming.
+CHUNK_SIZE = 65536
+
 
 def get_options(args=None):
     optParser = sumolib.options.ArgumentParser(
@@ -51,41 +55,98 @@ def get_options(args=None):
     return options
 
 
-def parse(row, node, cols):
+def extract(node, cols):
     # For each column, check if the node contains an attribute with the same name.
     # If it does, save the attribute's value.
-    # If it does not, but the node has children, repeat the search onto the child node.
-    # Otherwise, save None and stop.
-    log(f"row ({row}) | node ({node}) | cols ({cols})")
-    for index, col in enumerate(cols):
-        if node.attrib.get(col) is not None:
-            log(
-                f"\t\tAttr ({colored(col, 'green')}) found. Value ({colored(node.attrib.get(col), attrs=['bold'])})")
-            row.append(node.attrib.get(col))
-        elif len(list(node)) > 0:
-            log(f"\t\tAttr ({colored(col, 'yellow')}) not found. Children found: ({colored(len(list(node)), 'yellow')}).")
-            row + parse(row, list(node)[0], cols[index:])
-            return row
+    # If it does not, but the node has children, repeat the search onto the first child node.
+    # Otherwise, save None for this and all remaining columns.
+    row = []
+    index = 0
+    while index < len(cols):
+        value = node.get(cols[index])
+        if value is not None:
+            if verbose:
+                log(f"\t\tAttr ({colored(cols[index], 'green')}) found. Value ({colored(value, attrs=['bold'])})")
+            row.append(value)
+            index += 1
+        elif len(node) > 0:
+            if verbose:
+                log(f"\t\tAttr ({colored(cols[index], 'yellow')}) not found. Children found: ({colored(len(node), 'yellow')}).")
+            node = node[0]
         else:
-            log(f"\t\tAttr ({colored(col, 'red')}) not found nor any children.")
-            row.append(None)
-            return row
+            if verbose:
+                log(f"\t\tAttr ({colored(cols[index], 'red')}) not found nor any children.")
+            break
+    row.extend([None] * (len(cols) - len(row)))
     return row
 
 
-def parse_XML(xmlFilePath, colNames):
-    xtree = et.parse(xmlFilePath)
-    xroot = xtree.getroot()
-    allRows = []
-
-    for node in xroot:
-        log(f"node ({node})")
-        row = []
-        result = parse(row, node, colNames)
-        log(colored(f"\tResult: ({result})", "cyan"))
-        allRows.append(result)
-
-    out_df = pd.DataFrame(allRows, columns=colNames)
+def toArray(values, dtype):
+    # Missing values become NaN for numeric columns, and stay None otherwise.
+    # NaN requires a float type, so integer columns with missing values are read as floats.
+    if dtype is object:
+        return np.array(values, dtype=object)
+    if dtype is int and None in values:
+        dtype = float
+    return np.fromiter((np.nan if value is None else dtype(value) for value in values), dtype=dtype, count=len(values))
+
+
+def iterparse_XML(xmlFilePath, colNames, dtypes=None, chunkSize=CHUNK_SIZE):
+    """Streams the rows of an XML file as chunks of NumPy columns.
+
+    Each direct child of the root element is one row, with the same column
+    semantics as `parse_XML`. Elements are cleared as soon as their row is
+    extracted, so memory use doesn't grow with the file size.
+
+    Args:
+        xmlFilePath (str): The XML file.
+        colNames (list[str]): The columns to extract, in order.
+        dtypes (dict[str, type], optional): Numeric types of columns, e.g. `{'speed': float}`. Other columns are kept as strings.
+        chunkSize (int, optional): The maximum number of rows per chunk.
+
+    Yields:
+        dict[str, np.ndarray]: The columns of the next chunk of rows.
+    """
+    dtypes = dtypes or {}
+    columns = [[] for _ in colNames]
+
+    context = et.iterparse(xmlFilePath, events=("start", "end"))
+    _, root = next(context)
+    depth = 1
+    for event, node in context:
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+
+        # A complete child of the root.
+        if verbose:
+            log(f"node ({node})")
+        for column, value in zip(columns, extract(node, colNames)):
+            column.append(value)
+        root.clear()
+
+        if len(columns[0]) >= chunkSize:
+            yield {col: toArray(values, dtypes.get(col, object)) for col, values in zip(colNames, columns)}
+            columns = [[] for _ in colNames]
+
+    if columns[0]:
+        yield {col: toArray(values, dtypes.get(col, object)) for col, values in zip(colNames, columns)}
+
+
+def parse_XML(xmlFilePath, colNames, dtypes=None):
+    # Holds the whole file. To process it with bounded memory, consume `iterparse_XML` chunk by chunk instead.
+    columns = {col: [] for col in colNames}
+    for chunk in iterparse_XML(xmlFilePath, colNames, dtypes):
+        for col in colNames:
+            columns[col].append(chunk.pop(col))
+    if not columns[colNames[0]]:
+        return pd.DataFrame(columns=colNames)
+
+    out_df = pd.DataFrame(
+        {col: np.concatenate(columns.pop(col)) for col in colNames}, columns=colNames)
     return out_df
 
 
@@ -0,0 +1,53 @@
+"""Checks the vectorized conflict counts against the per-row classification they replaced."""
+import numpy as np
+import pandas as pd
+from src.utilities import conflicts
+
+# The per-row classification of `process_conflicts`, before `conflicts` replaced it.
+BASELINE_CONFLICTS_LIST = {
+    '1': 'FOLLOWING',
+    '2': 'FOLLOWING',
+    '3': 'FOLLOWING',
+    '5': 'MERGING',
+    '6': 'MERGING',
+    '7': 'MERGING',
+    '8': 'MERGING',
+    '9': 'CROSSING',
+    '10': 'CROSSING',
+    '12': 'CROSSING',
+    '13': 'CROSSING',
+    '11': 'CROSSING',
+    '111': 'COLLISION'
+}
+
+
+def countBaseline(types: list) -> list[int]:
+    """Counts the conflicts of each category, row by row, as `process_conflicts` used to."""
+    data = pd.DataFrame({'type': types}).dropna()
+    data['type'] = data['type'].replace(BASELINE_CONFLICTS_LIST)
+    sizes = data.groupby(['type']).size()
+    return [int(sizes.get(category, 0)) for category in conflicts.CONFLICT_TYPES]
+
+
+def test_matches_baseline_on_ssm_table():
+    # Every conflict code, codes that aren't conflicts (0, 4, 14, 110, 200),
+    # malformed and missing values.
+    codes = [str(code) for code in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 110, 111, 200]]
+    rng = np.random.default_rng(0)
+    types = list(rng.choice(codes + ['', 'x'], size=500)) + [None] * 10
+
+    assert conflicts.count(types).tolist() == countBaseline(types)
+
+
+def test_unknown_types_are_not_counted():
+    types = ['0', '4', '14', '200', 'x', '', None]
+
+    assert conflicts.count(types).tolist() == [0, 0, 0, 0]
+    assert countBaseline(types) == [0, 0, 0, 0]
+    assert conflicts.classify(types).isna().all()
+
+
+def test_numeric_codes_match_string_codes():
+    types = ['1', '5', '9', '111', '4', None]
+
+    assert conflicts.count([1, 5, 9, 111, 4, np.nan]).tolist() == conflicts.count(types).tolist()
@@ -0,0 +1,94 @@
+"""Checks that `Detour` cleans up its edge index and its ledger of avoided edges, as CVs are reverted and leave."""
+import pytest
+from src.models.Detour import Detour
+
+
+class StubVehicle:
+    """Stands in for a CV, recording the edges it was told to avoid."""
+
+    def __init__(self, route: tuple[str]) -> None:
+        self.route = route
+        self.avoided: set[str] = set()
+        self.reroutes = 0
+
+    def getRoute(self) -> tuple[str]:
+        return self.route
+
+    def getFutureRoute(self) -> tuple[str]:
+        return self.route
+
+    def setAvoidEdge(self, edgeId: str) -> None:
+        self.avoided.add(edgeId)
+
+    def clearAvoidEdge(self, edgeId: str) -> None:
+        self.avoided.discard(edgeId)
+
+    def recalculateRoute(self) -> None:
+        self.reroutes += 1
+
+
+@pytest.fixture
+def detoured():
+    """Two CVs sharing the edge `s` of the EV route. Only `A` also uses its edge `t`."""
+    vehicles = {"A": StubVehicle(("a", "s", "t")), "B": StubVehicle(("b", "s", "c"))}
+    detour = Detour()
+    detour.detourVehicles(vehicles, {"s", "t"})
+
+    assert vehicles["A"].avoided == {"s", "t"}
+    assert vehicles["B"].avoided == {"s"}
+    assert detour.avoidedEdges == {"A": {"s", "t"}, "B": {"s"}}
+    assert detour.avoidedBy == {"s": {"A", "B"}, "t": {"A"}}
+    assert detour.edgeIndex["s"] == {"A", "B"}
+    return detour, vehicles
+
+
+def test_revert_one_and_remove_one(detoured):
+    detour, vehicles = detoured
+
+    # B leaves the network.
+    detour.removeVehicles(["B"])
+    del vehicles["B"]
+    assert detour.avoidedEdges == {"A": {"s", "t"}}
+    assert detour.avoidedBy == {"s": {"A"}, "t": {"A"}}
+    assert "B" not in detour.routes
+    assert all("B" not in vehIds for vehIds in detour.edgeIndex.values())
+    assert "c" not in detour.edgeIndex and "b" not in detour.edgeIndex
+
+    # The EV passed `s`, so A may use it again.
+    detour.detourVehicles(vehicles, {"t"})
+    assert vehicles["A"].avoided == {"t"}
+    assert detour.avoidedEdges == {"A": {"t"}}
+    assert detour.avoidedBy == {"t": {"A"}}
+
+    detour.removeVehicles(["A"])
+    assert detour.avoidedEdges == {}
+    assert detour.avoidedBy == {}
+    assert detour.edgeIndex == {}
+    assert detour.routes == {}
+
+
+def test_revert_edges(detoured):
+    detour, vehicles = detoured
+
+    detour.revertEdges(vehicles, {"s"})
+    assert vehicles["A"].avoided == {"t"}
+    assert vehicles["B"].avoided == set()
+    assert detour.avoidedEdges == {"A": {"t"}}
+    assert detour.avoidedBy == {"t": {"A"}}
+    # Both are still on the network, so both stay indexed.
+    assert detour.edgeIndex["s"] == {"A", "B"}
+
+
+def test_revert_all_after_removal(detoured):
+    detour, vehicles = detoured
+
+    # B left without being reverted. Its avoidances must not linger in the ledger.
+    detour.removeVehicles(["B"])
+    reroutes = vehicles["B"].reroutes
+    detour.revertAll({"A": vehicles["A"]})
+    assert vehicles["A"].avoided == set()
+    assert vehicles["B"].reroutes == reroutes
+    assert detour.avoidedEdges == {}
+    assert detour.avoidedBy == {}
+    assert detour.evRoute == set()
+    assert all("B" not in vehIds for vehIds in detour.edgeIndex.values())
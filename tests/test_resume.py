@@ -0,0 +1,108 @@
+"""Checks what `--resume` relies on: the job manifest, the completion markers, and the run catalog."""
+import os
+import pytest
+from src.models.Simulation import getOutputFiles
+from src.models.TerminationPolicy import TerminationPolicy
+from src.runner import catalog, completion, manifest
+from src.runner.run_simulation import getRunSettings
+
+VTYPE_FILES = ["src/config/vTypes/0_100.add.xml", "src/config/vTypes/25_75.add.xml"]
+
+
+def createJobs(termination: TerminationPolicy = None) -> list[dict]:
+    settings = getRunSettings(termination or TerminationPolicy())
+    return [{**job, "settings": settings} for job in manifest.createManifest([1500], VTYPE_FILES, 2, seed=7)]
+
+
+def writeOutputs(outputDir: str, prefix: str) -> dict[str, str]:
+    """Writes well-formed, minimal SUMO outputs of a run."""
+    files = getOutputFiles(outputDir, prefix)
+    for kind, filePath in files.items():
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        with open(filePath, "wb") as f:
+            f.write(b"<run/>\n" + completion.CLOSING_TAGS[kind] + b"\n")
+    return files
+
+
+@pytest.fixture
+def completed(tmp_path):
+    """An output directory where every job of the manifest completed."""
+    outputDir = tmp_path.as_posix()
+    jobs = createJobs()
+    for job in jobs:
+        writeOutputs(outputDir, job["prefix"])
+        completion.markComplete(job, outputDir)
+    return outputDir, jobs
+
+
+def test_manifest_is_reproducible(tmp_path):
+    jobs = createJobs()
+    manifestFile = (tmp_path / "manifest.jsonl").as_posix()
+    manifest.writeManifest(jobs, manifestFile)
+
+    assert manifest.readManifest(manifestFile) == jobs
+    assert createJobs() == jobs
+    # Penetration rates of the same demand and run see the same traffic.
+    first, second = manifest.filterJobs(jobs, ["d1500_p0_100_r0", "d1500_p25_75_r0"])
+    assert first["tripSeed"] == second["tripSeed"]
+    assert first["evInsertionTime"] == second["evInsertionTime"]
+
+
+def test_completed_runs_are_not_pending(completed):
+    outputDir, jobs = completed
+
+    assert all(completion.isComplete(job, outputDir) for job in jobs)
+    assert completion.getPendingJobs(jobs, outputDir) == []
+
+
+def test_changed_output_is_incomplete(completed):
+    outputDir, jobs = completed
+    job = jobs[1]
+    tripinfoFile = getOutputFiles(outputDir, job["prefix"])["tripinfo"]
+
+    # Still well-formed, but no longer the file the marker checksummed.
+    with open(tripinfoFile, "wb") as f:
+        f.write(b"<run changed=\"1\"/>\n</tripinfos>\n")
+
+    assert completion.isWellFormed(tripinfoFile, completion.CLOSING_TAGS["tripinfo"])
+    assert not completion.isComplete(job, outputDir)
+    assert completion.getPendingJobs(jobs, outputDir) == [job]
+
+
+def test_truncated_output_is_incomplete(completed):
+    outputDir, jobs = completed
+    job = jobs[0]
+    ssmFile = getOutputFiles(outputDir, job["prefix"])["ssm"]
+    with open(ssmFile, "wb") as f:
+        f.write(b"<run/>\n")
+
+    assert not completion.isComplete(job, outputDir)
+    assert not completion.hasOutputs(job, outputDir)
+
+
+def test_changed_option_makes_runs_pending(completed):
+    outputDir, jobs = completed
+    changedJobs = createJobs(TerminationPolicy(afterEv=-1))
+
+    assert [job["prefix"] for job in changedJobs] == [job["prefix"] for job in jobs]
+    assert completion.getPendingJobs(changedJobs, outputDir) == changedJobs
+
+
+def test_find_run_returns_recorded_metadata(tmp_path):
+    outputDir = tmp_path.as_posix()
+    job = createJobs()[3]
+    files = writeOutputs(outputDir, job["prefix"])
+    catalog.recordRun(job, outputDir)
+
+    for filePath in files.values():
+        entry = catalog.findRun(filePath)
+        assert (entry["demand"], entry["penetration"], entry["runNum"]) == (1500, "25_75", 1)
+        assert entry["status"] == catalog.COMPLETE
+    assert catalog.getRunLabels(entry) == ("1500", "25", "1")
+
+    # A later entry of the run replaces the earlier one.
+    catalog.recordRun(job, outputDir, catalog.FAILED)
+    assert catalog.findRun(files["ssm"])["status"] == catalog.FAILED
+
+    with pytest.raises(ValueError):
+        catalog.findRun(f"{outputDir}/ssm/ssm_d1500_p0_100_r9.xml")
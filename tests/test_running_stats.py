@@ -0,0 +1,47 @@
+"""Checks the running statistics used to average reruns against pandas, and that their memory stays bounded."""
+import numpy as np
+import pandas as pd
+from src.utilities.running_stats import RunningStats, QuantileSketch
+
+COLUMNS = ["duration", "waitingCount"]
+
+
+def getRuns(numRuns: int, rows: int = 20, seed: int = 0) -> list[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    runs = []
+    for _ in range(numRuns):
+        run = pd.DataFrame({"id": rng.choice(["EV", "EV2"], size=rows),
+                            "duration": rng.uniform(100, 500, size=rows),
+                            "waitingCount": rng.integers(0, 5, size=rows).astype(float)})
+        # Missing values, as in tripinfo rows without the attribute.
+        run.loc[rng.random(rows) < 0.2, "waitingCount"] = np.nan
+        runs.append(run)
+    return runs
+
+
+def test_matches_pandas_below_capacity():
+    runs = getRuns(10)
+    stats = RunningStats(COLUMNS)
+    for run in runs:
+        stats.merge(RunningStats(COLUMNS).add(run, by="id"))
+
+    grouped = pd.concat(runs).groupby("id")[COLUMNS]
+    pd.testing.assert_frame_equal(stats.median(), grouped.median(), check_names=False)
+    pd.testing.assert_frame_equal(stats.mean(), grouped.mean(), check_names=False)
+    pd.testing.assert_frame_equal(stats.var(), grouped.var(), check_names=False)
+    pd.testing.assert_frame_equal(stats.count(), grouped.count(), check_names=False, check_dtype=False)
+
+
+def test_sketch_stays_bounded_and_close():
+    values = np.random.default_rng(1).normal(size=200_000)
+    first, second = QuantileSketch(capacity=1024), QuantileSketch(capacity=1024)
+    for index, chunk in enumerate(np.array_split(values, 200)):
+        (first if index % 2 else second).add(chunk)
+    first.merge(second)
+
+    assert first.count == len(values)
+    assert sum(len(level) for level in first.levels) <= 1024 * len(first.levels)
+    assert len(first.levels) <= 10
+    for q in [0.05, 0.5, 0.95]:
+        rank = (values < first.quantile(q)).mean()
+        assert abs(rank - q) < 0.01
@@ -0,0 +1,48 @@
+"""Enforces a per-step TraCI command budget on the control loop, against the scripted stand-in of `benchmarks`.
+
+Run from the repository root (`tests/pytest.ini` makes `tests` the root of the test run):
+
+    python -m pytest tests
+"""
+import pytest
+import traci as traciModule
+from src.models.TraciProxy import traci, BudgetExceeded
+from benchmarks.control_loop import getEvEdges, runLoop, WARMUP_STEPS
+
+FLEET_SIZE = 50
+STEPS = 100
+SEED = 0
+
+# The most commands a step may send. The busiest step is the EV's insertion,
+# when every CV sharing its route avoids the shared edges and reroutes once
+# (about 120 commands for this fleet). Every other step sends a handful.
+STEP_BUDGET = 150
+
+
+@pytest.fixture
+def evEdges():
+    edges = getEvEdges()
+    yield edges
+    traci.disable()
+    traci.reset()
+    traci.use(traciModule)
+
+
+def test_control_loop_stays_within_budget(evEdges):
+    with traci.budget(STEP_BUDGET):
+        standIn = runLoop(FLEET_SIZE, STEPS, SEED, evEdges)
+
+    # The run went past the EV's insertion, so its detours were counted.
+    assert len(standIn.loopTimes) == STEPS
+    assert STEPS > WARMUP_STEPS
+    assert traci.calls[("vehicle", "rerouteTraveltime")] > 0
+
+
+def test_exceeding_budget_raises(evEdges):
+    with pytest.raises(BudgetExceeded, match="over the budget of 5"):
+        with traci.budget(5):
+            runLoop(FLEET_SIZE, STEPS, SEED, evEdges)
+
+    # The budget only applies within the block.
+    assert not traci._enabled
+    assert traci._stepBudget is None